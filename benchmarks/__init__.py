@@ -0,0 +1 @@
+"""Benchmarks for the Personal Expense Tracker"""
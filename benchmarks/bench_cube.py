@@ -0,0 +1,137 @@
+"""Benchmark of the aggregation cube against grouping the expenses
+
+Builds synthetic expense columns spanning several years and times the
+weekday and month-by-category tables of the Analytics page's Patterns tab,
+with a drill-down filter (two categories, weekends), computed by a pandas
+groupby over the expenses and by rolling up a slice of ``cube.ExpenseCube``.
+Also times building the cube and updating it for a batch of changed
+expenses. The cube's tables are checked against pandas'.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_cube [--rows N ...] [--changed N] [--repeat N]
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from aggregation import WEEKDAYS, ExpenseColumns
+from benchmarks.bench_parallel_aggregation import CATEGORIES, synthetic_columns
+from cube import ExpenseCube
+
+SELECTED_CATEGORIES = ["Food", "Travel"]
+SELECTED_WEEKDAYS = [5, 6]
+
+
+def median_seconds(function, repeat: int) -> tuple[float, object]:
+    """Median seconds per call and the last result"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), result
+
+
+def frame_tables(df: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Weekday and month-by-category totals of the selection, grouping the expenses"""
+    selected = df[df["category"].isin(SELECTED_CATEGORIES) & df["weekday"].isin(SELECTED_WEEKDAYS)]
+    weekdays = selected.groupby("weekday")["amount"].agg(["sum", "count", "mean", "std"])
+    months = selected.pivot_table(index="month", columns="category", values="amount", aggfunc="sum", fill_value=0)
+    return weekdays, months
+
+
+def cube_tables(cube: ExpenseCube) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Weekday and month-by-category totals of the selection, rolled up from the cube"""
+    selection = cube.slice(categories=SELECTED_CATEGORIES, weekdays=SELECTED_WEEKDAYS)
+    return selection.roll_up("weekday"), selection.roll_up("year", "month", "category")
+
+
+def versions(columns, changed: int, seed: int = 1) -> tuple[SimpleNamespace, SimpleNamespace, np.ndarray]:
+    """Column store stand-ins before and after ``changed`` expenses were given new amounts and categories"""
+    rng = np.random.default_rng(seed)
+    ids = np.sort(rng.choice(len(columns), changed, replace=False))
+    amounts, categories = columns.amounts.copy(), columns.categories.copy()
+    amounts[ids] = rng.uniform(1, 300, changed).round(2)
+    categories[ids] = rng.integers(0, len(CATEGORIES), changed)
+    after = ExpenseColumns(amounts, columns.months, columns.weekdays, categories, columns.category_names)
+
+    def version(expense_columns, seq):
+        # The IDs are the row numbers, as in a store of a ledger without deletes
+        return SimpleNamespace(
+            seq=seq,
+            expense_columns=lambda rows=None: expense_columns if rows is None else _rows(expense_columns, rows),
+        )
+
+    return version(columns, 1), version(after, 2), ids
+
+
+def _rows(columns, rows: np.ndarray):
+    """Some rows of expense columns"""
+    return ExpenseColumns(
+        columns.amounts[rows],
+        columns.months[rows],
+        columns.weekdays[rows],
+        columns.categories[rows],
+        columns.category_names,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--changed", type=int, default=100, help="expenses changed by the timed update")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(  # noqa: T201
+        f"{'rows':>10}{'groupby s':>12}{'cube s':>10}{'speedup':>9}{'build s':>10}{'update s':>11}{'cells':>9}",
+    )
+    for rows in args.rows:
+        columns = synthetic_columns(rows)
+        df = pd.DataFrame(
+            {
+                "amount": columns.amounts,
+                "month": columns.months,
+                "weekday": columns.weekdays,
+                "category": np.array(CATEGORIES)[columns.categories],
+            },
+        )
+        before, after, ids = versions(columns, min(args.changed, rows))
+
+        build_seconds, cube = median_seconds(lambda: ExpenseCube.build(before), args.repeat)  # noqa: B023
+        frame_seconds, (frame_weekdays, frame_months) = median_seconds(lambda: frame_tables(df), args.repeat)  # noqa: B023
+        cube_seconds, (cube_weekdays, cube_months) = median_seconds(lambda: cube_tables(cube), args.repeat)  # noqa: B023
+        # A write of the changed expenses: subtracted as they were, added as they are
+        update_seconds, updated = median_seconds(
+            lambda: cube.applied([before.expense_columns(ids)], [after.expense_columns(ids)], after.seq),  # noqa: B023
+            args.repeat,
+        )
+
+        if not (
+            cube_weekdays["weekday"].tolist() == [WEEKDAYS[day] for day in frame_weekdays.index]
+            and np.allclose(cube_weekdays["sum"], frame_weekdays["sum"])
+            and np.allclose(cube_weekdays["std"], frame_weekdays["std"], equal_nan=True)
+            and np.isclose(cube_months["sum"].sum(), frame_months.to_numpy().sum())
+        ):
+            raise RuntimeError("the cube's tables disagree with pandas")
+        if not np.allclose(updated.sums, ExpenseCube.build(after).sums):
+            raise RuntimeError("the updated cube disagrees with a rebuilt one")
+
+        print(  # noqa: T201
+            f"{rows:>10}{frame_seconds:>12.4f}{cube_seconds:>10.4f}{frame_seconds / cube_seconds:>9.1f}"
+            f"{build_seconds:>10.4f}{update_seconds:>11.4f}{cube.counts.size:>9}",
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Microbenchmarks for single-value date conversion
+
+Measures ``convert_to_standard_date`` per input style, both on cache misses
+(every value distinct) and on cache hits (the same few values repeated).
+
+Run from the repository root:
+
+    python -m benchmarks.bench_date_conversion [--count N]
+"""
+
+import argparse
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from utils import datetime_conversion
+
+INPUT_STYLES = {
+    "iso": lambda day: day.strftime("%Y-%m-%d"),
+    "day_first": lambda day: day.strftime("%d/%m/%Y"),
+    "month_first": lambda day: day.strftime("%m/%d/%Y"),
+    "dotted": lambda day: day.strftime("%d.%m.%Y"),
+    "long_month": lambda day: day.strftime("%B %d, %Y"),
+    "iso_datetime": lambda day: day.strftime("%Y-%m-%d 12:30:00"),
+    "regex_fallback": lambda day: f"{day.year}/{day.month}/{day.day} (approx)",
+}
+
+WARM_DISTINCT_VALUES = 100
+
+
+def _dates(count):
+    """Distinct consecutive dates"""
+    start = date(1900, 1, 1)
+    return [start + timedelta(days=offset) for offset in range(count)]
+
+
+def _reset_caches():
+    """Clear the conversion cache and the learned format hint"""
+    datetime_conversion._convert_date_string.cache_clear()
+    datetime_conversion._format_hint.format = None
+
+
+def _time_per_call(values):
+    """Convert every value once and return the mean time per call in nanoseconds"""
+    convert = datetime_conversion.convert_to_standard_date
+    start = time.perf_counter_ns()
+    for value in values:
+        convert(value)
+    return (time.perf_counter_ns() - start) / len(values)
+
+
+def bench_style(make_value, count):
+    """Return (cold ns/call, warm ns/call) for one input style"""
+    _reset_caches()
+    cold = _time_per_call([make_value(day) for day in _dates(count)])
+
+    _reset_caches()
+    warm_values = [make_value(day) for day in _dates(WARM_DISTINCT_VALUES)]
+    _time_per_call(warm_values)
+    warm = _time_per_call(warm_values * (count // WARM_DISTINCT_VALUES))
+
+    return cold, warm
+
+
+def bench_mixed(count):
+    """Cold ns/call for a stream that alternates styles, which defeats the format hint"""
+    _reset_caches()
+    makers = list(INPUT_STYLES.values())
+    values = [makers[index % len(makers)](day) for index, day in enumerate(_dates(count))]
+    return _time_per_call(values)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=20000, help="values converted per measurement")
+    args = parser.parse_args()
+
+    lines = [f"{'style':<16}{'cold ns/call':>14}{'warm ns/call':>14}"]
+    for name, make_value in INPUT_STYLES.items():
+        cold, warm = bench_style(make_value, args.count)
+        lines.append(f"{name:<16}{cold:>14.0f}{warm:>14.0f}")
+    lines.append(f"{'mixed':<16}{bench_mixed(args.count):>14.0f}{'-':>14}")
+
+    print("\n".join(lines))  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""Benchmark suite for ExpenseManager at 1k to 1M rows
+
+For each ledger size, a fresh process seeds a temporary ledger through the
+bulk insert path and then times the main ExpenseManager operations: single
+inserts, CSV import, lookups by ID, date-range and category queries,
+description search, statistics, the monthly summary and CSV export. Each
+operation reports throughput, latency percentiles and the process's peak
+RSS after it ran. Every size runs in its own process, so peak RSS is not
+carried over from a larger ledger.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_expense_manager [--sizes N ...] [--repeat N] [--output results.json]
+"""
+
+import argparse
+import csv
+import functools
+import json
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+# ExpenseManager imports pandas and the column store on first use; they are loaded up front so that no
+# timing includes an import
+import pandas  # noqa: F401, ICN001
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+import storage.column_store  # noqa: F401
+from benchmarks.load_test_api import percentile
+from expense_manager import ExpenseManager
+
+CATEGORIES = ["Food", "Transport", "Bills", "Entertainment", "Health", "Shopping", "Education", "Travel", "Other"]
+
+FIRST_DAY = date(2015, 1, 1)
+DAYS = 10 * 365
+
+
+def synthetic_expenses(rows: int, seed: int) -> list[dict]:
+    """Random expenses spread over ten years"""
+    rng = random.Random(seed)  # noqa: S311
+    return [
+        {
+            "amount": round(rng.uniform(1, 300), 2),
+            "description": f"benchmark expense {index}",
+            "category": rng.choice(CATEGORIES),
+            "date": (FIRST_DAY + timedelta(days=rng.randrange(DAYS))).isoformat(),
+        }
+        for index in range(rows)
+    ]
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far, in MiB (ru_maxrss is in KiB on Linux)"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def measure(name: str, calls: list, rows_per_call: int = 1) -> dict:
+    """Time each call, returning throughput, latency percentiles and peak RSS
+
+    Throughput counts rows per second for bulk operations (``rows_per_call`` rows each) and calls per second
+    otherwise.
+    """
+    latencies = []
+    for call in calls:
+        start = time.perf_counter()
+        call()
+        latencies.append(time.perf_counter() - start)
+
+    return {
+        "operation": name,
+        "calls": len(latencies),
+        "throughput_per_s": rows_per_call * len(latencies) / sum(latencies),
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def run_size(rows: int, repeat: int, seed: int) -> list[dict]:
+    """Seed a ledger of ``rows`` expenses in a temporary directory and benchmark every operation on it"""
+    rng = random.Random(seed)  # noqa: S311
+    results = []
+
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = Path(tmp)
+        manager = ExpenseManager(str(directory / "expenses.json"))
+
+        seed_call = functools.partial(manager.add_expenses, synthetic_expenses(rows, seed))
+        results.append(measure("bulk_insert", [seed_call], rows_per_call=rows))
+        del seed_call
+
+        import_rows = min(rows, 10_000)
+        csv_path = directory / "import.csv"
+        with csv_path.open("w", newline="", encoding="utf-8") as fh:
+            writer = csv.DictWriter(fh, fieldnames=["amount", "description", "category", "date"])
+            writer.writeheader()
+            writer.writerows(synthetic_expenses(import_rows, seed + 1))
+        results.append(measure("import_csv", [lambda: manager.import_csv(csv_path)], rows_per_call=import_rows))
+
+        results.append(
+            measure(
+                "add_expense",
+                [
+                    lambda expense=expense: manager.add_expense(**expense)
+                    for expense in synthetic_expenses(repeat, seed + 2)
+                ],
+            ),
+        )
+
+        total = rows + import_rows + repeat
+        results.append(
+            measure(
+                "get_expense_by_id",
+                [lambda: manager.get_expense_by_id(rng.randint(1, total)) for _ in range(repeat)],
+            ),
+        )
+
+        def date_range_query():
+            start = FIRST_DAY + timedelta(days=rng.randrange(DAYS - 30))
+            manager.get_expenses_by_date_range(start.isoformat(), (start + timedelta(days=30)).isoformat())
+
+        results.append(measure("get_expenses_by_date_range", [date_range_query] * repeat))
+        results.append(
+            measure(
+                "get_expenses_by_category",
+                [lambda: manager.get_expenses_by_category(rng.choice(CATEGORIES)) for _ in range(repeat)],
+            ),
+        )
+        results.append(
+            measure(
+                "search_expenses",
+                [lambda: manager.search_expenses(f"expense {rng.randrange(rows)}") for _ in range(repeat)],
+            ),
+        )
+        results.append(measure("get_statistics", [manager.get_statistics] * repeat))
+        results.append(measure("get_monthly_summary", [manager.get_monthly_summary] * repeat))
+        results.append(
+            measure(
+                "export_to_csv",
+                [lambda: manager.export_to_csv(str(directory / "export.csv")) for _ in range(max(1, repeat // 10))],
+                rows_per_call=total,
+            ),
+        )
+        manager.close()
+
+    return [{"rows": rows, **result} for result in results]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=20, help="calls per timed operation")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="also write the results as JSON")
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_size(args.child, args.repeat, args.seed)))  # noqa: T201
+        return
+
+    results = []
+    print(  # noqa: T201
+        f"{'rows':>9}  {'operation':<28}{'calls':>6}{'per s':>14}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+        f"{'peak RSS MB':>13}",
+    )
+    for rows in args.sizes:
+        output = subprocess.run(  # noqa: S603
+            [
+                sys.executable,
+                "-m",
+                "benchmarks.bench_expense_manager",
+                "--child",
+                str(rows),
+                "--repeat",
+                str(args.repeat),
+                "--seed",
+                str(args.seed),
+            ],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        for result in json.loads(output.stdout.splitlines()[-1]):
+            results.append(result)
+            print(  # noqa: T201
+                f"{result['rows']:>9}  {result['operation']:<28}{result['calls']:>6}"
+                f"{result['throughput_per_s']:>14,.1f}{result['p50_ms']:>10.2f}{result['p95_ms']:>10.2f}{result['p99_ms']:>10.2f}"
+                f"{result['peak_rss_mb']:>13.1f}",
+            )
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
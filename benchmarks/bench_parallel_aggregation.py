@@ -0,0 +1,91 @@
+"""Scaling benchmark for the map-reduce aggregation engine
+
+Builds synthetic expense columns spanning several years and times
+``aggregation.aggregate`` with 1, 2, 4 and 8 worker processes. Pools are
+started and warmed before timing; the pool start-up cost is reported
+separately. Every run is checked against the single-process result.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_parallel_aggregation [--rows N ...] [--workers N ...] [--repeat N]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+import aggregation
+
+CATEGORIES = ["Bills", "Education", "Entertainment", "Food", "Health", "Other", "Shopping", "Transport", "Travel"]
+
+
+def synthetic_columns(rows: int, years: int = 10, seed: int = 0) -> aggregation.ExpenseColumns:
+    """Random expense columns over ``years`` years"""
+    rng = np.random.default_rng(seed)
+    days = rng.integers(0, years * 365, rows)
+    first_day = np.datetime64("2015-01-01")
+    dates = first_day + days.astype("timedelta64[D]")
+    months = dates.astype("datetime64[M]").astype(np.int64) + 1970 * 12
+    return aggregation.ExpenseColumns(
+        amounts=rng.uniform(1, 300, rows).round(2),
+        months=months.astype(aggregation.COLUMN_DTYPES["months"]),
+        # 1970-01-01 was a Thursday
+        weekdays=((dates.astype(np.int64) + 3) % 7).astype(aggregation.COLUMN_DTYPES["weekdays"]),
+        categories=rng.integers(0, len(CATEGORIES), rows).astype(aggregation.COLUMN_DTYPES["categories"]),
+        category_names=CATEGORIES,
+    )
+
+
+def time_aggregate(columns: aggregation.ExpenseColumns, workers: int, repeat: int) -> tuple[float, object]:
+    """Median seconds per aggregation and the last result"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = aggregation.aggregate(columns, workers=workers)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000, 5_000_000])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"CPUs available: {os.cpu_count()}")  # noqa: T201
+
+    # Start every pool up front so that process start-up is not part of the timings
+    for workers in args.workers:
+        if workers > 1:
+            start = time.perf_counter()
+            aggregation.aggregate(synthetic_columns(1000), workers=workers)
+            print(f"pool start-up, {workers} workers: {time.perf_counter() - start:.3f}s")  # noqa: T201
+
+    print(f"\n{'rows':>10}{'workers':>9}{'median s':>11}{'rows/s':>14}{'speedup':>9}")  # noqa: T201
+    for rows in args.rows:
+        columns = synthetic_columns(rows)
+        baseline, expected = time_aggregate(columns, 1, args.repeat)
+        for workers in args.workers:
+            seconds, result = (baseline, expected) if workers == 1 else time_aggregate(columns, workers, args.repeat)
+            if not (
+                np.array_equal(result.month_counts, expected.month_counts)
+                and np.allclose(result.month_sums, expected.month_sums)
+            ):
+                raise RuntimeError(f"{workers} workers disagree with the single-process result")
+            print(  # noqa: T201
+                f"{rows:>10}{workers:>9}{seconds:>11.4f}{rows / seconds:>14,.0f}{baseline / seconds:>9.2f}",
+            )
+
+    aggregation.shutdown_pools()
+
+
+if __name__ == "__main__":
+    main()
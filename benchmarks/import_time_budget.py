@@ -0,0 +1,106 @@
+"""Import-time budget for the Streamlit app's cold start
+
+Runs fresh interpreters with ``python -X importtime`` and reports what the
+app imports before the sidebar renders (Streamlit plus the modules imported
+at the top of ``src/app.py``) and what each page module adds when the page
+is first selected. Exits with status 1 if the startup imports take longer
+than the budget, so the check can run in CI.
+
+Run from the repository root:
+
+    python -m benchmarks.import_time_budget [--budget-ms N] [--repeat N] [--top N]
+"""
+
+import argparse
+import ast
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# Modules imported at the top of src/app.py, before any page is rendered
+STARTUP_MODULES = [
+    "streamlit",
+    "config",
+    "slow_query_log",
+    "background_jobs",
+    "expense_manager",
+    "memory_profiling",
+    "storage.tenant_pool",
+    "structured_logging",
+]
+
+PAGE_MARKER = "-- page --"
+
+
+def page_modules() -> dict[str, str]:
+    """PAGE_MODULES of src/app.py, read without running the app"""
+    tree = ast.parse((ROOT / "src" / "app.py").read_text(encoding="utf-8"))
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(
+            getattr(target, "id", None) == "PAGE_MODULES" for target in node.targets
+        ):
+            return ast.literal_eval(node.value)
+    raise LookupError("PAGE_MODULES not found in src/app.py")
+
+
+def import_times(page_module: str | None = None) -> tuple[dict[str, int], dict[str, int]]:
+    """Self import time in microseconds of every module loaded at startup, and of those the page adds"""
+    code = "; ".join(f"import {module}" for module in STARTUP_MODULES)
+    if page_module:
+        code += f"; import sys; sys.stderr.write({PAGE_MARKER!r} + '\\n'); import {page_module}"
+
+    output = subprocess.run(  # noqa: S603
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT,
+        env={**os.environ, "PYTHONPATH": os.pathsep.join([str(ROOT), str(ROOT / "src")])},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    startup, page = {}, {}
+    current = startup
+    for line in output.stderr.splitlines():
+        if line == PAGE_MARKER:
+            current = page
+        elif line.startswith("import time:") and "|" in line and "self [us]" not in line:
+            self_us, _, name = line.removeprefix("import time:").split("|")
+            current[name.strip()] = int(self_us)
+    return startup, page
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget-ms", type=float, default=1000, help="maximum startup import time")
+    parser.add_argument("--repeat", type=int, default=5, help="fresh interpreters per measurement")
+    parser.add_argument("--top", type=int, default=10, help="slowest startup modules to list")
+    args = parser.parse_args()
+
+    runs = [import_times() for _ in range(args.repeat)]
+    startup_ms = statistics.median(sum(startup.values()) for startup, _ in runs) / 1000
+    slowest = sorted(runs[-1][0].items(), key=lambda item: item[1], reverse=True)[: args.top]
+
+    print(f"startup imports: {startup_ms:.0f} ms (budget {args.budget_ms:.0f} ms)")  # noqa: T201
+    print("\nslowest startup modules (self time):")  # noqa: T201
+    for name, self_us in slowest:
+        print(f"  {self_us / 1000:>8.1f} ms  {name}")  # noqa: T201
+
+    print(f"\n{'page':<16}{'added imports ms':>18}{'slowest added module':>40}")  # noqa: T201
+    for page, module in page_modules().items():
+        page_runs = [import_times(module)[1] for _ in range(args.repeat)]
+        added_ms = statistics.median(sum(times.values()) for times in page_runs) / 1000
+        heaviest = max(page_runs[-1].items(), key=lambda item: item[1], default=("-", 0))[0]
+        print(f"{page:<16}{added_ms:>18.0f}{heaviest:>40}")  # noqa: T201
+
+    if startup_ms > args.budget_ms:
+        print(f"\nFAIL: startup imports exceed the budget by {startup_ms - args.budget_ms:.0f} ms")  # noqa: T201
+        sys.exit(1)
+    print("\nOK")  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
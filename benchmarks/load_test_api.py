@@ -0,0 +1,199 @@
+"""Local load test for the headless JSON HTTP API
+
+Starts ``src/api_server.py`` on a temporary database (unless ``--url`` points
+at a running server), seeds it, then drives it from concurrent keep-alive
+clients with a mix of batch inserts, single inserts, queries and aggregates.
+Reports requests per second and latency percentiles per operation.
+
+Run from the repository root:
+
+    python -m benchmarks.load_test_api [--clients N] [--duration SECONDS] [--url URL]
+"""
+
+import argparse
+import http.client
+import json
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from urllib.parse import urlsplit
+
+REPO_DIR = Path(__file__).resolve().parents[1]
+CATEGORIES = ["Food", "Transport", "Bills", "Entertainment", "Health", "Shopping"]
+
+# (operation, weight)
+WORKLOAD = [
+    ("list", 35),
+    ("get", 15),
+    ("stats", 10),
+    ("insert", 20),
+    ("batch_insert", 20),
+]
+
+
+def _expense(rng: random.Random) -> dict:
+    """A random expense record"""
+    return {
+        "amount": round(rng.uniform(1, 300), 2),
+        "description": f"load test {rng.randrange(1_000_000)}",
+        "category": rng.choice(CATEGORIES),
+        "date": f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+    }
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    """Nearest-rank percentile of a list of values"""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))]
+
+
+class Client:
+    """Keep-alive API client that records latency per operation"""
+
+    def __init__(self, host: str, port: int, seed: int, batch_size: int):
+        """Open a connection to the server"""
+        self.connection = http.client.HTTPConnection(host, port, timeout=60)
+        self.rng = random.Random(seed)  # noqa: S311
+        self.batch_size = batch_size
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def request(self, method: str, path: str, body=None, headers=None) -> tuple[int, bytes]:
+        """Send one request and read the whole response"""
+        payload = json.dumps(body).encode() if body is not None else None
+        headers = {"Content-Type": "application/json", **(headers or {})}
+        self.connection.request(method, path, body=payload, headers=headers)
+        response = self.connection.getresponse()
+        return response.status, response.read()
+
+    def run_operation(self, operation: str):
+        """Run one operation of the workload mix and time it"""
+        if operation == "list":
+            month = self.rng.randint(1, 12)
+            args = ("GET", f"/expenses?start=2024-{month:02d}-01&end=2024-{month:02d}-28&limit=200")
+        elif operation == "get":
+            args = ("GET", f"/expenses/{self.rng.randint(1, 1000)}")
+        elif operation == "stats":
+            args = ("GET", "/stats")
+        elif operation == "insert":
+            args = ("POST", "/expenses", _expense(self.rng))
+        else:
+            args = ("POST", "/expenses/batch", [_expense(self.rng) for _ in range(self.batch_size)])
+
+        start = time.perf_counter()
+        status, _ = self.request(*args)
+        elapsed = time.perf_counter() - start
+
+        if status >= 500 or (status >= 400 and operation != "get"):  # noqa: PLR2004
+            self.errors[operation] += 1
+        else:
+            self.latencies[operation].append(elapsed)
+
+
+def _start_server(db_path: Path) -> tuple[subprocess.Popen, str, int]:
+    """Start the API server on a free port and wait until it is listening"""
+    process = subprocess.Popen(  # noqa: S603
+        [sys.executable, str(REPO_DIR / "src" / "api_server.py"), "--port", "0", "--db", str(db_path)],
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    address = process.stdout.readline().strip().rsplit("//", 1)[-1]
+    host, port = address.rsplit(":", 1)
+    return process, host, int(port)
+
+
+def run_load(host: str, port: int, clients: int, duration: float, batch_size: int, seed_rows: int) -> dict:
+    """Seed the server and run the workload, returning per-operation results"""
+    seeder = Client(host, port, seed=0, batch_size=batch_size)
+    for start in range(0, seed_rows, 1000):
+        seeder.request("POST", "/expenses/batch", [_expense(seeder.rng) for _ in range(min(1000, seed_rows - start))])
+
+    operations = [name for name, weight in WORKLOAD for _ in range(weight)]
+    workers = [Client(host, port, seed=index + 1, batch_size=batch_size) for index in range(clients)]
+    deadline = time.perf_counter() + duration
+
+    def work(client: Client):
+        while time.perf_counter() < deadline:
+            client.run_operation(client.rng.choice(operations))
+
+    threads = [threading.Thread(target=work, args=(client,)) for client in workers]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    results = {}
+    for name, _ in WORKLOAD:
+        latencies = [value for client in workers for value in client.latencies[name]]
+        errors = sum(client.errors[name] for client in workers)
+        if latencies:
+            results[name] = {
+                "requests": len(latencies),
+                "errors": errors,
+                "rps": len(latencies) / elapsed,
+                "mean_ms": statistics.fmean(latencies) * 1000,
+                "p50_ms": percentile(latencies, 0.50) * 1000,
+                "p95_ms": percentile(latencies, 0.95) * 1000,
+                "p99_ms": percentile(latencies, 0.99) * 1000,
+            }
+    results["total"] = {
+        "requests": sum(result["requests"] for result in results.values()),
+        "errors": sum(result["errors"] for result in results.values()),
+        "rps": sum(result["rps"] for result in results.values()),
+    }
+    return results
+
+
+def format_results(results: dict) -> str:
+    """Render the results as a table"""
+    lines = [f"{'operation':<14}{'requests':>10}{'errors':>8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"]
+    for name, result in results.items():
+        if name == "total":
+            continue
+        lines.append(
+            f"{name:<14}{result['requests']:>10}{result['errors']:>8}{result['rps']:>10.1f}"
+            f"{result['p50_ms']:>10.2f}{result['p95_ms']:>10.2f}{result['p99_ms']:>10.2f}",
+        )
+    total = results["total"]
+    lines.append(f"{'total':<14}{total['requests']:>10}{total['errors']:>8}{total['rps']:>10.1f}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="target a running server instead of starting one")
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds")
+    parser.add_argument("--batch-size", type=int, default=50, help="expenses per batch insert")
+    parser.add_argument("--seed-rows", type=int, default=5000, help="expenses inserted before the run")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        process = None
+        if args.url:
+            url = urlsplit(args.url)
+            host, port = url.hostname, url.port or 80
+        else:
+            process, host, port = _start_server(Path(tmp) / "expenses.json")
+
+        try:
+            results = run_load(host, port, args.clients, args.duration, args.batch_size, args.seed_rows)
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait()
+
+    print(json.dumps(results, indent=2) if args.json else format_results(results))  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,314 @@
+"""Concurrent-session load test for the Streamlit app
+
+Seeds a ledger of synthetic expenses in a temporary directory, then, for each
+session count, starts that many sessions of the app at once. Each session is
+a Streamlit AppTest in a process of its own, since AppTest relies on
+Streamlit's process-wide runtime and its sessions cannot run concurrently in
+one process; the sessions share the ledger, its locks and its change log the
+way the sessions of separate server processes do. Every session repeats a
+user flow until the duration is over:
+
+- open the Dashboard
+- open Add Expense and submit an expense through the form
+- open View Expenses, filter it by a category, then search the descriptions
+- open Analytics, then rerun it (its tabs switch in the browser without a
+  rerun, so the rerun stands in for the tab switching)
+
+Every rerun is timed. For each session count, the report gives rerun
+latency percentiles per step and overall, reruns and flows per second, and
+memory per session: the average growth of a session process's resident set
+size once the app is loaded, and the average deep size of a session's
+``st.session_state``. A session that fails is reported with its error, and
+the script then exits with status 1. AppTest runs the script as the server does but
+without the websocket and the browser, so the latencies are a lower bound
+of what users see.
+
+Run from the repository root:
+
+    python -m benchmarks.load_test_sessions [--sessions N ...] [--duration SECONDS] [--rows N] [--json]
+"""
+
+import argparse
+import gc
+import json
+import os
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+
+from benchmarks.load_test_api import percentile
+from benchmarks.time_to_first_render import ROOT, seed_ledger
+
+# Reruns of one flow, in order
+STEPS = [
+    "dashboard",
+    "add_expense_page",
+    "add_expense_submit",
+    "view_expenses",
+    "filter_category",
+    "filter_search",
+    "analytics",
+    "analytics_rerun",
+]
+
+MIB = 1024 * 1024
+
+
+def current_rss_mb() -> float:
+    """Resident set size of this process in MiB (its peak where /proc is not available)"""
+    try:
+        pages = int(Path("/proc/self/statm").read_text().split()[1])
+    except OSError:
+        # ru_maxrss is in KiB on Linux and in bytes on macOS
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (MIB if sys.platform == "darwin" else 1024)
+    return pages * os.sysconf("SC_PAGE_SIZE") / MIB
+
+
+def _widget(widgets, label: str):
+    """The widget with a label, among the widgets of one kind"""
+    return next(widget for widget in widgets if widget.label == label)
+
+
+class Session:
+    """One simulated user: an AppTest of the app and the latency of each of its reruns"""
+
+    def __init__(self, seed: int):
+        """Initialize a session that has not run the app yet"""
+        # Imported here so that the parent process, which only seeds and reports, does not load Streamlit
+        from streamlit.testing.v1 import AppTest  # noqa: PLC0415
+
+        from ledger_generator import CATEGORY_PROFILES  # noqa: PLC0415
+
+        self.app = AppTest.from_file(str(ROOT / "src" / "app.py"), default_timeout=300)
+        self.rng = random.Random(seed)  # noqa: S311
+        self.profiles = CATEGORY_PROFILES
+        self.latencies = defaultdict(list)
+        self.flows = 0
+        self.error = None
+
+    def rerun(self, step: str, element):
+        """Run the script for a widget interaction (or a plain rerun of the app) and time it"""
+        start = time.perf_counter()
+        element.run()
+        self.latencies[step].append(time.perf_counter() - start)
+        if self.app.exception:
+            raise RuntimeError(f"{step} failed: {self.app.exception[0].value}")
+
+    def select_page(self, step: str, page: str):
+        """Pick a page in the sidebar"""
+        self.rerun(step, self.app.sidebar.selectbox[0].select(page))
+
+    def flow(self):
+        """Go through the pages once, as a user checking and recording their expenses"""
+        app = self.app
+        category = self.rng.choice(list(self.profiles))
+        description = self.rng.choice(self.profiles[category][3])
+
+        self.select_page("dashboard", "Dashboard")
+
+        self.select_page("add_expense_page", "Add Expense")
+        _widget(app.number_input, "Amount ($)").set_value(round(self.rng.uniform(1, 120), 2))
+        _widget(app.text_input, "Description").input(description)
+        _widget(app.selectbox, "Category").select(category)
+        self.rerun("add_expense_submit", _widget(app.button, "Add Expense").click())
+
+        self.select_page("view_expenses", "View Expenses")
+        self.rerun("filter_category", _widget(app.selectbox, "Filter by Category").select(category))
+        self.rerun("filter_search", _widget(app.text_input, "Search Description").input(description.split()[0]))
+
+        self.select_page("analytics", "Analytics")
+        self.rerun("analytics_rerun", app)
+        self.flows += 1
+
+    def run(self, duration: float):
+        """Open the app, then repeat the flow for ``duration`` seconds (recording the error that stops it early)"""
+        try:
+            deadline = time.perf_counter() + duration
+            self.rerun("first_run", self.app)
+            while time.perf_counter() < deadline:
+                self.flow()
+        except Exception as error:
+            self.error = f"{type(error).__name__}: {error}"
+
+
+def run_session(seed: int, duration: float) -> dict:
+    """Child process: run one session for ``duration`` seconds, once the parent says go, and report its reruns"""
+    # Imported here for the state size, as in the session's own process
+    from memory_profiling import deep_sizeof  # noqa: PLC0415
+
+    # A first session imports every page and fills the process-wide caches, so that the memory growth measured
+    # below is the session's own
+    warmup = Session(seed=0)
+    warmup.run(0)
+    warmup.flow()
+    del warmup
+    gc.collect()
+    baseline_mb = current_rss_mb()
+
+    user = Session(seed)
+    # Started together with the other sessions, once every process is ready
+    print("ready", flush=True)  # noqa: T201
+    sys.stdin.readline()
+    started = time.perf_counter()
+    user.run(duration)
+    seconds = time.perf_counter() - started
+
+    gc.collect()
+    return {
+        "seconds": seconds,
+        "flows": user.flows,
+        "latencies": user.latencies,
+        "rss_growth_mb": current_rss_mb() - baseline_mb,
+        "state_bytes": deep_sizeof(user.app.session_state.to_dict()),
+        "error": user.error,
+    }
+
+
+def _session_result(process: subprocess.Popen, stderr) -> dict:
+    """The report of a finished session process, or its error if it failed"""
+    output, _ = process.communicate()
+    if process.returncode == 0:
+        return json.loads(output.splitlines()[-1])
+    stderr.seek(0)
+    lines = stderr.read().decode(errors="replace").strip().splitlines()
+    return {"error": f"session process exited with status {process.returncode}: {lines[-1] if lines else ''}"}
+
+
+def _start_sessions(directory: Path, sessions: int, duration: float, logs: Path) -> list[tuple]:
+    """Start the session processes and, once every one has loaded the app, let them all go at once"""
+    command = [sys.executable, "-m", "benchmarks.load_test_sessions", "--duration", str(duration), "--session"]
+    processes = []
+    for seed in range(1, sessions + 1):
+        stderr = (logs / f"{seed}.log").open("w+b")
+        process = subprocess.Popen(  # noqa: S603
+            [*command, str(seed)],
+            cwd=directory,
+            env={**os.environ, "PYTHONPATH": str(ROOT)},
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=stderr,
+            text=True,
+        )
+        processes.append((process, stderr))
+
+    # A process that fails before it is ready ends its output, and reports its error when collected
+    for process, _ in processes:
+        for line in process.stdout:
+            if line.strip() == "ready":
+                break
+    for process, _ in processes:
+        try:
+            process.stdin.write("go\n")
+            process.stdin.flush()
+        except BrokenPipeError:
+            pass
+    return processes
+
+
+def _latency_summary(latencies: list[float]) -> dict:
+    """Count and percentiles of rerun latencies, in milliseconds"""
+    if not latencies:
+        return {"reruns": 0, "p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+    return {
+        "reruns": len(latencies),
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "max_ms": max(latencies) * 1000,
+    }
+
+
+def run_sessions(directory: Path, sessions: int, duration: float) -> dict:
+    """Run ``sessions`` concurrent session processes for ``duration`` seconds and summarize their reruns"""
+    with tempfile.TemporaryDirectory() as logs:
+        users = []
+        for process, stderr in _start_sessions(directory, sessions, duration, Path(logs)):
+            users.append(_session_result(process, stderr))
+            stderr.close()
+
+    finished = [user for user in users if "latencies" in user]
+    elapsed = max((user["seconds"] for user in finished), default=0.0)
+    steps = {}
+    for step in ["first_run", *STEPS]:
+        latencies = [value for user in finished for value in user["latencies"].get(step, [])]
+        if latencies:
+            steps[step] = _latency_summary(latencies)
+    reruns = [value for user in finished for latencies in user["latencies"].values() for value in latencies]
+    flows = sum(user["flows"] for user in finished)
+    return {
+        "sessions": sessions,
+        "seconds": elapsed,
+        "flows": flows,
+        "reruns_per_s": len(reruns) / elapsed if elapsed else 0.0,
+        "flows_per_s": flows / elapsed if elapsed else 0.0,
+        **_latency_summary(reruns),
+        "rss_mb_per_session": statistics.fmean(user["rss_growth_mb"] for user in finished) if finished else 0.0,
+        "state_kib_per_session": statistics.fmean(user["state_bytes"] for user in finished) / 1024 if finished else 0.0,
+        "errors": [user["error"] for user in users if user["error"]],
+        "steps": steps,
+    }
+
+
+def format_results(results: list[dict]) -> str:
+    """Render a summary per session count, then the latency of each step"""
+    header = (
+        f"{'sessions':>8}{'flows':>7}{'reruns/s':>10}{'flows/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+        f"{'max ms':>9}{'RSS MiB/sess':>14}{'state KiB/sess':>16}{'errors':>8}"
+    )
+    lines = [header]
+    lines.extend(
+        f"{result['sessions']:>8}{result['flows']:>7}{result['reruns_per_s']:>10.1f}{result['flows_per_s']:>9.2f}"
+        f"{result['p50_ms']:>9.1f}{result['p95_ms']:>9.1f}{result['p99_ms']:>9.1f}{result['max_ms']:>9.1f}"
+        f"{result['rss_mb_per_session']:>14.1f}{result['state_kib_per_session']:>16.1f}{len(result['errors']):>8}"
+        for result in results
+    )
+
+    for result in results:
+        lines.append(f"\n{result['sessions']} sessions, rerun latency per step")
+        lines.append(f"{'step':<20}{'reruns':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+        for step, summary in result["steps"].items():
+            lines.append(
+                f"{step:<20}{summary['reruns']:>8}{summary['p50_ms']:>9.1f}{summary['p95_ms']:>9.1f}"
+                f"{summary['p99_ms']:>9.1f}{summary['max_ms']:>9.1f}",
+            )
+        lines.extend(f"error: {error}" for error in result["errors"])
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 4, 16], help="concurrent sessions to try")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds per session count")
+    parser.add_argument("--rows", type=int, default=10_000, help="expenses in the seeded ledger")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    parser.add_argument("--session", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.session:
+        print(json.dumps(run_session(args.session, args.duration)))  # noqa: T201
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        seed_ledger(Path(directory), args.rows)
+        results = [run_sessions(Path(directory), sessions, args.duration) for sessions in args.sessions]
+
+    if args.json:
+        print(json.dumps(results, indent=2))  # noqa: T201
+    else:
+        print(f"{args.rows} seeded expenses, {args.duration:g} s per session count\n")  # noqa: T201
+        print(format_results(results))  # noqa: T201
+
+    # Latencies of sessions that failed part way are not a measurement
+    if any(result["errors"] for result in results):
+        print("\nFAIL: some sessions failed", file=sys.stderr)  # noqa: T201
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
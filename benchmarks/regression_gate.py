@@ -0,0 +1,304 @@
+"""Performance regression gate against a committed baseline
+
+Runs a fixed suite of timings and compares it with
+``benchmarks/baselines/regression_gate.json``, exiting with status 1 if a
+tracked operation got slower than its tolerance allows, so the check can run
+in CI. The suite covers:
+
+- ``add_expense``, and the bulk paths ``add_expenses`` and ``import_csv``
+  (1,000 rows per call)
+- queries by date range, category and description
+- the statistics, monthly summary and aggregates
+- page reruns of the Streamlit app (driven through AppTest, as in
+  ``load_test_sessions``)
+
+To keep the signal above the noise, every trial runs in a fresh process with
+a fixed hash seed and single-threaded numeric libraries, each operation is
+warmed up once and then timed several times (keeping the median), and the
+gate compares the median over the trials. Each trial's timings are
+normalized by a calibration workload timed in the same process, so that
+trials on a busier or slower machine, or a baseline recorded on another
+machine, stay comparable; a change also has to exceed a small absolute
+delta to count, as sub-millisecond operations jitter by more than any
+tolerance.
+
+Run from the repository root (``--update-baseline`` records a new baseline
+after an intended change):
+
+    python -m benchmarks.regression_gate [--trials N] [--repeat N] [--tolerance FRACTION] [--update-baseline]
+"""
+
+import argparse
+import csv
+import gc
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from datetime import timedelta
+from pathlib import Path
+
+from benchmarks.bench_expense_manager import CATEGORIES, DAYS, FIRST_DAY, synthetic_expenses
+from benchmarks.load_test_sessions import Session
+from benchmarks.time_to_first_render import ROOT, seed_ledger
+from expense_manager import ExpenseManager
+
+BASELINE_FILE = ROOT / "benchmarks" / "baselines" / "regression_gate.json"
+
+# Rows per bulk insert and CSV import call
+BULK_ROWS = 1_000
+
+# Allowed slowdown of an operation, as a fraction of its baseline time
+DEFAULT_TOLERANCE = 0.25
+# Page reruns go through Streamlit's script runner and vary more from run to run
+TOLERANCES = {
+    "page_dashboard": 0.4,
+    "page_view_expenses": 0.4,
+    "page_filter_category": 0.4,
+    "page_analytics": 0.4,
+    "page_analytics_rerun": 0.4,
+}
+# Smallest slowdown in milliseconds that counts as a regression
+MIN_REGRESSION_MS = 0.5
+
+# Environment of every trial process
+TRIAL_ENV = {
+    "PYTHONHASHSEED": "0",
+    "OMP_NUM_THREADS": "1",
+    "OPENBLAS_NUM_THREADS": "1",
+    "MKL_NUM_THREADS": "1",
+}
+
+
+def calibration_ms() -> float:
+    """Fastest of five runs of a fixed workload of sorting, hashing and JSON, in milliseconds"""
+    rng = random.Random(0)  # noqa: S311
+    records = [{"amount": rng.random(), "description": f"calibration {index}"} for index in range(20_000)]
+    timings = []
+    for _ in range(5):
+        start = time.perf_counter()
+        json.loads(json.dumps(sorted(records, key=lambda record: record["amount"])))
+        {record["description"]: record for record in records}
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000
+
+
+def time_calls(call: Callable[[], object], repeat: int) -> float:
+    """Median milliseconds of ``repeat`` calls, after one untimed call"""
+    call()
+    gc.collect()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        call()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+def manager_timings(directory: Path, rows: int, repeat: int) -> dict[str, float]:
+    """Milliseconds per call of the ExpenseManager operations, on a ledger of ``rows`` expenses"""
+    rng = random.Random(1)  # noqa: S311
+    manager = ExpenseManager(str(directory / "manager" / "expenses.json"))
+    manager.add_expenses(synthetic_expenses(rows, seed=0))
+
+    batches = iter([synthetic_expenses(BULK_ROWS, seed=seed) for seed in range(10, 12 + repeat)])
+    singles = iter(synthetic_expenses(repeat + 1, seed=2))
+    csv_path = directory / "import.csv"
+    with csv_path.open("w", newline="", encoding="utf-8") as fh:
+        writer = csv.DictWriter(fh, fieldnames=["amount", "description", "category", "date"])
+        writer.writeheader()
+        writer.writerows(synthetic_expenses(BULK_ROWS, seed=3))
+
+    def category_query():
+        return manager.get_expenses_by_category(rng.choice(CATEGORIES))
+
+    def date_range_query():
+        start = FIRST_DAY + timedelta(days=rng.randrange(DAYS - 30))
+        return manager.get_expenses_by_date_range(start.isoformat(), (start + timedelta(days=30)).isoformat())
+
+    timings = {
+        "add_expense": time_calls(lambda: manager.add_expense(**next(singles)), repeat),
+        "add_expenses": time_calls(lambda: manager.add_expenses(next(batches)), repeat),
+        "import_csv": time_calls(lambda: manager.import_csv(csv_path), repeat),
+        "get_expenses_by_date_range": time_calls(date_range_query, repeat),
+        "get_expenses_by_category": time_calls(category_query, repeat),
+        "search_expenses": time_calls(lambda: manager.search_expenses(f"expense {rng.randrange(rows)}"), repeat),
+        "get_statistics": time_calls(manager.get_statistics, repeat),
+        "get_monthly_summary": time_calls(manager.get_monthly_summary, repeat),
+        "get_aggregates": time_calls(manager.get_aggregates, repeat),
+    }
+    manager.close()
+    return timings
+
+
+def page_timings(repeat: int) -> dict[str, float]:
+    """Median milliseconds of the page reruns of a session going through its flow ``repeat`` times"""
+    session = Session(seed=0)
+    session.run(0)
+    # The first flow imports the pages and is not timed
+    session.flow()
+    session.latencies.clear()
+    for _ in range(repeat):
+        session.flow()
+    steps = ["dashboard", "view_expenses", "filter_category", "analytics", "analytics_rerun"]
+    return {f"page_{step}": statistics.median(session.latencies[step]) * 1000 for step in steps}
+
+
+def run_trial(rows: int, repeat: int) -> dict:
+    """Child process: time the suite once (the working directory holds the app's seeded ledger)
+
+    The calibration runs before, between and after the timings, and its
+    median stands for the speed of the machine during the trial.
+    """
+    calibrations = [calibration_ms()]
+    with tempfile.TemporaryDirectory() as tmp:
+        timings = manager_timings(Path(tmp), rows, repeat)
+    calibrations.append(calibration_ms())
+    timings.update(page_timings(max(1, repeat // 5)))
+    calibrations.append(calibration_ms())
+    return {"calibration_ms": statistics.median(calibrations), "timings_ms": timings}
+
+
+def run_suite(rows: int, repeat: int, trials: int) -> dict:
+    """Run the trials in fresh processes and keep the median of each timing, raw and normalized
+
+    A normalized timing is a timing divided by the calibration of its own
+    trial, so that trials run while the machine was slower or busier count
+    the same as the others.
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        seed_ledger(Path(directory), rows)
+        for _ in range(trials):
+            output = subprocess.run(  # noqa: S603
+                [
+                    sys.executable,
+                    "-m",
+                    "benchmarks.regression_gate",
+                    "--trial",
+                    "--rows",
+                    str(rows),
+                    "--repeat",
+                    str(repeat),
+                ],
+                cwd=directory,
+                env={**os.environ, **TRIAL_ENV, "PYTHONPATH": str(ROOT)},
+                capture_output=True,
+                text=True,
+                check=True,
+            )
+            results.append(json.loads(output.stdout.splitlines()[-1]))
+
+    return {
+        "rows": rows,
+        "repeat": repeat,
+        "trials": trials,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "calibration_ms": round(statistics.median(result["calibration_ms"] for result in results), 3),
+        "timings_ms": {
+            operation: round(statistics.median(result["timings_ms"][operation] for result in results), 3)
+            for operation in results[0]["timings_ms"]
+        },
+        "normalized": {
+            operation: round(
+                statistics.median(result["timings_ms"][operation] / result["calibration_ms"] for result in results),
+                6,
+            )
+            for operation in results[0]["timings_ms"]
+        },
+    }
+
+
+def compare(baseline: dict, current: dict, tolerance: float) -> list[dict]:
+    """Change of every tracked operation's normalized timing
+
+    The baseline milliseconds are reported as expected on this machine: the
+    baseline's normalized timing times the current calibration.
+    """
+    rows = []
+    for operation, baseline_normalized in baseline["normalized"].items():
+        current_normalized = current["normalized"].get(operation)
+        if current_normalized is None:
+            rows.append({"operation": operation, "status": "missing"})
+            continue
+        expected_ms = baseline_normalized * current["calibration_ms"]
+        current_ms = current_normalized * current["calibration_ms"]
+        allowed = TOLERANCES.get(operation, tolerance)
+        change = current_normalized / baseline_normalized - 1
+        regressed = change > allowed and current_ms - expected_ms >= MIN_REGRESSION_MS
+        improved = change < -allowed and expected_ms - current_ms >= MIN_REGRESSION_MS
+        rows.append(
+            {
+                "operation": operation,
+                "baseline_ms": expected_ms,
+                "current_ms": current_ms,
+                "change": change,
+                "tolerance": allowed,
+                "status": "REGRESSED" if regressed else "improved" if improved else "ok",
+            },
+        )
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--baseline", type=Path, default=BASELINE_FILE, help="baseline JSON file")
+    parser.add_argument("--rows", type=int, default=10_000, help="expenses in the ledgers")
+    parser.add_argument("--repeat", type=int, default=15, help="timed calls per operation and trial")
+    parser.add_argument("--trials", type=int, default=5, help="fresh processes running the suite")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="allowed slowdown, e.g. 0.25")
+    parser.add_argument("--update-baseline", action="store_true", help="record the results as the new baseline")
+    parser.add_argument("--trial", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.trial:
+        print(json.dumps(run_trial(args.rows, args.repeat)))  # noqa: T201
+        return
+
+    if not args.update_baseline and not args.baseline.exists():
+        parser.exit(2, f"No baseline at {args.baseline}; record one with --update-baseline\n")
+
+    current = run_suite(args.rows, args.repeat, args.trials)
+    if args.update_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(current, indent=2) + "\n", encoding="utf-8")
+        print(f"Baseline written to {args.baseline}")  # noqa: T201
+        return
+
+    baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+    if (baseline["rows"], baseline["repeat"]) != (args.rows, args.repeat):
+        print(  # noqa: T201
+            f"warning: the baseline was recorded with --rows {baseline['rows']} --repeat {baseline['repeat']}",
+        )
+    results = compare(baseline, current, args.tolerance)
+
+    print(  # noqa: T201
+        f"calibration: {current['calibration_ms']:.1f} ms (baseline {baseline['calibration_ms']:.1f} ms), "
+        f"median of {args.trials} trials\n",
+    )
+    print(f"{'operation':<28}{'baseline ms':>13}{'current ms':>12}{'change':>9}{'allowed':>9}  status")  # noqa: T201
+    for result in results:
+        if result["status"] == "missing":
+            print(f"{result['operation']:<28}{'':>43}  missing")  # noqa: T201
+            continue
+        print(  # noqa: T201
+            f"{result['operation']:<28}{result['baseline_ms']:>13.2f}{result['current_ms']:>12.2f}"
+            f"{result['change']:>+9.0%}{result['tolerance']:>+9.0%}  {result['status']}",
+        )
+
+    failed = [result["operation"] for result in results if result["status"] in ("REGRESSED", "missing")]
+    if failed:
+        print(f"\nFAIL: {', '.join(failed)}")  # noqa: T201
+        sys.exit(1)
+    print("\nOK")  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
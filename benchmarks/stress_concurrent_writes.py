@@ -0,0 +1,116 @@
+"""Multi-process stress test for concurrent writes to one expense database
+
+Several processes, each with its own ExpenseManager on the same file, add
+expenses at the same time and then race to update one shared expense. The
+run fails if any write is lost, any ID is duplicated, more than one
+process wins an update round, or the change feed's sequence numbers are
+not one per successful write without gaps.
+
+Run from the repository root:
+
+    python -m benchmarks.stress_concurrent_writes [--processes N] [--writes N] [--rounds N]
+"""
+
+import argparse
+import multiprocessing as mp
+import sys
+import tempfile
+from collections import Counter
+from pathlib import Path
+
+SRC_DIR = Path(__file__).resolve().parents[1] / "src"
+sys.path.insert(0, str(SRC_DIR))
+
+from expense_manager import ExpenseConflictError, ExpenseManager  # noqa: E402
+
+
+def _add_worker(db_path, worker, writes, barrier):
+    """Add ``writes`` expenses as fast as possible"""
+    manager = ExpenseManager(db_path)
+    barrier.wait()
+    for index in range(writes):
+        if not manager.add_expense(1.0, f"worker {worker} expense {index}", "Other", "2024-01-01"):
+            raise RuntimeError(f"worker {worker} failed to add expense {index}")
+
+
+def _update_worker(db_path, worker, expense_id, rounds, barrier, results):
+    """Race the other workers to update the same expense once per round"""
+    manager = ExpenseManager(db_path)
+    for _ in range(rounds):
+        version = manager.get_expense_by_id(expense_id)["version"]
+        barrier.wait()
+        try:
+            won = manager.update_expense(expense_id, expected_version=version, description=f"won by {worker}")
+        except ExpenseConflictError:
+            won = False
+        results.put(won)
+        barrier.wait()
+
+
+def _run(target, args_for_worker, processes):
+    """Start one process per worker and wait for all of them"""
+    workers = [mp.Process(target=target, args=args_for_worker(worker)) for worker in range(processes)]
+    for process in workers:
+        process.start()
+    for process in workers:
+        process.join()
+    return [process.exitcode for process in workers]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--processes", type=int, default=8)
+    parser.add_argument("--writes", type=int, default=50, help="expenses added per process")
+    parser.add_argument("--rounds", type=int, default=20, help="update races")
+    args = parser.parse_args()
+
+    failures = []
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = str(Path(tmp) / "expenses.json")
+
+        barrier = mp.Barrier(args.processes)
+        exit_codes = _run(_add_worker, lambda w: (db_path, w, args.writes, barrier), args.processes)
+        if any(exit_codes):
+            failures.append(f"add workers exited with {exit_codes}")
+
+        expenses = ExpenseManager(db_path).get_all_expenses()
+        expected = args.processes * args.writes
+        duplicates = [expense_id for expense_id, n in Counter(e["id"] for e in expenses).items() if n > 1]
+        if len(expenses) != expected:
+            failures.append(f"lost writes: expected {expected} expenses, found {len(expenses)}")
+        if duplicates:
+            failures.append(f"duplicate ids: {duplicates[:10]}")
+
+        expense_id = expenses[0]["id"]
+        results = mp.Queue()
+        barrier = mp.Barrier(args.processes)
+        exit_codes = _run(
+            _update_worker,
+            lambda w: (db_path, w, expense_id, args.rounds, barrier, results),
+            args.processes,
+        )
+        if any(exit_codes):
+            failures.append(f"update workers exited with {exit_codes}")
+
+        wins = sum(results.get() for _ in range(args.processes * args.rounds))
+        final_version = ExpenseManager(db_path).get_expense_by_id(expense_id)["version"]
+        if wins != args.rounds or final_version != args.rounds + 1:
+            failures.append(f"update races: {wins} wins in {args.rounds} rounds, final version {final_version}")
+
+        manager = ExpenseManager(db_path)
+        writes = expected + wins
+        seqs = [event.seq for event in manager.changes.events_since(0)]
+        if seqs != list(range(1, writes + 1)) or manager.data_version != writes:
+            failures.append(f"change feed: {len(seqs)} events for {writes} writes, version {manager.data_version}")
+
+    summary = [
+        f"{args.processes} processes x {args.writes} writes, {args.rounds} update rounds",
+        *(f"FAIL: {failure}" for failure in failures),
+        "OK" if not failures else "",
+    ]
+    print("\n".join(line for line in summary if line))  # noqa: T201
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Time-to-first-render of every page of the Streamlit app
+
+Seeds a ledger of synthetic expenses in a temporary directory, then, for each
+page, starts a fresh Python process that runs the app headless with
+Streamlit's AppTest: the first run renders the Dashboard (the cold start),
+after which the page is selected and its first render is timed. Each page
+gets its own process so that no page benefits from imports or caches warmed
+by another.
+
+Run from the repository root:
+
+    python -m benchmarks.time_to_first_render [--rows N] [--repeat N]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+PAGES = ["Dashboard", "Add Expense", "View Expenses", "Analytics", "Import Data", "Manage Data"]
+
+
+def seed_ledger(directory: Path, rows: int, seed: int = 0):
+    """Write ``rows`` synthetic expenses over the last three years to the app's default ledger path"""
+    # Imported here so that the page processes, which also load this module, start cold
+    from expense_manager import ExpenseManager  # noqa: PLC0415
+    from ledger_generator import generate_expenses, write_ledger  # noqa: PLC0415
+
+    (directory / "src" / "data").mkdir(parents=True)
+    days = 3 * 365
+    start_date = date.today() - timedelta(days=days - 1)  # noqa: DTZ011
+    manager = ExpenseManager(str(directory / "src" / "data" / "expenses.json"))
+    write_ledger(manager, generate_expenses(rows, seed, start_date=start_date, days=days))
+    manager.close()
+
+
+def measure_page(page: str):
+    """Child process: print the cold start and the first render of ``page`` in seconds"""
+    start = time.perf_counter()
+    # Imported here so that importing Streamlit counts towards the cold start
+    from streamlit.testing.v1 import AppTest  # noqa: PLC0415
+
+    app = AppTest.from_file(str(ROOT / "src" / "app.py"), default_timeout=300)
+    app.run()
+    cold_start = time.perf_counter() - start
+
+    first_render = cold_start
+    if page != PAGES[0]:
+        start = time.perf_counter()
+        app.sidebar.selectbox[0].select(page).run()
+        first_render = time.perf_counter() - start
+
+    if app.exception:
+        raise RuntimeError(f"{page} failed: {app.exception[0].value}")
+    print(cold_start, first_render)  # noqa: T201
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--page", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.page:
+        measure_page(args.page)
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        seed_ledger(Path(directory), args.rows)
+
+        print(f"{args.rows} expenses, median of {args.repeat} fresh processes per page\n")  # noqa: T201
+        print(f"{'page':<16}{'cold start s':>14}{'first render s':>16}")  # noqa: T201
+        for page in PAGES:
+            timings = []
+            for _ in range(args.repeat):
+                output = subprocess.run(  # noqa: S603
+                    [sys.executable, "-m", "benchmarks.time_to_first_render", "--page", page],
+                    cwd=directory,
+                    env={**os.environ, "PYTHONPATH": str(ROOT)},
+                    capture_output=True,
+                    text=True,
+                    check=True,
+                )
+                timings.append([float(value) for value in output.stdout.split()[-2:]])
+            cold_start = statistics.median(timing[0] for timing in timings)
+            first_render = statistics.median(timing[1] for timing in timings)
+            print(f"{page:<16}{cold_start:>14.3f}{first_render:>16.3f}")  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
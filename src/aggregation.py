@@ -0,0 +1,266 @@
+"""Map-reduce aggregation of expense amounts over time partitions
+
+Expenses are converted once into numpy columns (amount, month, weekday and
+category code) and sorted by month. The rows are split into partitions of
+whole months; each partition is reduced to per-month and per-weekday sums
+and counts by category, and the partial results are merged. Large inputs
+are reduced in a process pool: the columns are placed in shared memory so
+workers receive only the block names and their row range, never the rows.
+"""
+
+import atexit
+import itertools
+import multiprocessing as mp
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+import config
+
+WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+COLUMN_DTYPES = {
+    "amounts": np.float64,
+    "months": np.int32,
+    "weekdays": np.int8,
+    "categories": np.int32,
+}
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class ExpenseColumns(NamedTuple):
+    """Expenses as parallel numpy columns
+
+    ``months`` counts months since year 0 (``year * 12 + month - 1``),
+    ``weekdays`` runs from 0 (Monday) to 6 and ``categories`` indexes
+    ``category_names``.
+    """
+
+    amounts: np.ndarray
+    months: np.ndarray
+    weekdays: np.ndarray
+    categories: np.ndarray
+    category_names: list[str]
+
+    @classmethod
+    def from_expenses(cls, expenses: list[dict]) -> "ExpenseColumns":
+        """Build the columns from expense records"""
+        return cls.from_frame(pd.DataFrame(expenses, columns=["amount", "date", "category"]))
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "ExpenseColumns":
+        """Build the columns from a DataFrame with amount, date and category columns"""
+        dates = pd.to_datetime(df["date"])
+        codes, names = pd.factorize(df["category"], sort=True)
+        return cls(
+            amounts=df["amount"].to_numpy(dtype=COLUMN_DTYPES["amounts"]),
+            months=(dates.dt.year * 12 + dates.dt.month - 1).to_numpy(dtype=COLUMN_DTYPES["months"]),
+            weekdays=dates.dt.weekday.to_numpy(dtype=COLUMN_DTYPES["weekdays"]),
+            categories=codes.astype(COLUMN_DTYPES["categories"]),
+            category_names=list(names),
+        )
+
+    def __len__(self) -> int:
+        """Number of expenses"""
+        return len(self.amounts)
+
+    def sorted_by_month(self) -> "ExpenseColumns":
+        """The same columns with rows ordered by month"""
+        order = np.argsort(self.months, kind="stable")
+        return ExpenseColumns(
+            self.amounts[order],
+            self.months[order],
+            self.weekdays[order],
+            self.categories[order],
+            self.category_names,
+        )
+
+
+class Aggregates(NamedTuple):
+    """Sums and counts of expense amounts by month and category and by weekday and category
+
+    Row ``i`` of ``month_sums`` and ``month_counts`` is month ``first_month + i``
+    (months counted as in ExpenseColumns); columns follow ``category_names``.
+    """
+
+    first_month: int
+    month_sums: np.ndarray
+    month_counts: np.ndarray
+    weekday_sums: np.ndarray
+    weekday_counts: np.ndarray
+    category_names: list[str]
+
+    def monthly_frame(self) -> pd.DataFrame:
+        """Long-format month_name, category and amount rows for every month and category with expenses"""
+        month_index, codes = np.nonzero(self.month_counts)
+        months = self.first_month + month_index
+        return pd.DataFrame(
+            {
+                "month_name": [
+                    pd.Timestamp(year=month // 12, month=month % 12 + 1, day=1).strftime("%B %Y") for month in months
+                ],
+                "category": [self.category_names[code] for code in codes],
+                "amount": self.month_sums[month_index, codes],
+            },
+        )
+
+
+def aggregate(columns: ExpenseColumns, workers: int | None = None) -> Aggregates:
+    """Aggregate expense columns, in parallel for large inputs
+
+    Args:
+        columns: Expense columns in any row order
+        workers: Worker processes to use (defaults to one per CPU for inputs of at
+            least ``config.PARALLEL_AGGREGATION_MIN_ROWS`` rows, otherwise none)
+
+    Returns:
+        Aggregates: Merged sums and counts
+    """
+    category_count = len(columns.category_names)
+    if len(columns) == 0:
+        empty = np.zeros((0, category_count))
+        return Aggregates(0, empty, empty, np.zeros((7, category_count)), np.zeros((7, category_count)), [])
+
+    if workers is None:
+        workers = (os.cpu_count() or 1) if len(columns) >= config.PARALLEL_AGGREGATION_MIN_ROWS else 1
+
+    columns = columns.sorted_by_month()
+    bounds = _partition_bounds(columns.months, workers * config.PARTITIONS_PER_WORKER)
+
+    if workers == 1:
+        partials = [_aggregate_partition(*columns[:4], start, stop, category_count) for start, stop in bounds]
+    else:
+        partials = _aggregate_in_pool(columns, bounds, workers)
+
+    return _merge(partials, columns, category_count)
+
+
+def _partition_bounds(months: np.ndarray, partitions: int) -> list[tuple[int, int]]:
+    """Split month-sorted rows into about ``partitions`` row ranges of whole months"""
+    month_starts = np.flatnonzero(np.diff(months)) + 1
+    if len(month_starts) == 0:
+        return [(0, len(months))]
+
+    # Cut at the first month boundary at or after each evenly spaced row target
+    targets = np.linspace(0, len(months), partitions + 1)[1:-1]
+    cuts = np.unique(month_starts[np.searchsorted(month_starts, targets).clip(max=len(month_starts) - 1)])
+    edges = [0, *cuts.tolist(), len(months)]
+    return [(start, stop) for start, stop in itertools.pairwise(edges) if start < stop]
+
+
+def _aggregate_partition(
+    amounts: np.ndarray,
+    months: np.ndarray,
+    weekdays: np.ndarray,
+    categories: np.ndarray,
+    start: int,
+    stop: int,
+    category_count: int,
+) -> tuple[int, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Reduce one month-sorted row range to its first month and month/weekday sums and counts"""
+    amounts = amounts[start:stop]
+    months = months[start:stop]
+    weekdays = weekdays[start:stop]
+    categories = categories[start:stop]
+
+    first_month = int(months[0])
+    month_cells = (int(months[-1]) - first_month + 1) * category_count
+    month_keys = (months - first_month) * category_count + categories
+    weekday_keys = weekdays.astype(np.int64) * category_count + categories
+
+    return (
+        first_month,
+        np.bincount(month_keys, weights=amounts, minlength=month_cells).reshape(-1, category_count),
+        np.bincount(month_keys, minlength=month_cells).reshape(-1, category_count),
+        np.bincount(weekday_keys, weights=amounts, minlength=7 * category_count).reshape(7, category_count),
+        np.bincount(weekday_keys, minlength=7 * category_count).reshape(7, category_count),
+    )
+
+
+def _aggregate_shared_partition(blocks: dict[str, str], length: int, start: int, stop: int, category_count: int):
+    """Worker entry point: attach to the shared columns and reduce one row range"""
+    attached = {name: shared_memory.SharedMemory(name=block) for name, block in blocks.items()}
+    try:
+        arrays = {name: np.ndarray((length,), dtype=COLUMN_DTYPES[name], buffer=attached[name].buf) for name in blocks}
+        result = _aggregate_partition(
+            arrays["amounts"],
+            arrays["months"],
+            arrays["weekdays"],
+            arrays["categories"],
+            start,
+            stop,
+            category_count,
+        )
+        # The results are fresh arrays, so nothing refers to the shared buffers once the views are dropped
+        del arrays
+        return result
+    finally:
+        for block in attached.values():
+            block.close()
+
+
+def _aggregate_in_pool(columns: ExpenseColumns, bounds: list[tuple[int, int]], workers: int) -> list[tuple]:
+    """Reduce row ranges in the worker pool, sharing the columns through shared memory"""
+    blocks = {}
+    try:
+        for name in COLUMN_DTYPES:
+            array = getattr(columns, name)
+            block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            blocks[name] = block
+            np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[:] = array
+
+        names = {name: block.name for name, block in blocks.items()}
+        pool = _get_pool(workers)
+        futures = [
+            pool.submit(_aggregate_shared_partition, names, len(columns), start, stop, len(columns.category_names))
+            for start, stop in bounds
+        ]
+        return [future.result() for future in futures]
+    finally:
+        for block in blocks.values():
+            block.close()
+            block.unlink()
+
+
+def _merge(partials: list[tuple], columns: ExpenseColumns, category_count: int) -> Aggregates:
+    """Combine partition results into one set of aggregates"""
+    first_month = int(columns.months[0])
+    month_rows = int(columns.months[-1]) - first_month + 1
+    month_sums = np.zeros((month_rows, category_count))
+    month_counts = np.zeros((month_rows, category_count), dtype=np.int64)
+    weekday_sums = np.zeros((7, category_count))
+    weekday_counts = np.zeros((7, category_count), dtype=np.int64)
+
+    for partition_first_month, sums, counts, partition_weekday_sums, partition_weekday_counts in partials:
+        offset = partition_first_month - first_month
+        month_sums[offset : offset + len(sums)] += sums
+        month_counts[offset : offset + len(counts)] += counts
+        weekday_sums += partition_weekday_sums
+        weekday_counts += partition_weekday_counts
+
+    return Aggregates(first_month, month_sums, month_counts, weekday_sums, weekday_counts, columns.category_names)
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    """Get the shared worker pool of a given size, starting it on first use"""
+    with _pools_lock:
+        if workers not in _pools:
+            context = mp.get_context(config.AGGREGATION_START_METHOD)
+            _pools[workers] = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+        return _pools[workers]
+
+
+@atexit.register
+def shutdown_pools():
+    """Stop the worker pools"""
+    with _pools_lock:
+        while _pools:
+            _, pool = _pools.popitem()
+            pool.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,402 @@
+"""Headless JSON HTTP API for the expense tracker
+
+Exposes ExpenseManager operations over HTTP using only the standard library,
+on the same storage (and the same locking) as the Streamlit app. The ledger is
+chosen with the ``X-Tenant`` header or the ``tenant`` query parameter; without
+either the default ledger is used, and tenants not in ``config.ALLOWED_TENANTS``
+get 404.
+
+Endpoints:
+    GET    /health
+    GET    /expenses?start=&end=&category=&q=&limit=   streamed JSON array (NDJSON with
+                                                        ``Accept: application/x-ndjson``)
+    POST   /expenses                                   add one expense
+    POST   /expenses/batch                             add a JSON array or NDJSON body of expenses
+    GET    /expenses/<id>
+    PATCH  /expenses/<id>                              optional ``version`` for conflict detection
+    DELETE /expenses/<id>
+    GET    /stats
+    GET    /summary/categories
+    GET    /summary/monthly
+    GET    /metrics                                    Prometheus text format (see metrics.py)
+
+Run from the repository root:
+
+    python src/api_server.py [--host HOST] [--port PORT] [--db PATH]
+"""
+
+import argparse
+import json
+import logging
+import re
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import config
+import slow_query_log
+from expense_manager import ExpenseConflictError, ExpenseManager
+from instrumentation import recorder
+from metrics import CONTENT_TYPE, render_metrics
+from storage.tenant_pool import TenantNotAllowedError, TenantPool, tenant_db_path
+from structured_logging import configure_logging
+from utils.datetime_conversion import convert_to_standard_date
+
+UPDATABLE_FIELDS = {"amount", "description", "category", "date"}
+
+logger = logging.getLogger(__name__)
+
+
+class ApiError(Exception):
+    """Error returned to the client with an HTTP status"""
+
+    def __init__(self, status: HTTPStatus, message: str):
+        """Record the status and message"""
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def _json_default(value):
+    """Serialize numpy scalars and timestamps returned by pandas aggregations"""
+    if hasattr(value, "item"):
+        return value.item()
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _dumps(value) -> bytes:
+    """Encode a value as compact JSON"""
+    return json.dumps(value, default=_json_default, separators=(",", ":")).encode("utf-8")
+
+
+def _date_param(params: dict, name: str) -> str | None:
+    """Date query parameter as YYYY-MM-DD, refusing dates that cannot be parsed"""
+    value = params.get(name)
+    if value is None:
+        return None
+    try:
+        return convert_to_standard_date(value)
+    except ValueError:
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"Invalid {name} date: {value!r}") from None
+
+
+def _limit_param(params: dict) -> int | None:
+    """Limit query parameter, refusing values that are not a count"""
+    value = params.get("limit")
+    if value is None:
+        return None
+    try:
+        limit = int(value)
+    except ValueError:
+        limit = -1
+    if limit < 0:
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"Invalid limit: {value!r}")
+    return limit
+
+
+class ExpenseAPIServer(ThreadingHTTPServer):
+    """Threaded HTTP server holding the default manager and the tenant pool"""
+
+    daemon_threads = True
+
+    def __init__(self, address: tuple[str, int], manager: ExpenseManager, access_log: bool = False):
+        """Bind the server and set up the ledgers it serves"""
+        super().__init__(address, ExpenseAPIHandler)
+        self.manager = manager
+        self.tenant_pool = TenantPool(ExpenseManager.for_tenant)
+        self.access_log = access_log
+
+    def manager_for(self, tenant_id: str | None) -> ExpenseManager:
+        """Get the manager of a tenant, or the default manager"""
+        return self.tenant_pool.get(tenant_id) if tenant_id else self.manager
+
+    def server_close(self):
+        """Close the listening socket and every open ledger"""
+        super().server_close()
+        self.tenant_pool.close_all()
+
+
+class ExpenseAPIHandler(BaseHTTPRequestHandler):
+    """Request handler routing HTTP requests to ExpenseManager methods"""
+
+    protocol_version = "HTTP/1.1"
+    server: ExpenseAPIServer
+
+    ROUTES = [
+        ("GET", re.compile(r"/health"), "_get_health"),
+        ("GET", re.compile(r"/expenses"), "_list_expenses"),
+        ("POST", re.compile(r"/expenses"), "_add_expense"),
+        ("POST", re.compile(r"/expenses/batch"), "_add_expenses"),
+        ("GET", re.compile(r"/expenses/(\d+)"), "_get_expense"),
+        ("PATCH", re.compile(r"/expenses/(\d+)"), "_update_expense"),
+        ("DELETE", re.compile(r"/expenses/(\d+)"), "_delete_expense"),
+        ("GET", re.compile(r"/stats"), "_get_stats"),
+        ("GET", re.compile(r"/summary/categories"), "_get_category_summary"),
+        ("GET", re.compile(r"/summary/monthly"), "_get_monthly_summary"),
+        ("GET", re.compile(r"/metrics"), "_get_metrics"),
+    ]
+
+    def do_GET(self):
+        """Handle GET requests"""
+        self._dispatch("GET")
+
+    def do_POST(self):
+        """Handle POST requests"""
+        self._dispatch("POST")
+
+    def do_PATCH(self):
+        """Handle PATCH requests"""
+        self._dispatch("PATCH")
+
+    def do_DELETE(self):
+        """Handle DELETE requests"""
+        self._dispatch("DELETE")
+
+    def log_message(self, format, *args):
+        """Only log requests when the access log is enabled"""
+        if self.server.access_log:
+            super().log_message(format, *args)
+
+    def _dispatch(self, method: str):
+        """Route a request and translate errors into JSON responses"""
+        url = urlsplit(self.path)
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        # Set once a streamed response has sent its headers, after which errors can no longer be reported
+        self._streaming = False
+
+        try:
+            handler, path_args = self._route(method, url.path)
+            manager = self.server.manager_for(self.headers.get("X-Tenant") or params.pop("tenant", None))
+            handler(manager, params, *path_args)
+
+        except ApiError as e:
+            self._send_json(e.status, {"error": e.message})
+        except ExpenseConflictError as e:
+            self._send_json(HTTPStatus.CONFLICT, {"error": str(e), "current_version": e.current_version})
+        except TenantNotAllowedError as e:
+            self._send_json(HTTPStatus.NOT_FOUND, {"error": str(e)})
+        except ValueError as e:
+            self._send_json(HTTPStatus.BAD_REQUEST, {"error": str(e)})
+        except Exception:
+            logger.exception("Error handling %s %s", method, url.path)
+            if self._streaming:
+                # Cut the chunked response short, so that the client sees it is incomplete
+                self.close_connection = True
+            else:
+                self._send_json(HTTPStatus.INTERNAL_SERVER_ERROR, {"error": "Internal server error"})
+
+    def _route(self, method: str, path: str):
+        """Find the endpoint method and path arguments for a request"""
+        routes = [(route, route[1].fullmatch(path)) for route in self.ROUTES]
+        routes = [(route, match) for route, match in routes if match]
+        if not routes:
+            raise ApiError(HTTPStatus.NOT_FOUND, f"No route for {path}")
+
+        for (route_method, _, name), match in routes:
+            if route_method == method:
+                return getattr(self, name), match.groups()
+
+        raise ApiError(HTTPStatus.METHOD_NOT_ALLOWED, f"{method} is not allowed on {path}")
+
+    # Request and response helpers
+
+    def _read_body(self) -> bytes:
+        """Read the request body, enforcing the size limit"""
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > config.API_MAX_BODY_BYTES:
+            raise ApiError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Request body too large")
+        return self.rfile.read(length)
+
+    def _read_json(self):
+        """Parse the request body as JSON"""
+        try:
+            return json.loads(self._read_body() or b"null")
+        except json.JSONDecodeError as e:
+            raise ApiError(HTTPStatus.BAD_REQUEST, f"Invalid JSON body: {e}") from e
+
+    def _read_records(self) -> list[dict]:
+        """Parse a JSON array or NDJSON body into a list of objects"""
+        if self.headers.get("Content-Type", "").startswith("application/x-ndjson"):
+            try:
+                records = [json.loads(line) for line in self._read_body().splitlines() if line.strip()]
+            except json.JSONDecodeError as e:
+                raise ApiError(HTTPStatus.BAD_REQUEST, f"Invalid NDJSON body: {e}") from e
+        else:
+            records = self._read_json()
+
+        if not isinstance(records, list) or not all(isinstance(record, dict) for record in records):
+            raise ApiError(HTTPStatus.BAD_REQUEST, "Expected a JSON array of objects")
+        return records
+
+    def _send_json(self, status: HTTPStatus, payload):
+        """Send a complete JSON response"""
+        body = _dumps(payload)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _write_chunk(self, data: bytes):
+        """Write one chunk of a chunked response"""
+        if data:
+            self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+
+    # Endpoints
+
+    def _get_health(self, manager, params):
+        """Liveness check"""
+        self._send_json(HTTPStatus.OK, {"status": "ok"})
+
+    def _list_expenses(self, manager, params):
+        """Stream matching expenses without building the full response in memory"""
+        limit = _limit_param(params)
+        query = params.get("q", "").lower()
+        # Checked before the headers are sent, as the batches are only read while streaming
+        batches = manager.iter_expense_batches(
+            config.API_STREAM_BATCH_SIZE,
+            start_date=_date_param(params, "start"),
+            end_date=_date_param(params, "end"),
+            category=params.get("category"),
+        )
+        ndjson = "application/x-ndjson" in self.headers.get("Accept", "")
+
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "application/x-ndjson" if ndjson else "application/json")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        self._streaming = True
+
+        sent = 0
+        if not ndjson:
+            self._write_chunk(b"[")
+        for batch in batches:
+            if query:
+                batch = [expense for expense in batch if query in expense["description"].lower()]  # noqa: PLW2901
+            if limit is not None:
+                batch = batch[: limit - sent]  # noqa: PLW2901
+            if batch:
+                if ndjson:
+                    self._write_chunk(b"".join(_dumps(expense) + b"\n" for expense in batch))
+                else:
+                    self._write_chunk((b"," if sent else b"") + b",".join(_dumps(expense) for expense in batch))
+                sent += len(batch)
+            if limit is not None and sent >= limit:
+                break
+        if not ndjson:
+            self._write_chunk(b"]")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _add_expense(self, manager, params):
+        """Add one expense, validated like an imported row"""
+        record = self._read_json()
+        if not isinstance(record, dict):
+            raise ApiError(HTTPStatus.BAD_REQUEST, "Expected a JSON object")
+
+        result = manager.import_records([record])
+        if result["rejected"]:
+            raise ApiError(HTTPStatus.BAD_REQUEST, result["rejected"][0]["reason"])
+        self._send_json(HTTPStatus.CREATED, {"imported": result["imported"]})
+
+    def _add_expenses(self, manager, params):
+        """Add many expenses, one database write per import chunk"""
+        result = manager.import_records(self._read_records())
+        self._send_json(HTTPStatus.OK, result)
+
+    def _get_expense(self, manager, params, expense_id):
+        """Get one expense"""
+        expense = manager.get_expense_by_id(int(expense_id))
+        if expense is None:
+            raise ApiError(HTTPStatus.NOT_FOUND, f"Expense {expense_id} not found")
+        self._send_json(HTTPStatus.OK, expense)
+
+    def _update_expense(self, manager, params, expense_id):
+        """Update fields of one expense, validated like the fields of an added expense"""
+        fields = self._read_json()
+        if not isinstance(fields, dict):
+            raise ApiError(HTTPStatus.BAD_REQUEST, "Expected a JSON object")
+
+        unknown = set(fields) - UPDATABLE_FIELDS - {"version"}
+        if unknown:
+            raise ApiError(HTTPStatus.BAD_REQUEST, f"Unknown fields: {', '.join(sorted(unknown))}")
+
+        version = fields.pop("version", None)
+        if not fields:
+            raise ApiError(HTTPStatus.BAD_REQUEST, f"Expected at least one of: {', '.join(sorted(UPDATABLE_FIELDS))}")
+        fields = manager.validate_expense_fields(fields)
+        if not manager.update_expense(int(expense_id), expected_version=version, **fields):
+            raise ApiError(HTTPStatus.NOT_FOUND, f"Expense {expense_id} not found")
+        self._send_json(HTTPStatus.OK, manager.get_expense_by_id(int(expense_id)))
+
+    def _delete_expense(self, manager, params, expense_id):
+        """Delete one expense"""
+        if not manager.delete_expense(int(expense_id)):
+            raise ApiError(HTTPStatus.NOT_FOUND, f"Expense {expense_id} not found")
+        self.send_response(HTTPStatus.NO_CONTENT)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def _get_stats(self, manager, params):
+        """Whole-ledger statistics"""
+        self._send_json(HTTPStatus.OK, manager.get_statistics())
+
+    def _get_category_summary(self, manager, params):
+        """Totals, counts and averages per category"""
+        self._send_json(HTTPStatus.OK, manager.get_category_summary())
+
+    def _get_monthly_summary(self, manager, params):
+        """Spending per month and category"""
+        summary = manager.get_monthly_summary()
+        self._send_json(HTTPStatus.OK, summary.to_dict(orient="index") if not summary.empty else {})
+
+    def _get_metrics(self, manager, params):
+        """Counters, histograms and gauges of the server process and the ledgers it has open"""
+        ledgers = {"default": self.server.manager.db_path}
+        for tenant_id in self.server.tenant_pool.tenant_ids():
+            ledgers[f"tenant:{tenant_id}"] = tenant_db_path(tenant_id)
+        body = render_metrics(ledgers, caches={"tenant_pool": self.server.tenant_pool}).encode("utf-8")
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def create_server(
+    host: str = config.API_HOST,
+    port: int = config.API_PORT,
+    db_path: str | None = None,
+    access_log: bool = False,
+) -> ExpenseAPIServer:
+    """Create an API server on the given address and default ledger"""
+    manager = ExpenseManager(db_path) if db_path else ExpenseManager(str(config.DATABASE_FILE))
+    return ExpenseAPIServer((host, port), manager, access_log=access_log)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless JSON HTTP API for the expense tracker")
+    parser.add_argument("--host", default=config.API_HOST)
+    parser.add_argument("--port", type=int, default=config.API_PORT)
+    parser.add_argument("--db", help="default ledger file (defaults to config.DATABASE_FILE)")
+    parser.add_argument("--access-log", action="store_true", help="log every request to stderr")
+    args = parser.parse_args()
+
+    config.ensure_directories()
+    configure_logging()
+    slow_query_log.enable()
+    # Record method latencies for GET /metrics
+    recorder.enabled = True
+    server = create_server(args.host, args.port, args.db, access_log=args.access_log)
+    print(f"Serving expense API on http://{args.host}:{server.server_address[1]}", flush=True)  # noqa: T201
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,21 +2,45 @@
 A comprehensive expense management application with data visualization and analytics
 """
 
+import importlib
 import sys
 from pathlib import Path
 
 import streamlit as st
 
-from src.ui.add_expense import show_add_expense
-from src.ui.analytics import show_analytics
-from src.ui.dashboard import show_dashboard
-from src.ui.manage_data import show_manage_data
-from src.ui.view_expenses import show_view_expenses
-
 # Add the current directory to Python path for imports
 sys.path.append(str(Path(__file__).resolve().parent))
 
+import config
+import slow_query_log
+from background_jobs import JobRunner
 from expense_manager import ExpenseManager
+from memory_profiling import memory_profiler
+from storage.tenant_pool import TenantNotAllowedError, TenantPool, tenant_db_path
+from structured_logging import configure_logging
+
+# Page modules, imported when a page is first shown so that pandas, plotly and the other libraries
+# they use are not loaded before the sidebar has rendered
+PAGE_MODULES = {
+    "Dashboard": "src.ui.dashboard",
+    "Add Expense": "src.ui.add_expense",
+    "View Expenses": "src.ui.view_expenses",
+    "Analytics": "src.ui.analytics",
+    "Import Data": "src.ui.import_data",
+    "Manage Data": "src.ui.manage_data",
+}
+
+# Pages left out of the sidebar unless the ``debug`` query parameter is set (e.g. ?debug=1)
+HIDDEN_PAGE_MODULES = {
+    "Performance": "src.ui.performance",
+}
+
+# Create the data, export and log directories, and start logging, on startup
+config.ensure_directories()
+configure_logging()
+slow_query_log.enable()
+if config.MEMORY_PROFILING_ENABLED:
+    memory_profiler.start()
 
 # Page configuration
 st.set_page_config(
@@ -61,10 +85,72 @@ st.markdown(
     unsafe_allow_html=True,
 )
 
-# Initialize session state
-if "expense_manager" not in st.session_state:
-    st.session_state.expense_manager = ExpenseManager()
 
+def load_page(page):
+    """Import the module of a page (cached by Python after the first time)"""
+    return importlib.import_module({**PAGE_MODULES, **HIDDEN_PAGE_MODULES}[page])
+
+
+@st.cache_resource
+def get_tenant_pool():
+    """Process-wide pool of per-tenant expense managers, shared by all sessions"""
+    return TenantPool(ExpenseManager.for_tenant)
+
+
+@st.cache_resource
+def get_job_runner():
+    """Process-wide background job runner, so sessions share computed analytics"""
+    return JobRunner()
+
+
+@st.cache_resource
+def get_metrics_exporter():
+    """Process-wide Prometheus metrics endpoint and/or textfile writer (None unless configured in config.py)"""
+    if config.METRICS_PORT is None and config.METRICS_TEXTFILE is None:
+        return None
+
+    from metrics import MetricsExporter, render_metrics  # noqa: PLC0415
+
+    # Resolved here, on the script thread, because the exporter collects on its own threads
+    tenant_pool = get_tenant_pool()
+    caches = {"background_jobs": get_job_runner(), "tenant_pool": tenant_pool}
+    # The sessions' default ledger (opening a manager does no I/O until it is used)
+    default_db_path = ExpenseManager().db_path
+
+    def collect():
+        ledgers = {"default": default_db_path}
+        ledgers.update({f"tenant:{tenant_id}": tenant_db_path(tenant_id) for tenant_id in tenant_pool.tenant_ids()})
+        return render_metrics(ledgers, caches)
+
+    exporter = MetricsExporter(collect)
+    if config.METRICS_PORT is not None:
+        exporter.serve(config.METRICS_PORT)
+    if config.METRICS_TEXTFILE is not None:
+        exporter.write_periodically(config.METRICS_TEXTFILE)
+    return exporter
+
+
+def get_expense_manager():
+    """Get the expense manager of the ledger selected by the ``tenant`` query parameter
+
+    Tenant managers are fetched from the pool on every rerun rather than kept in
+    session state, because the pool may close them while the session is idle.
+    Tenants not in ``config.ALLOWED_TENANTS`` are refused and the page stops.
+    """
+    tenant_id = st.query_params.get("tenant")
+    if tenant_id:
+        try:
+            return get_tenant_pool().get(tenant_id)
+        except TenantNotAllowedError as e:
+            st.error(str(e))
+            st.stop()
+
+    if "expense_manager" not in st.session_state:
+        st.session_state.expense_manager = ExpenseManager()
+    return st.session_state.expense_manager
+
+
+# Initialize session state
 if "show_success" not in st.session_state:
     st.session_state.show_success = False
 
@@ -83,18 +169,23 @@ def show_error_message(message):
     st.error(message)
 
 
+def available_pages():
+    """Pages listed in the sidebar, including the hidden ones when the ``debug`` query parameter is set"""
+    if st.query_params.get("debug"):
+        return [*PAGE_MODULES, *HIDDEN_PAGE_MODULES]
+    return list(PAGE_MODULES)
+
+
 def main():
     """Main application function"""
+    get_metrics_exporter()
 
     # Header
     st.markdown('<h1 class="main-header">💰 Personal Expense Tracker</h1>', unsafe_allow_html=True)
 
     # Sidebar navigation
     st.sidebar.title("Navigation")
-    page = st.sidebar.selectbox(
-        "Choose a page",
-        ["Dashboard", "Add Expense", "View Expenses", "Analytics", "Manage Data"],
-    )
+    page = st.sidebar.selectbox("Choose a page", available_pages())
 
     # Add some spacing before footer
     st.sidebar.markdown("<br>" * 10, unsafe_allow_html=True)
@@ -110,36 +201,51 @@ def main():
         st.session_state.show_success = False
 
     # Route to different pages
-    manager = st.session_state.expense_manager
+    if page == "Performance":
+        load_page(page).show_performance()
+        return
+
+    try:
+        manager = get_expense_manager()
+    except ValueError as e:
+        show_error_message(str(e))
+        return
     if page == "Dashboard":
         # manager = st.session_state.expense_manager
-        show_dashboard(
+        load_page(page).show_dashboard(
             manager=manager,
             show_error_message=show_error_message,
             show_success_message=show_success_message,
         )
     elif page == "Add Expense":
         # manager = st.session_state.expense_manager
-        show_add_expense(
+        load_page(page).show_add_expense(
             manager=manager,
             show_error_message=show_error_message,
             show_success_message=show_success_message,
         )
     elif page == "View Expenses":
         # manager = st.session_state.expense_manager
-        show_view_expenses(
+        load_page(page).show_view_expenses(
             manager=manager,
             show_error_message=show_error_message,
             show_success_message=show_success_message,
         )
     elif page == "Analytics":
         # manager = st.session_state.expense_manager
-        show_analytics(
+        load_page(page).show_analytics(
+            manager=manager,
+            runner=get_job_runner(),
+        )
+    elif page == "Import Data":
+        load_page(page).show_import_data(
             manager=manager,
+            show_error_message=show_error_message,
+            show_success_message=show_success_message,
         )
     elif page == "Manage Data":
         # manager = st.session_state.expense_manager
-        show_manage_data(
+        load_page(page).show_manage_data(
             manager=manager,
             show_error_message=show_error_message,
             show_success_message=show_success_message,
@@ -693,4 +799,6 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    # A no-op unless memory profiling is on
+    with memory_profiler.session(st.session_state):
+        main()
@@ -0,0 +1,171 @@
+"""Asyncio facade over ExpenseManager
+
+Every call runs on a bounded thread pool so the event loop never blocks on
+file I/O or JSON parsing. Identical reads that overlap in time share one
+computation; a write starts a new generation so later reads never reuse a
+result computed before it.
+"""
+
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Self
+
+import config
+from expense_manager import ExpenseManager
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+class AsyncExpenseManager:
+    """Awaitable versions of the ExpenseManager add, query, aggregate and export methods
+
+    Results of coalesced reads are shared between all awaiting callers, so
+    treat returned lists and DataFrames as read-only. An instance must be used
+    from a single event loop.
+    """
+
+    def __init__(
+        self,
+        manager: ExpenseManager | None = None,
+        max_workers: int = config.ASYNC_MAX_WORKERS,
+    ):
+        """Wrap an expense manager, creating one on the default database if not given"""
+        self.manager = manager if manager is not None else ExpenseManager()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="expense-io")
+        # Bounds submitted work so excess calls wait on the loop instead of piling up in the pool queue
+        self._slots = asyncio.Semaphore(max_workers)
+        self._inflight = {}
+        self.coalesced_reads = 0
+
+    async def __aenter__(self) -> Self:
+        """Use the facade as an async context manager"""
+        return self
+
+    async def __aexit__(self, *exc_info):
+        """Shut the executor down on exit"""
+        await self.aclose()
+
+    async def aclose(self):
+        """Wait for running calls and shut the executor down"""
+        await asyncio.get_running_loop().run_in_executor(None, functools.partial(self._executor.shutdown, wait=True))
+
+    async def _run(self, method_name: str, *args, **kwargs):
+        """Run a manager method on the executor"""
+        method = getattr(self.manager, method_name)
+        async with self._slots:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, functools.partial(method, *args, **kwargs))
+
+    async def _read(self, method_name: str, *args, **kwargs):
+        """Run a read, sharing the result with identical reads already in flight"""
+        key = (method_name, args, tuple(sorted(kwargs.items())))
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self._run(method_name, *args, **kwargs))
+            self._inflight[key] = future
+            future.add_done_callback(functools.partial(self._forget, key))
+        else:
+            self.coalesced_reads += 1
+
+        # Shielded so one cancelled caller does not cancel the read for the others
+        return await asyncio.shield(future)
+
+    def _forget(self, key: tuple, future: asyncio.Future):
+        """Drop a finished read from the in-flight table, unless a newer read replaced it"""
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+
+    async def _write(self, method_name: str, *args, **kwargs):
+        """Run a write; reads issued afterwards will not join reads started before it"""
+        self._inflight.clear()
+        return await self._run(method_name, *args, **kwargs)
+
+    # Writes
+
+    async def add_expense(self, amount: float, description: str, category: str, date: str | None = None) -> bool:
+        """Add a new expense to the database"""
+        return await self._write("add_expense", amount, description, category, date)
+
+    async def add_expenses(self, expenses: list[dict]) -> int:
+        """Add multiple expenses in a single write"""
+        return await self._write("add_expenses", expenses)
+
+    async def update_expense(self, expense_id: int, expected_version: int | None = None, **kwargs) -> bool:
+        """Update an expense by ID"""
+        return await self._write("update_expense", expense_id, expected_version=expected_version, **kwargs)
+
+    async def delete_expense(self, expense_id: int) -> bool:
+        """Delete an expense by ID"""
+        return await self._write("delete_expense", expense_id)
+
+    async def import_csv(self, path_or_buffer, chunk_size: int = config.IMPORT_CHUNK_SIZE) -> dict:
+        """Import expenses from a CSV file"""
+        return await self._write("import_csv", path_or_buffer, chunk_size=chunk_size)
+
+    # Queries
+
+    async def get_all_expenses(self) -> list[dict]:
+        """Get all expenses"""
+        return await self._read("get_all_expenses")
+
+    async def get_expense_by_id(self, expense_id: int) -> dict | None:
+        """Get a specific expense by ID"""
+        return await self._read("get_expense_by_id", expense_id)
+
+    async def get_expenses_by_category(self, category: str) -> list[dict]:
+        """Get expenses filtered by category"""
+        return await self._read("get_expenses_by_category", category)
+
+    async def get_expenses_by_date_range(self, start_date: str, end_date: str) -> list[dict]:
+        """Get expenses within a date range"""
+        return await self._read("get_expenses_by_date_range", start_date, end_date)
+
+    async def get_expenses_by_month(self, year: int, month: int) -> list[dict]:
+        """Get expenses for a specific month"""
+        return await self._read("get_expenses_by_month", year, month)
+
+    async def get_recent_expenses(self, limit: int = 10) -> list[dict]:
+        """Get most recent expenses"""
+        return await self._read("get_recent_expenses", limit)
+
+    async def search_expenses(self, query: str) -> list[dict]:
+        """Search expenses by description"""
+        return await self._read("search_expenses", query)
+
+    async def get_available_categories(self) -> list[str]:
+        """Get list of all categories"""
+        return await self._read("get_available_categories")
+
+    # Aggregates
+
+    async def get_total_expenses(self) -> float:
+        """Get total amount of all expenses"""
+        return await self._read("get_total_expenses")
+
+    async def get_category_summary(self) -> dict[str, dict[str, float | int]]:
+        """Get summary statistics by category"""
+        return await self._read("get_category_summary")
+
+    async def get_monthly_summary(self) -> "pd.DataFrame":
+        """Get monthly expense summary as DataFrame"""
+        return await self._read("get_monthly_summary")
+
+    async def get_statistics(self) -> dict:
+        """Get comprehensive expense statistics"""
+        return await self._read("get_statistics")
+
+    async def get_expenses_dataframe(self) -> "pd.DataFrame":
+        """Get all expenses as a pandas DataFrame"""
+        return await self._read("get_expenses_dataframe")
+
+    # Exports (each call writes its own file, so they are not coalesced)
+
+    async def export_to_csv(self, filename: str | None = None, **filters) -> str | None:
+        """Export expenses to a CSV file"""
+        return await self._run("export_to_csv", filename, **filters)
+
+    async def export_to_parquet(self, filename: str | None = None, **filters) -> str | None:
+        """Export expenses to a Parquet file"""
+        return await self._run("export_to_parquet", filename, **filters)
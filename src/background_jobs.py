@@ -0,0 +1,203 @@
+"""Background jobs with progress reporting, cancellation and a shared result cache
+
+Heavy computations run on a thread pool instead of the Streamlit script
+thread. A job is identified by a key (typically the data version plus the
+parameters it was computed for): jobs with the same key are shared between
+sessions while they run, and their results are kept in an LRU cache
+afterwards. Each session submits as an owner; when an owner submits a new
+job, the job it was previously waiting on is cancelled unless another
+session is still waiting on it.
+"""
+
+import threading
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import config
+
+
+class JobCancelledError(Exception):
+    """Raised inside a job when it was cancelled by a newer submission"""
+
+
+class Job:
+    """A running or finished background computation
+
+    The job function receives the Job as its first argument and calls
+    ``report`` to publish progress and partial results; ``partial`` also
+    holds the complete result once the job has finished. ``report`` raises
+    JobCancelledError once the job is cancelled, so the function stops at
+    its next checkpoint.
+    """
+
+    def __init__(self, key: Hashable):
+        """Initialize a job that has not reported progress yet"""
+        self.key = key
+        self.future = Future()
+        self.progress = 0.0
+        self.message = ""
+        self.partial = {}
+        self.owners = set()
+        self._cancelled = threading.Event()
+
+    @classmethod
+    def completed(cls, key: Hashable, result: dict) -> "Job":
+        """A finished job holding a cached result"""
+        job = cls(key)
+        job.progress = 1.0
+        job.partial = dict(result)
+        job.future.set_result(result)
+        return job
+
+    @property
+    def cancelled(self) -> bool:
+        """Whether the job was cancelled"""
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        """Ask the job to stop at its next checkpoint"""
+        self._cancelled.set()
+        self.future.cancel()
+
+    def report(self, progress: float, message: str = "", **partial):
+        """Publish progress and partial results
+
+        Args:
+            progress: Fraction of the work done, between 0 and 1
+            message: Short description of the current step
+            **partial: Results that are ready to be shown before the job finishes
+
+        Raises:
+            JobCancelledError: If the job was cancelled
+        """
+        if self.cancelled:
+            raise JobCancelledError(self.key)
+
+        self.partial.update(partial)
+        self.progress = progress
+        self.message = message
+
+    def done(self) -> bool:
+        """Whether the job finished, failed or was cancelled"""
+        return self.future.done()
+
+    def result(self, timeout: float | None = None) -> dict:
+        """Wait for and return the job's result"""
+        return self.future.result(timeout)
+
+
+class JobRunner:
+    """Thread pool running keyed jobs, with in-flight sharing and an LRU result cache"""
+
+    def __init__(
+        self,
+        max_workers: int = config.BACKGROUND_MAX_WORKERS,
+        cache_size: int = config.BACKGROUND_CACHE_SIZE,
+    ):
+        """Initialize the runner with an empty cache"""
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="background-job")
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()
+        self._inflight = {}
+        self._owner_jobs = {}
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+        self.cancellations = 0
+
+    def submit(self, key: Hashable, fn: Callable[..., dict], *args, owner: Hashable | None = None, **kwargs) -> Job:
+        """Get the job for a key, starting ``fn(job, *args, **kwargs)`` if it is neither cached nor running
+
+        Args:
+            key: Identifies the computation, e.g. the data version and parameters
+            fn: Job function; it returns a dict result and reports progress through the job
+            owner: Session submitting the job; its previous job is cancelled if nobody else waits on it
+
+        Returns:
+            Job: A finished job for cached results, otherwise the running job
+        """
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                job = Job.completed(key, self._cache[key])
+            else:
+                job = self._inflight.get(key)
+                if job is None or job.cancelled:
+                    self.misses += 1
+                    job = Job(key)
+                    self._inflight[key] = job
+                    self._executor.submit(self._run, job, fn, args, kwargs)
+
+            if owner is not None:
+                self._switch_owner(owner, job)
+            return job
+
+    def stats(self) -> dict:
+        """Get cache size and hit/miss/cancellation counters"""
+        with self._lock:
+            return {
+                "cached": len(self._cache),
+                "running": len(self._inflight),
+                "hits": self.hits,
+                "misses": self.misses,
+                "cancellations": self.cancellations,
+            }
+
+    def clear(self):
+        """Drop all cached results"""
+        with self._lock:
+            self._cache.clear()
+
+    def shutdown(self):
+        """Cancel running jobs and stop the pool"""
+        with self._lock:
+            for job in self._inflight.values():
+                job.cancel()
+        self._executor.shutdown(wait=True)
+
+    def _switch_owner(self, owner: Hashable, job: Job):
+        """Move an owner to a new job, cancelling its previous job if it was the last owner"""
+        previous = self._owner_jobs.get(owner)
+        if previous is not None and previous is not job:
+            previous.owners.discard(owner)
+            if not previous.owners and not previous.done():
+                previous.cancel()
+                self.cancellations += 1
+
+        job.owners.add(owner)
+        self._owner_jobs[owner] = job
+
+    def _run(self, job: Job, fn: Callable[..., dict], args: tuple, kwargs: dict):
+        """Run a job function on a worker thread and cache its result"""
+        try:
+            if job.cancelled:
+                raise JobCancelledError(job.key)  # noqa: TRY301
+            result = fn(job, *args, **kwargs)
+        except BaseException as e:
+            self._finish(job)
+            if not job.future.done():
+                job.future.set_exception(e)
+            return
+
+        job.partial.update(result)
+        job.progress = 1.0
+        self._finish(job, result)
+        if not job.future.done():
+            job.future.set_result(result)
+
+    def _finish(self, job: Job, result: dict | None = None):
+        """Remove a finished job from the in-flight table and cache its result"""
+        with self._lock:
+            if self._inflight.get(job.key) is job:
+                del self._inflight[job.key]
+            # Finished jobs can no longer be cancelled, so their owners need not be tracked
+            for owner in job.owners:
+                if self._owner_jobs.get(owner) is job:
+                    del self._owner_jobs[owner]
+            if result is not None and not job.cancelled:
+                self._cache[job.key] = result
+                self._cache.move_to_end(job.key)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
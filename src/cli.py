@@ -0,0 +1,290 @@
+"""Command-line interface over ExpenseManager
+
+Works on the same ledgers (and with the same locking) as the Streamlit app
+and the API server, and composes with shell pipelines: ``query`` and
+``export --format jsonl`` print one JSON expense per line, ``import`` reads
+CSV or JSON lines from a file or from stdin (``-``), and the other commands
+print one JSON object (or one per line for ``stats --by``). Streamlit and
+Plotly are never imported, and pandas only by the commands that need it
+(``import``, ``stats --by month``, ``export --format parquet``, ``check``),
+so that adding, querying and exporting start quickly.
+
+Commands:
+    add AMOUNT DESCRIPTION [--category C] [--date D]
+    import FILE|- [--format csv|jsonl]
+    query [--start D] [--end D] [--category C] [--search TEXT] [--limit N]
+    stats [--by category|month]
+    export [--format jsonl|csv|parquet] [--output PATH] [--start D] [--end D] [--category C]
+    compact [--keep-events N]
+    check                                    exits with status 1 if problems were found
+
+Run from the repository root:
+
+    python -m src.cli [--db PATH | --tenant ID] COMMAND ...
+
+For example, to copy the expenses of 2024 into another ledger:
+
+    python -m src.cli query --start 2024-01-01 --end 2024-12-31 | python -m src.cli --db /tmp/2024.json import -
+"""
+
+import argparse
+import json
+import os
+import sys
+from collections.abc import Iterable
+from pathlib import Path
+
+# Add the source directory to the Python path, for ``python -m src.cli``
+sys.path.append(str(Path(__file__).resolve().parent))
+
+import config
+from expense_manager import ExpenseManager
+from structured_logging import configure_logging
+from utils.datetime_conversion import convert_to_standard_date
+
+
+def _json_default(value):
+    """Serialize numpy scalars returned by pandas validation and aggregations"""
+    if hasattr(value, "item"):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _dumps(value) -> str:
+    """Encode a value as compact JSON"""
+    return json.dumps(value, default=_json_default, separators=(",", ":"))
+
+
+def _print_json(value):
+    """Write a value to stdout as one JSON line"""
+    sys.stdout.write(_dumps(value) + "\n")
+
+
+def _write_jsonl(batches: Iterable[list[dict]], search: str | None = None, limit: int | None = None) -> int:
+    """Write expense batches to stdout as JSON lines, returning how many were written"""
+    query = (search or "").lower()
+    written = 0
+    for batch in batches:
+        if query:
+            batch = [expense for expense in batch if query in expense["description"].lower()]  # noqa: PLW2901
+        if limit is not None:
+            batch = batch[: limit - written]  # noqa: PLW2901
+        sys.stdout.write("".join(_dumps(expense) + "\n" for expense in batch))
+        written += len(batch)
+        if limit is not None and written >= limit:
+            break
+    return written
+
+
+def _amount(value: str) -> float:
+    """Argument type of an expense amount within the configured limits"""
+    try:
+        amount = float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid amount: {value!r}") from None
+    if not config.MIN_EXPENSE_AMOUNT <= amount <= config.MAX_EXPENSE_AMOUNT:
+        raise argparse.ArgumentTypeError(
+            f"amount must be between {config.MIN_EXPENSE_AMOUNT} and {config.MAX_EXPENSE_AMOUNT}",
+        )
+    return amount
+
+
+def _date(value: str) -> str:
+    """Argument type of a date in any supported format, as YYYY-MM-DD"""
+    try:
+        return convert_to_standard_date(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid date: {value!r}") from None
+
+
+def add(manager: ExpenseManager, args: argparse.Namespace) -> int:
+    """Add one expense, validated as an imported row is"""
+    fields = {"amount": args.amount, "description": args.description, "category": args.category}
+    if args.date:
+        fields["date"] = args.date
+    try:
+        fields = manager.validate_expense_fields(fields)
+    except ValueError as error:
+        sys.stderr.write(f"error: {error}\n")
+        return 2
+    if not manager.add_expense(fields["amount"], fields["description"], fields["category"], fields.get("date")):
+        sys.stderr.write("error: the expense could not be added\n")
+        return 1
+    _print_json({"added": 1})
+    return 0
+
+
+def import_expenses(manager: ExpenseManager, args: argparse.Namespace) -> int:
+    """Import CSV or JSON lines, validated and written one chunk at a time"""
+    file_format = args.format or ("csv" if args.file.lower().endswith(".csv") else "jsonl")
+    try:
+        if args.file == "-":
+            result = (
+                manager.import_csv(sys.stdin, chunk_size=args.chunk_size)
+                if file_format == "csv"
+                else manager.import_jsonl(sys.stdin, chunk_size=args.chunk_size)
+            )
+        elif file_format == "csv":
+            result = manager.import_csv(args.file, chunk_size=args.chunk_size)
+        else:
+            with Path(args.file).open(encoding="utf-8") as fh:
+                result = manager.import_jsonl(fh, chunk_size=args.chunk_size)
+    except (OSError, ValueError) as error:
+        sys.stderr.write(f"error: {error}\n")
+        return 1
+    _print_json(result)
+    return 0
+
+
+def query(manager: ExpenseManager, args: argparse.Namespace) -> int:
+    """Print the expenses matching the filters as JSON lines, oldest partition first"""
+    batches = manager.iter_expense_batches(
+        config.EXPORT_BATCH_SIZE,
+        start_date=args.start,
+        end_date=args.end,
+        category=args.category,
+    )
+    _write_jsonl(batches, search=args.search, limit=args.limit)
+    return 0
+
+
+def stats(manager: ExpenseManager, args: argparse.Namespace) -> int:
+    """Print the ledger's statistics, or one line of totals per category or per month and category"""
+    if args.by is None:
+        _print_json(manager.get_statistics())
+    elif args.by == "category":
+        for category, summary in manager.get_category_summary().items():
+            _print_json({"category": category, **summary})
+    else:
+        aggregates = manager.get_aggregates()
+        for month_index, row in enumerate(aggregates.month_counts):
+            month = aggregates.first_month + month_index
+            for code, count in enumerate(row):
+                if count:
+                    _print_json(
+                        {
+                            "month": f"{month // 12:04d}-{month % 12 + 1:02d}",
+                            "category": aggregates.category_names[code],
+                            "total": aggregates.month_sums[month_index, code],
+                            "count": count,
+                        },
+                    )
+    return 0
+
+
+def export(manager: ExpenseManager, args: argparse.Namespace) -> int:
+    """Write the expenses matching the filters to stdout or a file"""
+    filters = {"start_date": args.start, "end_date": args.end, "category": args.category}
+    to_stdout = args.output in {None, "-"}
+    if args.format == "jsonl" and to_stdout:
+        _write_jsonl(manager.iter_expense_batches(config.EXPORT_BATCH_SIZE, **filters))
+        return 0
+    if args.format == "csv" and to_stdout:
+        for chunk in manager.stream_csv(**filters):
+            sys.stdout.buffer.write(chunk)
+        return 0
+
+    # Relative paths are relative to the working directory, not to the app's export directory
+    filename = None if args.output is None else str(Path(args.output).resolve())
+    if args.format == "jsonl":
+        with Path(filename).open("w", encoding="utf-8") as fh:
+            batches = manager.iter_expense_batches(config.EXPORT_BATCH_SIZE, **filters)
+            fh.writelines(_dumps(expense) + "\n" for batch in batches for expense in batch)
+        path = filename
+    elif args.format == "csv":
+        path = manager.export_to_csv(filename, **filters)
+    elif args.output == "-":
+        sys.stderr.write("error: Parquet cannot be written to stdout\n")
+        return 2
+    else:
+        try:
+            path = manager.export_to_parquet(filename, **filters)
+        except ImportError as error:
+            sys.stderr.write(f"error: {error}\n")
+            return 1
+    _print_json({"path": path})
+    return 0
+
+
+def compact(manager: ExpenseManager, args: argparse.Namespace) -> int:
+    """Trim the change log and remove stale column store versions"""
+    _print_json(manager.compact(args.keep_events))
+    return 0
+
+
+def check(manager: ExpenseManager, args: argparse.Namespace) -> int:
+    """Check the ledger's integrity, failing if a problem was found"""
+    result = manager.check_integrity()
+    _print_json(result)
+    return 1 if result["problems"] else 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Parser of the global options and the commands"""
+    parser = argparse.ArgumentParser(prog="python -m src.cli", description="Command-line interface over the ledger")
+    ledger = parser.add_mutually_exclusive_group()
+    ledger.add_argument("--db", default=str(config.DATABASE_FILE), help="ledger file (defaults to the app's ledger)")
+    ledger.add_argument("--tenant", help="use a tenant's ledger under config.TENANTS_DIR")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def filter_arguments(command: argparse.ArgumentParser):
+        command.add_argument("--start", type=_date, help="only expenses on or after this date")
+        command.add_argument("--end", type=_date, help="only expenses on or before this date")
+        command.add_argument("--category", help="only expenses in this category")
+
+    command = commands.add_parser("add", help="add one expense")
+    command.add_argument("amount", type=_amount)
+    command.add_argument("description")
+    command.add_argument("--category", default="Other")
+    command.add_argument("--date", type=_date, help="date of the expense (defaults to today)")
+    command.set_defaults(handler=add)
+
+    command = commands.add_parser("import", help="import expenses from a CSV or JSON lines file, or stdin")
+    command.add_argument("file", help="file to import, or - for stdin")
+    command.add_argument("--format", choices=["csv", "jsonl"], help="input format (from the extension by default)")
+    command.add_argument("--chunk-size", type=int, default=config.IMPORT_CHUNK_SIZE, help="rows per write")
+    command.set_defaults(handler=import_expenses)
+
+    command = commands.add_parser("query", help="print matching expenses as JSON lines")
+    filter_arguments(command)
+    command.add_argument("--search", help="only expenses whose description contains this text")
+    command.add_argument("--limit", type=int, help="print at most this many expenses")
+    command.set_defaults(handler=query)
+
+    command = commands.add_parser("stats", help="print statistics of the ledger")
+    command.add_argument("--by", choices=["category", "month"], help="one line of totals per category or month")
+    command.set_defaults(handler=stats)
+
+    command = commands.add_parser("export", help="export expenses to stdout or a file")
+    filter_arguments(command)
+    command.add_argument("--format", choices=["jsonl", "csv", "parquet"], default="jsonl")
+    command.add_argument("--output", help="output file, or - for stdout (the default for jsonl and csv)")
+    command.set_defaults(handler=export)
+
+    command = commands.add_parser("compact", help="trim the change log and remove stale column store versions")
+    command.add_argument("--keep-events", type=int, default=config.CHANGE_LOG_KEEP_EVENTS, help="events to keep")
+    command.set_defaults(handler=compact)
+
+    command = commands.add_parser("check", help="check the ledger's integrity")
+    command.set_defaults(handler=check)
+
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    configure_logging()
+
+    manager = ExpenseManager.for_tenant(args.tenant) if args.tenant else ExpenseManager(args.db)
+    try:
+        return args.handler(manager, args)
+    except BrokenPipeError:
+        # The reader of the output went away (e.g. ``| head``); point stdout at devnull so the exit does not fail
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 1
+    finally:
+        manager.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
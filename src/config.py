@@ -11,6 +11,25 @@ APP_DESCRIPTION = "A modern, modular expense tracking application"
 DATABASE_DIR = Path(__file__).parent / "data"
 DATABASE_FILE = DATABASE_DIR / "expenses.json"
 
+# Expenses are stored in one file per "year" or "month" (fixed when a ledger is first written)
+PARTITION_GRANULARITY = "year"
+
+# Multi-tenant settings: one ledger shard per tenant, served from a pool of open handles
+TENANTS_DIR = DATABASE_DIR / "tenants"
+TENANT_POOL_SIZE = 64
+TENANT_IDLE_SECONDS = 15 * 60
+# Tenants that the app's ?tenant= query parameter and the API's X-Tenant header may open. Neither is
+# authenticated, so every listed ledger is open to anyone who can reach the server; other tenants are refused.
+# The CLI and the ledger generator, run by whoever owns the data directory, can open any tenant.
+ALLOWED_TENANTS = []
+
+# Change feed settings: mutations are logged next to the database for other sessions and processes
+CHANGE_FEED_POLL_SECONDS = 1.0
+CHANGE_LOG_MAX_BYTES = 8 * 1024 * 1024
+CHANGE_EVENT_MAX_DOCUMENTS = 10000
+# Events left in the change log by ``python -m src.cli compact``
+CHANGE_LOG_KEEP_EVENTS = 100
+
 # Default categories
 DEFAULT_CATEGORIES = [
     "Food",
@@ -24,11 +43,32 @@ DEFAULT_CATEGORIES = [
     "Other",
 ]
 
+# Async facade settings
+ASYNC_MAX_WORKERS = 4
+
+# Background job settings (analytics computed off the script thread)
+BACKGROUND_MAX_WORKERS = 2
+BACKGROUND_CACHE_SIZE = 32
+BACKGROUND_POLL_SECONDS = 0.1
+
+# Aggregation settings: inputs this large are reduced by a process pool, one task per group of months
+PARALLEL_AGGREGATION_MIN_ROWS = 200_000
+PARTITIONS_PER_WORKER = 2
+AGGREGATION_START_METHOD = "spawn"
+
+# HTTP API settings
+API_HOST = "127.0.0.1"
+API_PORT = 8600
+API_MAX_BODY_BYTES = 50 * 1024 * 1024
+API_STREAM_BATCH_SIZE = 1000
+
 # UI settings
 DEFAULT_CURRENCY = "USD"
 DEFAULT_CURRENCY_SYMBOL = "$"
 DATE_FORMAT = "%Y-%m-%d"
 DISPLAY_DATE_FORMAT = "%B %d, %Y"
+# Expenses listed per page on the View Expenses page
+EXPENSES_PAGE_SIZE = 50
 
 # Chart settings
 CHART_COLOR_PALETTE = [
@@ -47,10 +87,20 @@ CHART_COLOR_PALETTE = [
 # Export settings
 EXPORT_DIR = Path(__file__).parent / "exports"
 CSV_FILENAME_FORMAT = "expenses_export_{timestamp}.csv"
+PARQUET_FILENAME_FORMAT = "expenses_export_{timestamp}.parquet"
+EXPORT_BATCH_SIZE = 10000
+# Streamlit holds a download in memory, so larger exports are left to the command line
+MAX_BROWSER_EXPORT_ROWS = 100000
+
+# Import settings
+IMPORT_CHUNK_SIZE = 5000
+IMPORT_REQUIRED_COLUMNS = ["amount", "description"]
+IMPORT_REJECTED_REPORT_LIMIT = 1000
 
 # Sample data settings
-SAMPLE_DATA_COUNT = 50
+SAMPLE_DATA_COUNT = 500
 SAMPLE_DATE_RANGE_DAYS = 365
+GENERATOR_BATCH_SIZE = 100_000  # expenses per bulk insert when writing synthetic ledgers
 
 # Validation settings
 MIN_EXPENSE_AMOUNT = 0.01
@@ -58,18 +108,44 @@ MAX_EXPENSE_AMOUNT = 999999.99
 MAX_DESCRIPTION_LENGTH = 200
 MAX_CATEGORY_LENGTH = 50
 
+# Performance instrumentation (opt-in; it can also be switched on from the hidden Performance page,
+# shown in the sidebar with the ?debug=1 query parameter)
+INSTRUMENTATION_ENABLED = False
+INSTRUMENTATION_WINDOW_SECONDS = 15 * 60
+INSTRUMENTATION_SLOT_SECONDS = 60
+
+# Memory profiling (memory_profiling.py, opt-in as tracing slows the app down; it can also be switched on from
+# the Performance page): tracemalloc snapshots of what page renders keep, traced-memory deltas of ExpenseManager calls
+# and session state sizes
+MEMORY_PROFILING_ENABLED = False
+# Traceback depth per allocation: raise it (e.g. to 10) to also find the app's line behind allocations made inside
+# libraries, at several times the cost per allocation
+MEMORY_PROFILING_FRAMES = 1
+MEMORY_PROFILING_TOP_SITES = 20
+
+# Logging: application log records go to stderr as JSON lines, and ExpenseManager calls slower than the
+# threshold are also written to the slow-query log (a threshold of None disables it)
+LOG_DIR = Path(__file__).parent / "logs"
+SLOW_QUERY_THRESHOLD_MS = 250
+SLOW_QUERY_LOG_FILE = LOG_DIR / "slow_queries.jsonl"
+SLOW_QUERY_LOG_MAX_BYTES = 10 * 1024 * 1024
+SLOW_QUERY_LOG_BACKUPS = 3
+
+# Metrics exposition in the Prometheus text format (metrics.py), off unless a port or textfile is set
+METRICS_HOST = "127.0.0.1"
+METRICS_PORT = None  # e.g. 9464, to serve /metrics next to the Streamlit server
+METRICS_TEXTFILE = None  # e.g. "/var/lib/node_exporter/expense_tracker.prom", for node_exporter
+METRICS_TEXTFILE_INTERVAL_SECONDS = 15
+
 # Analytics settings
 RECENT_EXPENSES_COUNT = 5
 CHART_HEIGHT = 400
 CHART_WIDTH = 600
 
 
-# Create necessary directories
+# Create necessary directories (called on startup by the app and the API server)
 def ensure_directories():
     """Ensure all necessary directories exist"""
     DATABASE_DIR.mkdir(exist_ok=True)
     EXPORT_DIR.mkdir(exist_ok=True)
-
-
-# Initialize directories when module is imported
-ensure_directories()
+    LOG_DIR.mkdir(exist_ok=True)
@@ -0,0 +1,209 @@
+"""In-memory aggregation cube of expense amounts
+
+The cube holds the sum, count and sum of squares of the expense amounts in
+every (year, month, weekday, category) cell, as dense numpy arrays. Views of
+the expenses are answered from the cells alone:
+
+- ``slice`` keeps the cells of a selection of years, months, weekdays and
+  categories (drill-down)
+- ``roll_up`` sums the cells over the other dimensions into a table of the
+  total, count, mean and standard deviation of every group
+
+Both take time proportional to the number of cells, which grows with the
+years and categories covered but not with the number of expenses. A cube is
+never modified: ``applied`` returns a new cube in which only the expenses a
+write touched are subtracted as they were and added as they are, so a write
+costs time proportional to the expenses it touched (see
+``ExpenseManager.get_cube``), and cubes handed to other sessions stay
+consistent.
+"""
+
+from collections.abc import Iterable
+from typing import TYPE_CHECKING, NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from aggregation import WEEKDAYS, ExpenseColumns
+
+if TYPE_CHECKING:
+    from storage.column_store import Columns
+
+# Axes of the cube's arrays, in order
+DIMENSIONS = ("year", "month", "weekday", "category")
+
+
+class ExpenseCube(NamedTuple):
+    """Sum, count and sum of squares of expense amounts by year, month, weekday and category
+
+    The arrays have shape (years, 12, 7, categories): index ``y`` of the
+    first axis is year ``first_year + y``, months run from January, weekdays
+    from Monday, and categories follow ``category_names`` (sorted, possibly
+    including categories without expenses left).
+    """
+
+    seq: int
+    first_year: int
+    sums: np.ndarray
+    counts: np.ndarray
+    squares: np.ndarray
+    category_names: list[str]
+
+    @classmethod
+    def empty(cls, seq: int = 0) -> "ExpenseCube":
+        """Cube without expenses"""
+        shape = (0, 12, 7, 0)
+        return cls(seq, 0, np.zeros(shape), np.zeros(shape, dtype=np.int64), np.zeros(shape), [])
+
+    @classmethod
+    def build(cls, columns: "Columns") -> "ExpenseCube":
+        """Aggregate every expense of a column store version"""
+        return cls.empty(columns.seq)._add(columns.expense_columns(), 1)
+
+    def applied(
+        self,
+        removed: Iterable[ExpenseColumns],
+        added: Iterable[ExpenseColumns],
+        seq: int,
+    ) -> "ExpenseCube":
+        """Cube of version ``seq``: this cube without the ``removed`` expenses and with the ``added`` ones
+
+        An updated expense is removed as it was and added as it is.
+        """
+        cube = self
+        for columns in removed:
+            cube = cube._add(columns, -1)
+        for columns in added:
+            cube = cube._add(columns, 1)
+        return cube._replace(seq=seq)
+
+    def years(self) -> list[int]:
+        """Years with expenses"""
+        return [self.first_year + int(index) for index in np.flatnonzero(self.counts.sum(axis=(1, 2, 3)))]
+
+    def categories(self) -> list[str]:
+        """Categories with expenses"""
+        return [self.category_names[code] for code in np.flatnonzero(self.counts.sum(axis=(0, 1, 2)))]
+
+    def slice(
+        self,
+        years: Iterable[int] | None = None,
+        months: Iterable[int] | None = None,
+        weekdays: Iterable[int] | None = None,
+        categories: Iterable[str] | None = None,
+    ) -> "ExpenseCube":
+        """Cube of the cells in the given years, months (1 for January), weekdays (0 for Monday) and categories
+
+        A dimension given as None is not restricted; values outside the cube are ignored.
+        """
+        codes = {name: code for code, name in enumerate(self.category_names)}
+        masks = [
+            _mask(len(self.sums), None if years is None else [year - self.first_year for year in years]),
+            _mask(12, None if months is None else [month - 1 for month in months]),
+            _mask(7, weekdays),
+            _mask(len(codes), None if categories is None else [codes.get(name, -1) for name in categories]),
+        ]
+        keep = masks[0][:, None, None, None] & masks[1][None, :, None, None] & masks[2][None, None, :, None]
+        keep = keep & masks[3][None, None, None, :]
+        return self._replace(
+            sums=np.where(keep, self.sums, 0.0),
+            counts=np.where(keep, self.counts, 0),
+            squares=np.where(keep, self.squares, 0.0),
+        )
+
+    def roll_up(self, *dimensions: str) -> pd.DataFrame:
+        """Total, count, mean and standard deviation of the amounts by some of the cube's dimensions
+
+        Args:
+            dimensions: Any of ``year``, ``month``, ``weekday`` and ``category``; none gives one grand total row
+
+        Returns:
+            pd.DataFrame: A column per dimension (in the cube's order), then ``sum``, ``count``, ``mean`` and
+            ``std`` (sample standard deviation, as pandas computes it, NaN for a single expense), with a row
+            per group that has expenses, years and months in chronological order and weekdays from Monday
+        """
+        unknown = set(dimensions) - set(DIMENSIONS)
+        if unknown:
+            raise ValueError(f"Unknown cube dimensions: {', '.join(sorted(unknown))}")
+
+        kept = [dimension for dimension in DIMENSIONS if dimension in dimensions]
+        summed = tuple(axis for axis, dimension in enumerate(DIMENSIONS) if dimension not in dimensions)
+        sums, counts, squares = (
+            np.atleast_1d(array.sum(axis=summed)) for array in (self.sums, self.counts, self.squares)
+        )
+        present = np.nonzero(counts)
+
+        count = counts[present]
+        mean = sums[present] / count
+        with np.errstate(divide="ignore", invalid="ignore"):
+            variance = np.maximum(squares[present] - sums[present] * mean, 0.0) / (count - 1)
+        frame = {dimension: self._labels(dimension, index) for dimension, index in zip(kept, present, strict=False)}
+        return pd.DataFrame({**frame, "sum": sums[present], "count": count, "mean": mean, "std": np.sqrt(variance)})
+
+    def _labels(self, dimension: str, index: np.ndarray) -> np.ndarray | list:
+        """Values of a dimension at some of its indices"""
+        if dimension == "year":
+            return self.first_year + index
+        if dimension == "month":
+            return index + 1
+        if dimension == "weekday":
+            return np.array(WEEKDAYS)[index]
+        return [self.category_names[code] for code in index]
+
+    def _add(self, columns: ExpenseColumns, sign: int) -> "ExpenseCube":
+        """Cube with expense columns added (``sign`` 1) or subtracted (``sign`` -1), growing the axes as needed"""
+        if not len(columns):
+            return self
+
+        used_names = [columns.category_names[code] for code in np.unique(columns.categories)]
+        names = sorted({*self.category_names, *used_names})
+        years = columns.months // 12
+        first_year, last_year = int(years.min()), int(years.max())
+        if len(self.sums):
+            first_year = min(first_year, self.first_year)
+            last_year = max(last_year, self.first_year + len(self.sums) - 1)
+        cube = self._expanded(first_year, last_year - first_year + 1, names)
+
+        codes = np.searchsorted(np.array(names), np.array(columns.category_names))[columns.categories]
+        cells = ((years - first_year) * 12 + columns.months % 12) * 7 + columns.weekdays
+        cells = cells.astype(np.int64) * len(names) + codes
+        shape = cube.counts.shape
+        size = cube.counts.size
+        sums = np.bincount(cells, weights=columns.amounts, minlength=size).reshape(shape)
+        counts = np.bincount(cells, minlength=size).reshape(shape)
+        squares = np.bincount(cells, weights=columns.amounts**2, minlength=size).reshape(shape)
+        return cube._replace(
+            sums=cube.sums + sign * sums,
+            counts=cube.counts + sign * counts,
+            squares=cube.squares + sign * squares,
+        )
+
+    def _expanded(self, first_year: int, year_count: int, names: list[str]) -> "ExpenseCube":
+        """The same cells on a year axis and category list covering this cube's"""
+        if first_year == self.first_year and year_count == len(self.sums) and names == self.category_names:
+            return self
+
+        offset = self.first_year - first_year
+        codes = np.searchsorted(np.array(names), np.array(self.category_names)) if self.category_names else []
+        arrays = []
+        for array in (self.sums, self.counts, self.squares):
+            grown = np.zeros((year_count, 12, 7, len(names)), dtype=array.dtype)
+            grown[offset : offset + len(array)][..., codes] = array
+            arrays.append(grown)
+        return self._replace(
+            first_year=first_year,
+            sums=arrays[0],
+            counts=arrays[1],
+            squares=arrays[2],
+            category_names=names,
+        )
+
+
+def _mask(length: int, indices: Iterable[int] | None) -> np.ndarray:
+    """Boolean mask of the indices within ``range(length)`` (all of them for None)"""
+    if indices is None:
+        return np.ones(length, dtype=bool)
+    mask = np.zeros(length, dtype=bool)
+    indices = np.array([index for index in indices if 0 <= index < length], dtype=np.int64)
+    mask[indices] = True
+    return mask
@@ -1,24 +1,91 @@
-from datetime import UTC, datetime
+import calendar
+import json
+import logging
+import secrets
+import threading
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import contextmanager
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+from typing import TYPE_CHECKING
 
-import pandas as pd
 from tinydb import Query, TinyDB
 
-from fake_data import get_fake_expenses
+import config
+from instrumentation import instrument_methods
+from storage.change_feed import ChangeEvent, ChangeFeed
+from storage.locking import FileLock
+from storage.partitions import PartitionedTable
+from storage.tenant_pool import tenant_db_path
 from utils.datetime_conversion import (
+    DATE_SAMPLE_SIZE,
     convert_for_expense_tracker,
     get_current_date,
+    infer_date_format,
+    normalize_dates,
 )
+from utils.export import PARQUET_AVAILABLE, iter_csv_bytes, write_csv, write_parquet
 
+# pandas, numpy and the modules built on them are imported by the methods that need them, so that
+# pages which only add expenses or list categories start without loading them
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
 
+    from aggregation import Aggregates, ExpenseColumns
+    from cube import ExpenseCube
+    from storage.column_store import Columns
+
+
+logger = logging.getLogger(__name__)
+
+
+class ExpenseConflictError(Exception):
+    """Raised when an expense was changed by someone else since it was read"""
+
+    def __init__(self, expense_id: int, expected_version: int, current_version: int):
+        """Record the conflicting versions"""
+        super().__init__(
+            f"Expense {expense_id} was modified concurrently (expected version {expected_version}, "
+            f"found {current_version})",
+        )
+        self.expense_id = expense_id
+        self.expected_version = expected_version
+        self.current_version = current_version
+
+
+@instrument_methods
 class ExpenseManager:
     """Enhanced expense management class with comprehensive functionality"""
 
+    # Reported by the slow-query log
+    storage_backend = "tinydb-partitioned"
+
     def __init__(self, db_path: str = "./src/data/expenses.json"):
         """Initialize the expense manager with database connection"""
-        self.db = TinyDB(db_path)
-        self.expenses_table = self.db.table("expenses")
+        self.db_path = db_path
+        # Expenses are stored in time partitions next to the ledger path
+        self.partitions = PartitionedTable(db_path)
         self.expenses = Query()
 
+        # Serializes read-modify-write cycles across sessions and processes sharing the file
+        self.lock = FileLock(f"{db_path}.lock")
+
+        # The change feed is set up by _open() and the column store by get_columns() on first use, so
+        # that creating a manager reads nothing from disk
+        self._changes = None
+        self._column_store = None
+        self._unsubscribe = None
+        self._open_lock = threading.Lock()
+
+        # Aggregation cube, kept current by this manager's writes and brought up to date by get_cube(). The cube
+        # reflects the column store version it was last brought up to date from, overridden by the amount, date
+        # and category of the expenses written since (None for a deleted expense)
+        self._cube = None
+        self._cube_columns = None
+        self._cube_written = {}
+        self._cube_lock = threading.Lock()
+
         # Common expense categories
         self.default_categories = [
             "Food",
@@ -32,6 +99,92 @@ class ExpenseManager:
             "Other",
         ]
 
+    def _open(self):
+        """Migrate an old single-file ledger and start following the change feed, once, on first use"""
+        if self._changes is not None:
+            return
+
+        with self._open_lock:
+            if self._changes is not None:
+                return
+            self._migrate_single_file_ledger()
+
+            # Mutations are published to every manager on this file, including those in other processes
+            changes = ChangeFeed.for_database(self.db_path)
+            self._unsubscribe = changes.subscribe(self._on_change)
+            self._changes = changes
+
+    @property
+    def changes(self) -> ChangeFeed:
+        """Change feed of the database"""
+        self._open()
+        return self._changes
+
+    @contextmanager
+    def _shared(self) -> Iterator[None]:
+        """Open the manager if needed and hold the ledger lock for reading"""
+        self._open()
+        with self.lock.shared():
+            yield
+
+    @contextmanager
+    def _exclusive(self) -> Iterator[None]:
+        """Open the manager if needed and hold the ledger lock for writing"""
+        self._open()
+        with self.lock.exclusive():
+            yield
+
+    def _migrate_single_file_ledger(self):
+        """Move the expenses of a ledger written before partitioning into partitions"""
+        if self.partitions.exists() or not Path(self.db_path).exists():
+            return
+
+        with self.lock.exclusive():
+            if self.partitions.exists():
+                return
+            with TinyDB(self.db_path) as legacy_db:
+                documents = legacy_db.table("expenses").all()
+            self.partitions.migrate(documents)
+
+    @classmethod
+    def for_tenant(cls, tenant_id: str) -> "ExpenseManager":
+        """Open the ledger shard of a tenant under ``config.TENANTS_DIR``"""
+        path = tenant_db_path(tenant_id)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return cls(str(path))
+
+    def close(self):
+        """Close the database file, waiting for in-flight operations on this manager
+
+        A closed manager can still be used: it is opened again, and follows
+        the change feed again, on its next operation.
+        """
+        with self._open_lock:
+            if self._unsubscribe is not None:
+                self._unsubscribe()
+            self._unsubscribe = None
+            self._changes = None
+        with self.lock.exclusive():
+            self.partitions.close()
+
+    @property
+    def data_version(self) -> int:
+        """Sequence number of the latest committed change to the database"""
+        with self._shared():
+            return self.changes.current_seq()
+
+    def subscribe(self, callback: Callable[[ChangeEvent], None]) -> Callable[[], None]:
+        """Call ``callback(event)`` after every change to the database, from any session or process
+
+        Returns:
+            Callable: Function that removes the subscription
+        """
+        return self.changes.subscribe(callback)
+
+    def _on_change(self, event: ChangeEvent):
+        """Drop TinyDB's query caches, which only track writes made through this instance"""
+        self.partitions.clear_cache()
+
     def add_expense(self, amount: float, description: str, category: str, date: str | None) -> bool:
         """Add a new expense to the database
 
@@ -47,61 +200,268 @@ class ExpenseManager:
         try:
             date = get_current_date() if date is None else convert_for_expense_tracker(date)
 
-            # Get next ID
-            all_records = self.expenses_table.all()
-            next_id = max([record.get("id", 0) for record in all_records], default=0) + 1
-
-            expense_data = {
-                "id": next_id,
-                "amount": float(amount),
-                "description": description.strip(),
-                "category": category.capitalize(),
-                "date": date,
-                "created_at": datetime.now(tz=UTC).isoformat(),
-            }
-
-            self.expenses_table.insert(expense_data)
+            with self._exclusive():
+                manifest = self._load_manifest()
+                expense_data = {
+                    "id": self.partitions.next_id(manifest),
+                    "amount": float(amount),
+                    "description": description.strip(),
+                    "category": category.capitalize(),
+                    "date": date,
+                    "created_at": datetime.now(tz=UTC).isoformat(),
+                    "version": 1,
+                }
+
+                self.partitions.insert_multiple(manifest, [expense_data])
+                self.partitions.write_manifest(manifest)
+                event = self.changes.append("insert", documents=[expense_data])
+                self._update_cube(event.seq, [], [expense_data])
+            self.changes.poll()
             return True  # noqa: TRY300
 
-        except Exception as e:
-            print(f"Error adding expense: {e}")  # noqa: T201
+        except Exception:
+            logger.exception("Error adding expense")
             return False
 
+    def add_expenses(self, expenses: list[dict]) -> int:
+        """Add multiple expenses to the database in a single write
+
+        Args:
+            expenses: Expense dicts with amount, description, category and (optional) date keys
+
+        Returns:
+            int: Number of expenses added
+        """
+        if not expenses:
+            return 0
+
+        created_at = datetime.now(tz=UTC).isoformat()
+        documents = [
+            {
+                "amount": float(expense["amount"]),
+                "description": expense["description"].strip(),
+                "category": expense["category"].capitalize(),
+                "date": convert_for_expense_tracker(expense.get("date")),
+                "created_at": created_at,
+                "version": 1,
+            }
+            for expense in expenses
+        ]
+
+        with self._exclusive():
+            manifest = self._load_manifest()
+            next_id = self.partitions.next_id(manifest)
+            for offset, document in enumerate(documents):
+                document["id"] = next_id + offset
+
+            self.partitions.insert_multiple(manifest, documents)
+            self.partitions.write_manifest(manifest)
+            event = self.changes.append("insert", documents=documents)
+            self._update_cube(event.seq, [], documents)
+        self.changes.poll()
+        return len(documents)
+
+    def _load_manifest(self) -> dict:
+        """Read the partition manifest for a write (call with the exclusive lock held)
+
+        Other processes may have written since this instance last touched the
+        partitions, so TinyDB's cached document ID counters and query caches
+        are reset first.
+        """
+        self.partitions.clear_cache()
+        return self.partitions.read_manifest()
+
+    def _snapshot(self) -> tuple[list[dict], int]:
+        """Get every expense and the sequence number of the change they reflect"""
+        with self._shared():
+            return self.partitions.all(self.partitions.read_manifest()), self.changes.current_seq()
+
+    def get_columns(self) -> "Columns":
+        """Get the memory-mapped expense columns of the latest data version"""
+        from storage.column_store import ColumnStore  # noqa: PLC0415
+
+        changes = self.changes
+        with self._open_lock:
+            if self._column_store is None:
+                # Memory-mapped copy of the amount, date and category columns, brought up to date on read
+                self._column_store = ColumnStore(self.db_path, changes, self._snapshot)
+        return self._column_store.columns()
+
+    def get_cube(self) -> "ExpenseCube":
+        """Get the aggregation cube of expense amounts by year, month, weekday and category, at the latest data version
+
+        Writes through this manager update the cube as they are made, so it
+        is usually current already. Changes made by other managers or
+        processes are caught up on here: only the expenses touched by the
+        change events in between are subtracted (as the cube counts them) and
+        added back (as stored in the latest column store version); a clear,
+        or a change log that no longer reaches back, rebuilds it.
+        """
+        from cube import ExpenseCube  # noqa: PLC0415
+
+        with self._cube_lock:
+            if self._cube is not None and self._cube.seq >= self.changes.current_seq():
+                return self._cube
+
+        columns = self.get_columns()
+        with self._cube_lock:
+            cube = self._cube
+            # Another thread, or a write, may have brought the cube past this thread's version meanwhile
+            if cube is not None and cube.seq >= columns.seq:
+                return cube
+
+            ids = None if cube is None else self._changed_ids(cube.seq, columns.seq)
+            if ids is None:
+                cube = ExpenseCube.build(columns)
+            else:
+                cube = cube.applied(self._cube_expenses(ids), [columns.expense_columns(columns.rows(ids))], columns.seq)
+            self._cube, self._cube_columns, self._cube_written = cube, columns, {}
+            return cube
+
+    def _cube_expenses(self, ids: "np.ndarray") -> "list[ExpenseColumns]":
+        """Columns of the expenses with these IDs as the cube counts them (call with the cube lock held)"""
+        import numpy as np  # noqa: PLC0415
+
+        from aggregation import ExpenseColumns  # noqa: PLC0415
+
+        written = [self._cube_written[expense_id] for expense_id in ids.tolist() if expense_id in self._cube_written]
+        stored = np.array([expense_id for expense_id in ids.tolist() if expense_id not in self._cube_written])
+        columns = self._cube_columns
+        return [
+            columns.expense_columns(columns.rows(stored.astype(np.int64))),
+            ExpenseColumns.from_expenses([expense for expense in written if expense is not None]),
+        ]
+
+    def _update_cube(self, seq: int, removed: list[dict], added: list[dict]):
+        """Apply a write to the aggregation cube, if it is built and at the version before the write
+
+        Call with the exclusive lock held, right after logging the write as
+        change ``seq``. Otherwise the cube is left for get_cube() to catch up.
+        """
+        with self._cube_lock:
+            if self._cube is None or self._cube.seq != seq - 1:
+                return
+            try:
+                from aggregation import ExpenseColumns  # noqa: PLC0415
+
+                self._cube = self._cube.applied(
+                    [ExpenseColumns.from_expenses(removed)],
+                    [ExpenseColumns.from_expenses(added)],
+                    seq,
+                )
+            except Exception:
+                # The write itself succeeded; the cube is rebuilt on the next read
+                logger.exception("Error updating the aggregation cube")
+                self._cube = None
+                return
+
+            for expense in removed:
+                self._cube_written[expense["id"]] = None
+            for expense in added:
+                self._cube_written[expense["id"]] = {field: expense[field] for field in ("amount", "date", "category")}
+
+    def _changed_ids(self, since: int, until: int) -> "np.ndarray | None":
+        """IDs of the expenses inserted, updated or deleted after change ``since`` up to ``until``
+
+        Returns None if the change log no longer covers the changes, or one
+        of them was a clear.
+        """
+        import numpy as np  # noqa: PLC0415
+
+        events = self.changes.events_since(since)
+        if events is None:
+            return None
+        events = [event for event in events if event.seq <= until]
+        if not events or events[-1].seq != until or any(event.op == "clear" for event in events):
+            return None
+        return np.unique(np.concatenate([np.asarray(event.ids, dtype=np.int64) for event in events]))
+
+    def get_metadata(self) -> dict:
+        """Get the expense count, categories and date range from the partition manifest, without loading expenses"""
+        with self._shared():
+            partitions = list(self.partitions.read_manifest()["partitions"].values())
+
+        return {
+            "count": sum(entry["count"] for entry in partitions),
+            "categories": sorted({category for entry in partitions for category in entry["categories"]}),
+            "date_range": {
+                "start": min(entry["min_date"] for entry in partitions),
+                "end": max(entry["max_date"] for entry in partitions),
+            }
+            if partitions
+            else None,
+        }
+
     def get_all_expenses(self) -> list[dict]:
-        """Get all expenses from the database"""
-        return self.expenses_table.all()
+        """Get all expenses from the database, oldest partition first"""
+        with self._shared():
+            return self.partitions.all(self.partitions.read_manifest())
 
     def get_expenses_by_category(self, category: str) -> list[dict]:
         """Get expenses filtered by category"""
-        return self.expenses_table.search(self.expenses.category == category.capitalize())
+        with self._shared():
+            return self.partitions.search(
+                self.partitions.read_manifest(),
+                self.expenses.category == category.capitalize(),
+            )
 
     def get_expenses_by_date_range(self, start_date: str, end_date: str) -> list[dict]:
         """Get expenses within a date range"""
         start_date = convert_for_expense_tracker(start_date)
         end_date = convert_for_expense_tracker(end_date)
 
-        return self.expenses_table.search((self.expenses.date >= start_date) & (self.expenses.date <= end_date))
+        # Only the partitions overlapping the range are opened
+        with self._shared():
+            return self.partitions.search(
+                self.partitions.read_manifest(),
+                (self.expenses.date >= start_date) & (self.expenses.date <= end_date),
+                start_date=start_date,
+                end_date=end_date,
+            )
 
     def get_expenses_by_month(self, year: int, month: int) -> list[dict]:
         """Get expenses for a specific month"""
         start_date = f"{year}-{month:02d}-01"
 
         # Calculate last day of month
-        end_date = f"{year + 1}-01-01" if month == 12 else f"{year}-{month + 1:02d}-01"  # noqa: PLR2004
+        end_date = f"{year}-{month:02d}-{calendar.monthrange(year, month)[1]:02d}"
 
         return self.get_expenses_by_date_range(start_date, end_date)
 
     def delete_expense(self, expense_id: int) -> bool:
         """Delete an expense by ID"""
         try:
-            result = self.expenses_table.remove(self.expenses.id == expense_id)
-            return len(result) > 0
-        except Exception as e:
-            print(f"Error deleting expense: {e}")  # noqa: T201
+            with self._exclusive():
+                manifest = self._load_manifest()
+                key, current = self.partitions.find(manifest, expense_id)
+                if current is None:
+                    return False
+
+                self.partitions.remove(manifest, key, current)
+                self.partitions.write_manifest(manifest)
+                event = self.changes.append("delete", ids=[expense_id])
+                self._update_cube(event.seq, [current], [])
+            self.changes.poll()
+            return True  # noqa: TRY300
+        except Exception:
+            logger.exception("Error deleting expense %s", expense_id)
             return False
 
-    def update_expense(self, expense_id: int, **kwargs) -> bool:
-        """Update an expense by ID"""
+    def update_expense(self, expense_id: int, expected_version: int | None = None, **kwargs) -> bool:
+        """Update an expense by ID
+
+        Args:
+            expense_id: ID of the expense to update
+            expected_version: Version the caller last read; the update is refused if the
+                stored expense has changed since (optional)
+            **kwargs: Fields to update (amount, description, category, date)
+
+        Returns:
+            bool: True if the expense was updated, False otherwise
+
+        Raises:
+            ExpenseConflictError: If ``expected_version`` no longer matches the stored version
+        """
         try:
             update_data = {}
 
@@ -114,61 +474,130 @@ class ExpenseManager:
             if "date" in kwargs:
                 update_data["date"] = convert_for_expense_tracker(kwargs["date"])
 
-            if update_data:
-                update_data["updated_at"] = datetime.now(tz=UTC).isoformat()
-                result = self.expenses_table.update(update_data, self.expenses.id == expense_id)
-                return len(result) > 0
+            if not update_data:
+                return False
+
+            with self._exclusive():
+                manifest = self._load_manifest()
+                key, current = self.partitions.find(manifest, expense_id)
+                if current is None:
+                    return False
+
+                current_version = current.get("version", 1)
+                if expected_version is not None and expected_version != current_version:
+                    raise ExpenseConflictError(expense_id, expected_version, current_version)  # noqa: TRY301
 
-            return False  # noqa: TRY300
+                update_data["updated_at"] = datetime.now(tz=UTC).isoformat()
+                update_data["version"] = current_version + 1
+                self.partitions.update(manifest, key, current, update_data)
+                self.partitions.write_manifest(manifest)
+                event = self.changes.append("update", documents=[{**current, **update_data}])
+                self._update_cube(event.seq, [current], [{**current, **update_data}])
+            self.changes.poll()
+            return True  # noqa: TRY300
 
-        except Exception as e:
-            print(f"Error updating expense: {e}")  # noqa: T201
+        except ExpenseConflictError:
+            raise
+        except Exception:
+            logger.exception("Error updating expense %s", expense_id)
             return False
 
+    def get_expenses_page(
+        self,
+        offset: int = 0,
+        limit: int = config.EXPENSES_PAGE_SIZE,
+        start_date: str | None = None,
+        end_date: str | None = None,
+        category: str | None = None,
+        search: str | None = None,
+    ) -> dict:
+        """Get one page of the expenses matching filters, newest first
+
+        The filters are applied to the memory-mapped column store, and only
+        the expenses of the page are decoded, so a page costs about the same
+        whatever the size of the ledger.
+
+        Args:
+            offset: Number of matching expenses to skip
+            limit: Maximum number of expenses in the page
+            start_date: Only include expenses on or after this date (optional)
+            end_date: Only include expenses on or before this date (optional)
+            category: Only include expenses in this category, as stored (optional)
+            search: Only include expenses whose description contains this text, ignoring case (optional)
+
+        Returns:
+            dict: ``expenses`` (the page, with id, date, description, category and amount), and the
+            ``count`` and ``total`` amount of all matching expenses
+        """
+        import numpy as np  # noqa: PLC0415
+
+        columns = self.get_columns()
+        rows = columns.select(
+            start_date=None if start_date is None else convert_for_expense_tracker(start_date),
+            end_date=None if end_date is None else convert_for_expense_tracker(end_date),
+            category=category,
+            search=search,
+        )
+        # Newest first, and the latest added first within a day
+        order = np.lexsort((-columns.id[rows], -columns.date[rows].astype(np.int64)))
+        page = rows[order[offset : offset + limit]]
+        return {
+            "expenses": columns.records(page),
+            "count": len(rows),
+            "total": float(columns.amount[rows].sum()),
+        }
+
     def get_expense_by_id(self, expense_id: int) -> dict | None:
         """Get a specific expense by ID"""
-        result = self.expenses_table.search(self.expenses.id == expense_id)
-        return result[0] if result else None
+        with self._shared():
+            _, expense = self.partitions.find(self.partitions.read_manifest(), expense_id)
+        return expense
 
     def get_total_expenses(self) -> float:
         """Get total amount of all expenses"""
-        expenses = self.get_all_expenses()
-        return sum(expense["amount"] for expense in expenses)
-
-    def get_category_summary(self) -> dict[str, dict[str, float | int]]:
-        """Get summary statistics by category"""
-        expenses = self.get_all_expenses()
-        summary = {}
-
-        for expense in expenses:
-            category = expense["category"]
-            if category not in summary:
-                summary[category] = {"total": 0, "count": 0, "average": 0}
+        with self._shared():
+            manifest = self.partitions.read_manifest()
+        return sum(entry["total"] for entry in manifest["partitions"].values())
+
+    def _get_category_totals(self) -> dict[str, list[float | int]]:
+        """Get the total amount and count of every category, summed over the manifest's partitions"""
+        with self._shared():
+            manifest = self.partitions.read_manifest()
+
+        totals = {}
+        for entry in manifest["partitions"].values():
+            for category, (total, count) in entry["categories"].items():
+                category_totals = totals.setdefault(category, [0.0, 0])
+                category_totals[0] += total
+                category_totals[1] += count
+        return dict(sorted(totals.items()))
+
+    def get_aggregates(self, workers: int | None = None) -> "Aggregates":
+        """Get expense sums and counts by month, weekday and category
 
-            summary[category]["total"] += expense["amount"]
-            summary[category]["count"] += 1
+        Args:
+            workers: Worker processes for the aggregation (defaults to one per CPU for large ledgers)
+        """
+        from aggregation import aggregate  # noqa: PLC0415
 
-        # Calculate averages
-        for category in summary:  # noqa: PLC0206
-            if summary[category]["count"] > 0:
-                summary[category]["average"] = summary[category]["total"] / summary[category]["count"]
+        return aggregate(self.get_columns().expense_columns(), workers=workers)
 
-        return summary
+    def get_category_summary(self) -> dict[str, dict[str, float | int]]:
+        """Get summary statistics by category"""
+        return {
+            category: {"total": total, "count": count, "average": total / count}
+            for category, (total, count) in self._get_category_totals().items()
+        }
 
-    def get_monthly_summary(self) -> pd.DataFrame:
+    def get_monthly_summary(self) -> "pd.DataFrame":
         """Get monthly expense summary as DataFrame"""
-        expenses = self.get_all_expenses()
+        import pandas as pd  # noqa: PLC0415
 
-        if not expenses:
-            return pd.DataFrame()
+        # Sums by month and category
+        monthly_summary = self.get_aggregates().monthly_frame()
 
-        df = pd.DataFrame(expenses)  # noqa: PD901
-        df["date"] = pd.to_datetime(df["date"])
-        df["month_year"] = df["date"].dt.to_period("M")
-        df["month_name"] = df["date"].dt.strftime("%B %Y")
-
-        # Group by month and category
-        monthly_summary = df.groupby(["month_name", "category"])["amount"].sum().reset_index()
+        if monthly_summary.empty:
+            return pd.DataFrame()
 
         # Create pivot table
         pivot = monthly_summary.pivot_table(index="month_name", columns="category", values="amount").fillna(0)
@@ -179,22 +608,37 @@ class ExpenseManager:
         return pivot
 
     def get_recent_expenses(self, limit: int = 10) -> list[dict]:
-        """Get most recent expenses"""
-        expenses = self.get_all_expenses()
+        """Get most recent expenses, reading only the partitions that hold the newest IDs"""
+        expenses = []
+        with self._shared():
+            manifest = self.partitions.read_manifest()
+            entries = sorted(manifest["partitions"].items(), key=lambda item: item[1]["max_id"], reverse=True)
+            for index, (key, _) in enumerate(entries):
+                expenses.extend(self.partitions.table(key).all())
+
+                # IDs are handed out in creation order, so the remaining partitions only hold older expenses
+                # once enough loaded expenses have higher IDs than any of them
+                next_max_id = entries[index + 1][1]["max_id"] if index + 1 < len(entries) else 0
+                if sum(expense["id"] > next_max_id for expense in expenses) >= limit:
+                    break
 
         # Sort by created_at timestamp (most recent first)
-        expenses.sort(key=lambda x: x.get("created_at", ""), reverse=True)
+        expenses.sort(key=lambda x: (x.get("created_at", ""), x["id"]), reverse=True)
 
         return expenses[:limit]
 
     def search_expenses(self, query: str) -> list[dict]:
         """Search expenses by description"""
-        return self.expenses_table.search(
-            self.expenses.description.matches(f".*{query}.*", flags=2),  # Case insensitive
-        )
+        with self._shared():
+            return self.partitions.search(
+                self.partitions.read_manifest(),
+                self.expenses.description.matches(f".*{query}.*", flags=2),  # Case insensitive
+            )
 
-    def get_expenses_dataframe(self) -> pd.DataFrame:
+    def get_expenses_dataframe(self) -> "pd.DataFrame":
         """Get all expenses as a pandas DataFrame"""
+        import pandas as pd  # noqa: PLC0415
+
         expenses = self.get_all_expenses()
 
         if not expenses:
@@ -207,60 +651,435 @@ class ExpenseManager:
 
     def get_available_categories(self) -> list[str]:
         """Get list of all categories used in expenses"""
-        expenses = self.get_all_expenses()
-        categories = {expense["category"] for expense in expenses}
+        categories = set(self._get_category_totals())
 
         # Combine with default categories
         all_categories = list(categories.union(set(self.default_categories)))
 
         return sorted(all_categories)
 
-    def import_fake_data(self):
-        """Import fake data for testing"""
-        try:
-            fake_expenses = get_fake_expenses()
-
-            for expense in fake_expenses:
-                self.add_expense(
-                    amount=expense["amount"],
-                    description=expense["description"],
-                    category=expense["category"],
-                    date=expense["date"],
-                )
+    def import_fake_data(self, count: int = config.SAMPLE_DATA_COUNT, seed: int | None = None):
+        """Import realistic sample expenses over the last ``config.SAMPLE_DATE_RANGE_DAYS`` days
 
+        Args:
+            count: Number of expenses to add
+            seed: Seed of the synthetic ledger generator (a fresh one by default, so repeated
+                imports add different expenses)
+        """
+        from ledger_generator import generate_expenses, write_ledger  # noqa: PLC0415
+
+        try:
+            days = config.SAMPLE_DATE_RANGE_DAYS
+            start_date = datetime.now(tz=UTC).date() - timedelta(days=days - 1)
+            seed = secrets.randbits(32) if seed is None else seed
+            write_ledger(self, generate_expenses(count, seed, start_date=start_date, days=days))
             return True  # noqa: TRY300
 
-        except Exception as e:
-            print(f"Error importing fake data: {e}")  # noqa: T201
+        except Exception:
+            logger.exception("Error importing sample data")
             return False
 
+    def import_csv(
+        self,
+        path_or_buffer,
+        chunk_size: int = config.IMPORT_CHUNK_SIZE,
+        progress_callback: Callable[[int, int], None] | None = None,
+    ) -> dict:
+        """Import expenses from a CSV file, validating and writing one chunk at a time
+
+        Args:
+            path_or_buffer: CSV file path or file-like object
+            chunk_size: Number of rows read, validated and written per chunk
+            progress_callback: Called as ``callback(rows_processed, rows_imported)`` after each chunk
+
+        Returns:
+            dict: ``rows``, ``imported`` and ``rejected_count`` totals, the ``date_format`` inferred from
+            the first chunk and whether its day/month order was ``ambiguous_dates``, plus a ``rejected``
+            report (capped at ``config.IMPORT_REJECTED_REPORT_LIMIT`` rows) with the reason for each rejection
+
+        Raises:
+            ValueError: If the CSV is missing a required column
+        """
+        import pandas as pd  # noqa: PLC0415
+
+        reader = pd.read_csv(path_or_buffer, chunksize=chunk_size, dtype=str, keep_default_na=False)
+        return self._import_chunks(reader, header_lines=1, progress_callback=progress_callback)
+
+    def import_records(self, records: list[dict], chunk_size: int = config.IMPORT_CHUNK_SIZE) -> dict:
+        """Import expense dicts (e.g. parsed JSON) with the same validation as import_csv
+
+        Rejected rows report their 1-based position in ``records`` as ``line``.
+
+        Returns:
+            dict: Same shape as the result of import_csv
+        """
+        chunks = (_records_frame(records[start : start + chunk_size]) for start in range(0, len(records), chunk_size))
+        return self._import_chunks(chunks, header_lines=0)
+
+    def import_jsonl(self, lines: Iterable[str], chunk_size: int = config.IMPORT_CHUNK_SIZE) -> dict:
+        """Import expenses from JSON lines (e.g. a file or stdin), parsing and writing one chunk at a time
+
+        Blank lines are skipped, and rejected rows report their 1-based position among the records as ``line``.
+
+        Returns:
+            dict: Same shape as the result of import_csv
+
+        Raises:
+            ValueError: If a line is not a JSON object (the chunks before it are already imported)
+        """
+
+        def chunks() -> "Iterator[pd.DataFrame]":
+            records = []
+            for number, line in enumerate(lines, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError as error:
+                    raise ValueError(f"Line {number} is not valid JSON: {error.msg}") from None
+                if not isinstance(record, dict):
+                    raise ValueError(f"Line {number} is not a JSON object")  # noqa: TRY004
+                records.append(record)
+                if len(records) >= chunk_size:
+                    yield _records_frame(records)
+                    records = []
+            if records:
+                yield _records_frame(records)
+
+        return self._import_chunks(chunks(), header_lines=0)
+
+    def _import_chunks(
+        self,
+        chunks: "Iterable[pd.DataFrame]",
+        header_lines: int,
+        progress_callback: Callable[[int, int], None] | None = None,
+    ) -> dict:
+        """Validate and write chunks of raw string rows, one database write per chunk"""
+        result = {
+            "rows": 0,
+            "imported": 0,
+            "rejected_count": 0,
+            "rejected": [],
+            "date_format": None,
+            "ambiguous_dates": False,
+        }
+
+        for chunk in chunks:
+            chunk.columns = chunk.columns.str.strip().str.lower()
+            chunk = chunk.loc[:, ~chunk.columns.duplicated()]  # noqa: PLW2901
+            missing = [column for column in config.IMPORT_REQUIRED_COLUMNS if column not in chunk.columns]
+            if missing:
+                raise ValueError(f"Missing required columns: {', '.join(missing)}")
+
+            # Infer the date format once, from the first chunk, and reuse it for the rest of the input
+            if result["rows"] == 0 and "date" in chunk.columns:
+                result["date_format"], result["ambiguous_dates"] = infer_date_format(
+                    chunk["date"].head(DATE_SAMPLE_SIZE),
+                )
+
+            valid, rejected = self._validate_import_chunk(
+                chunk,
+                first_line=result["rows"] + header_lines + 1,
+                date_format=result["date_format"],
+            )
+
+            result["imported"] += self.add_expenses(valid.to_dict("records"))
+            result["rejected_count"] += len(rejected)
+            room = config.IMPORT_REJECTED_REPORT_LIMIT - len(result["rejected"])
+            if room > 0:
+                result["rejected"].extend(rejected.head(room).to_dict("records"))
+
+            result["rows"] += len(chunk)
+            if progress_callback is not None:
+                progress_callback(result["rows"], result["imported"])
+
+        return result
+
+    @staticmethod
+    def _validate_import_chunk(
+        chunk: "pd.DataFrame",
+        first_line: int,
+        date_format: str | None = None,
+    ) -> "tuple[pd.DataFrame, pd.DataFrame]":
+        """Normalize an import chunk and split it into valid and rejected rows
+
+        Args:
+            chunk: Raw CSV rows with lower-case column names, all columns read as strings
+            first_line: CSV line number of the first row in the chunk (the header is line 1)
+            date_format: Date format of the ``date`` column, if known
+
+        Returns:
+            tuple: Valid rows with amount, description, category and date columns, and the
+            rejected rows with their CSV line number and a rejection reason
+        """
+        import pandas as pd  # noqa: PLC0415
+
+        amounts = pd.to_numeric(chunk["amount"].str.strip(), errors="coerce")
+        descriptions = chunk["description"].str.strip()
+        categories = chunk["category"].str.strip() if "category" in chunk.columns else pd.Series("", index=chunk.index)
+        categories = categories.mask(categories.eq(""), "Other")
+        raw_dates = chunk["date"].str.strip() if "date" in chunk.columns else pd.Series("", index=chunk.index)
+        dates = normalize_dates(raw_dates, date_format=date_format).dates.mask(raw_dates.eq(""), get_current_date())
+
+        checks = [
+            (amounts.isna(), "invalid amount"),
+            (amounts < config.MIN_EXPENSE_AMOUNT, f"amount below {config.MIN_EXPENSE_AMOUNT}"),
+            (amounts > config.MAX_EXPENSE_AMOUNT, f"amount above {config.MAX_EXPENSE_AMOUNT}"),
+            (descriptions.eq(""), "missing description"),
+            (descriptions.str.len() > config.MAX_DESCRIPTION_LENGTH, "description too long"),
+            (categories.str.len() > config.MAX_CATEGORY_LENGTH, "category too long"),
+            (dates.isna(), "invalid date"),
+        ]
+        reasons = pd.Series("", index=chunk.index)
+        for mask, reason in checks:
+            reasons = reasons.mask(mask & reasons.eq(""), reason)
+
+        is_valid = reasons.eq("")
+        valid = pd.DataFrame(
+            {
+                "amount": amounts[is_valid],
+                "description": descriptions[is_valid],
+                "category": categories[is_valid],
+                "date": dates[is_valid],
+            },
+        )
+
+        rejected = chunk[~is_valid].copy()
+        rejected.insert(0, "line", first_line + (chunk.index[~is_valid] - chunk.index[0]))
+        rejected["reason"] = reasons[~is_valid]
+
+        return valid, rejected
+
+    def validate_expense_fields(self, fields: dict) -> dict:
+        """Normalize some fields of an expense with the same rules as an imported row
+
+        Args:
+            fields: Any of amount, description, category and date, e.g. from an update request
+
+        Returns:
+            dict: The same fields, normalized (amount as a float, text stripped, date as YYYY-MM-DD)
+
+        Raises:
+            ValueError: With the rejection reason of the first invalid field
+        """
+        # Valid placeholders for the required fields that are not given, so that only the given ones can fail
+        record = {"amount": str(config.MIN_EXPENSE_AMOUNT), "description": "-", **fields}
+        valid, rejected = self._validate_import_chunk(_records_frame([record]), 1)
+        if len(rejected):
+            raise ValueError(rejected["reason"].iloc[0])
+
+        row = valid.iloc[0]
+        return {field: float(row[field]) if field == "amount" else row[field] for field in fields}
+
     def clear_all_data(self) -> bool:
         """Clear all expense data (use with caution!)"""
         try:
-            self.expenses_table.truncate()
+            with self._exclusive():
+                manifest = self._load_manifest()
+                self.partitions.truncate(manifest)
+                self.partitions.write_manifest(manifest)
+                self.changes.append("clear")
+            self.changes.poll()
             return True  # noqa: TRY300
-        except Exception as e:
-            print(f"Error clearing data: {e}")  # noqa: T201
+        except Exception:
+            logger.exception("Error clearing data")
             return False
 
-    def export_to_csv(self, filename: str | None) -> str:
-        """Export expenses to CSV file"""
-        if filename is None:
-            filename = f"expenses_export_{datetime.now(tz=UTC).strftime('%Y%m%d_%H%M%S')}.csv"
+    def compact(self, keep_events: int = config.CHANGE_LOG_KEEP_EVENTS) -> dict:
+        """Shrink the ledger's files: trim the change log and remove stale column store versions
+
+        Managers that are behind the trimmed change log reload instead of
+        applying the events they missed. Empty partition files are kept, as
+        other processes may hold them open (see ``PartitionedTable._drop``).
+
+        Args:
+            keep_events: Latest change events left in the log (at least one is kept)
+
+        Returns:
+            dict: ``events_dropped``, ``column_versions_removed`` and ``temporary_files_removed``
+            (left behind by interrupted writes), plus the ledger's size on disk ``bytes_before`` and ``bytes_after``
+        """
+        from storage.column_store import ColumnStore  # noqa: PLC0415
+
+        bytes_before = self._disk_usage()
+        with self._exclusive():
+            events_dropped = self.changes.compact(keep_events)
+            leftovers = [self.partitions.manifest_path.with_name("manifest.json.tmp")]
+            leftovers += [Path(f"{path}.tmp") for path in (self.changes.log_path, self.changes.seq_path)]
+            temporary_files = [path for path in leftovers if path.exists()]
+            for path in temporary_files:
+                path.unlink()
+
+        # The column store lock is taken before the ledger lock elsewhere, so it is not taken while holding it
+        store = ColumnStore(self.db_path, self.changes, self._snapshot)
+        return {
+            "events_dropped": events_dropped,
+            "column_versions_removed": store.prune(),
+            "temporary_files_removed": len(temporary_files),
+            "bytes_before": bytes_before,
+            "bytes_after": self._disk_usage(),
+        }
 
-        df = self.get_expenses_dataframe()  # noqa: PD901
+    def check_integrity(self) -> dict:
+        """Check the partitions against the manifest, the change log and the column store
 
-        if not df.empty:
-            df.to_csv(filename, index=False)
-            return filename
+        Every stored expense is read and validated (see ``PartitionedTable.check``
+        and ``ChangeFeed.check``), and the live column store version, if it is
+        up to date, must hold the same expense IDs.
 
-        return None
+        Returns:
+            dict: ``expenses``, ``partitions`` and ``seq`` checked, and the ``problems`` found (empty if none)
+        """
+        from storage.column_store import ColumnStore  # noqa: PLC0415
+
+        with self._shared():
+            manifest = self.partitions.read_manifest()
+            problems, ids = self.partitions.check(manifest)
+            problems += self.changes.check()
+            seq = self.changes.current_seq()
+
+        # Checked after releasing the ledger lock, for the same lock order as get_columns
+        store = ColumnStore(self.db_path, self.changes, self._snapshot)
+        problems += store.check(ids, seq)
+        return {"expenses": len(ids), "partitions": len(manifest["partitions"]), "seq": seq, "problems": problems}
+
+    def _disk_usage(self) -> int:
+        """Bytes on disk of the ledger's partitions, change log, column store and sequence number"""
+        paths = [self.changes.log_path, self.changes.seq_path]
+        for directory in (self.partitions.directory, Path(self.db_path).with_suffix(".columns")):
+            if directory.exists():
+                paths.extend(directory.rglob("*"))
+        return sum(path.stat().st_size for path in paths if path.is_file())
+
+    def iter_expense_batches(
+        self,
+        batch_size: int = config.EXPORT_BATCH_SIZE,
+        start_date: str | None = None,
+        end_date: str | None = None,
+        category: str | None = None,
+    ) -> Iterator[list[dict]]:
+        """Iterate over expenses in fixed-size batches
+
+        Args:
+            batch_size: Maximum number of expenses per batch
+            start_date: Only include expenses on or after this date (optional)
+            end_date: Only include expenses on or before this date (optional)
+            category: Only include expenses in this category (optional)
+
+        Yields:
+            list[dict]: Batches of at most ``batch_size`` expenses
+        """
+        if start_date is not None:
+            start_date = convert_for_expense_tracker(start_date)
+        if end_date is not None:
+            end_date = convert_for_expense_tracker(end_date)
+        if category is not None:
+            category = category.capitalize()
+
+        # Partitions outside the date range are skipped without being read, and the others are read one at a
+        # time, so that at most one partition's expenses are held in memory whatever the size of the ledger
+        with self._shared():
+            keys = self.partitions.keys(self.partitions.read_manifest(), start_date, end_date)
+
+        batch = []
+        for key in keys:
+            with self._shared():
+                # A partition emptied since the manifest was read is no longer listed; skip it rather than recreate it
+                if key not in self.partitions.read_manifest()["partitions"]:
+                    continue
+                expenses = self.partitions.read(key)
+
+            for expense in expenses:
+                if not _matches(expense, start_date, end_date, category):
+                    continue
+
+                batch.append(dict(expense))
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+
+        if batch:
+            yield batch
+
+    def stream_csv(
+        self,
+        start_date: str | None = None,
+        end_date: str | None = None,
+        category: str | None = None,
+        batch_size: int = config.EXPORT_BATCH_SIZE,
+    ) -> Iterator[bytes]:
+        """Stream expenses as CSV bytes, one chunk per batch"""
+        return iter_csv_bytes(
+            self.iter_expense_batches(batch_size, start_date=start_date, end_date=end_date, category=category),
+        )
+
+    def export_to_csv(
+        self,
+        filename: str | None = None,
+        start_date: str | None = None,
+        end_date: str | None = None,
+        category: str | None = None,
+        batch_size: int = config.EXPORT_BATCH_SIZE,
+    ) -> str | None:
+        """Export expenses to a CSV file in the export directory
+
+        Returns:
+            str | None: Path of the written file, or None if no expenses matched
+        """
+        path = self._export_path(filename, config.CSV_FILENAME_FORMAT)
+        batches = self.iter_expense_batches(batch_size, start_date=start_date, end_date=end_date, category=category)
+
+        if write_csv(batches, path) == 0:
+            path.unlink(missing_ok=True)
+            return None
+
+        return str(path)
+
+    def export_to_parquet(
+        self,
+        filename: str | None = None,
+        start_date: str | None = None,
+        end_date: str | None = None,
+        category: str | None = None,
+        batch_size: int = config.EXPORT_BATCH_SIZE,
+    ) -> str | None:
+        """Export expenses to a Parquet file in the export directory (requires pyarrow)
+
+        Returns:
+            str | None: Path of the written file, or None if no expenses matched
+        """
+        if not PARQUET_AVAILABLE:
+            raise ImportError("Parquet export requires the 'pyarrow' package")
+
+        path = self._export_path(filename, config.PARQUET_FILENAME_FORMAT)
+        batches = self.iter_expense_batches(batch_size, start_date=start_date, end_date=end_date, category=category)
+
+        if write_parquet(batches, path) == 0:
+            path.unlink(missing_ok=True)
+            return None
+
+        return str(path)
+
+    @staticmethod
+    def _export_path(filename: str | None, filename_format: str) -> Path:
+        """Resolve an export filename relative to the export directory"""
+        if filename is None:
+            filename = filename_format.format(timestamp=datetime.now(tz=UTC).strftime("%Y%m%d_%H%M%S_%f"))
+
+        path = Path(filename)
+        if not path.is_absolute():
+            path = config.EXPORT_DIR / path
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return path
 
     def get_statistics(self) -> dict:
-        """Get comprehensive expense statistics"""
-        expenses = self.get_all_expenses()
+        """Get comprehensive expense statistics, computed from the partition manifest"""
+        with self._shared():
+            manifest = self.partitions.read_manifest()
+        partitions = list(manifest["partitions"].values())
 
-        if not expenses:
+        if not partitions:
             return {
                 "total_expenses": 0,
                 "total_amount": 0,
@@ -270,21 +1089,39 @@ class ExpenseManager:
                 "date_range": None,
             }
 
-        df = pd.DataFrame(expenses)  # noqa: PD901
-        df["date"] = pd.to_datetime(df["date"])
+        category_totals = self._get_category_totals()
+        expense_count = sum(entry["count"] for entry in partitions)
+        total_amount = sum(entry["total"] for entry in partitions)
 
         return {
-            "total_expenses": len(expenses),
-            "total_amount": df["amount"].sum(),
-            "average_expense": df["amount"].mean(),
-            "max_expense": df["amount"].max(),
-            "min_expense": df["amount"].min(),
-            "expense_count": len(expenses),
-            "categories_count": df["category"].nunique(),
+            "total_expenses": expense_count,
+            "total_amount": total_amount,
+            "average_expense": total_amount / expense_count,
+            "max_expense": max(entry["max_amount"] for entry in partitions),
+            "min_expense": min(entry["min_amount"] for entry in partitions),
+            "expense_count": expense_count,
+            "categories_count": len(category_totals),
             "date_range": {
-                "start": df["date"].min().strftime("%Y-%m-%d"),
-                "end": df["date"].max().strftime("%Y-%m-%d"),
+                "start": min(entry["min_date"] for entry in partitions),
+                "end": max(entry["max_date"] for entry in partitions),
             },
-            "most_expensive_category": df.groupby("category")["amount"].sum().idxmax(),
-            "most_frequent_category": df["category"].mode().iloc[0] if not df["category"].mode().empty else None,
+            # Ties go to the alphabetically first category
+            "most_expensive_category": max(category_totals, key=lambda category: category_totals[category][0]),
+            "most_frequent_category": max(category_totals, key=lambda category: category_totals[category][1]),
         }
+
+
+def _matches(expense: dict, start_date: str | None, end_date: str | None, category: str | None) -> bool:
+    """Whether an expense is in a date range and category (None for no restriction)"""
+    return (
+        (start_date is None or expense["date"] >= start_date)
+        and (end_date is None or expense["date"] <= end_date)
+        and (category is None or expense["category"] == category)
+    )
+
+
+def _records_frame(records: list[dict]) -> "pd.DataFrame":
+    """Raw string rows of expense dicts, as read from a CSV"""
+    import pandas as pd  # noqa: PLC0415
+
+    return pd.DataFrame(records, dtype=object).fillna("").astype(str)
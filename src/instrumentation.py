@@ -0,0 +1,361 @@
+"""Opt-in timing instrumentation for ExpenseManager methods and page renders
+
+Functions decorated with ``instrument`` (and every public method of a class
+decorated with ``instrument_methods``) record their latency, call count,
+errors and the number of rows they touched into process-wide rolling
+histograms: each metric keeps one latency histogram per time slot, and
+slots older than the window are dropped, so the statistics reflect recent
+traffic only. Rows are counted from the return value (the length of a list
+or DataFrame, or an int such as the number of rows inserted); a call that
+returns nothing, such as a page render, is credited with the rows touched
+by the instrumented calls it made.
+
+Recording is off unless ``config.INSTRUMENTATION_ENABLED`` is set or it is
+switched on at runtime (``recorder.enabled = True``). Independently, calls
+slower than a threshold can be reported to a handler
+(``recorder.watch_slow_calls``, used by the slow-query log) together with
+their arguments and the rows they scanned in storage (counted by
+``record_scan``). Observers (``recorder.add_observer``, used by the memory
+profiler) wrap every timed call in a context manager of their own. While
+none of these is on, a wrapped call costs one attribute check.
+"""
+
+import bisect
+import functools
+import inspect
+import logging
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import AbstractContextManager, ExitStack, contextmanager
+from contextvars import ContextVar
+from typing import NamedTuple
+
+import config
+
+# Upper bounds of the latency buckets in milliseconds; the last bucket is unbounded
+LATENCY_BUCKETS_MS = [0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+logger = logging.getLogger(__name__)
+
+
+class Span:
+    """Rows touched by one instrumented call, including the instrumented calls it made"""
+
+    def __init__(self):
+        """Initialize a span that has not touched any rows yet"""
+        self.rows = None
+        self.child_rows = 0
+        self.scanned = 0
+
+
+class SlowCall(NamedTuple):
+    """An instrumented call that took longer than the slow-call threshold"""
+
+    name: str
+    func: Callable
+    args: tuple
+    kwargs: dict
+    seconds: float
+    rows_returned: int | None
+    rows_scanned: int | None
+    error: bool
+
+
+_current_span: ContextVar[Span | None] = ContextVar("current_span", default=None)
+
+
+class RollingHistogram:
+    """Latency histogram, call, error and row counts of one metric over a rolling time window"""
+
+    def __init__(self, window_seconds: float, slot_seconds: float):
+        """Initialize an empty histogram
+
+        Args:
+            window_seconds: How far back the statistics reach
+            slot_seconds: Granularity with which old samples expire
+        """
+        self.window_seconds = window_seconds
+        self.slot_seconds = slot_seconds
+        self._slots = {}
+
+    def record(self, seconds: float, rows: int, error: bool, now: float):
+        """Add one call to the slot of ``now`` and drop the slots that left the window"""
+        index = int(now // self.slot_seconds)
+        slot = self._slots.get(index)
+        if slot is None:
+            oldest = index - int(self.window_seconds // self.slot_seconds)
+            for stale in [stale for stale in self._slots if stale <= oldest]:
+                del self._slots[stale]
+            slot = self._slots[index] = _empty_counts()
+        _add_call(slot, seconds, rows, error)
+
+    def summary(self, now: float) -> dict | None:
+        """Merged statistics of the slots inside the window, or None if there were no calls"""
+        oldest = int(now // self.slot_seconds) - int(self.window_seconds // self.slot_seconds)
+        slots = [slot for index, slot in self._slots.items() if index > oldest]
+        calls = sum(slot["calls"] for slot in slots)
+        if not calls:
+            return None
+
+        buckets = [sum(counts) for counts in zip(*(slot["buckets"] for slot in slots), strict=True)]
+        total_ms = sum(slot["total_ms"] for slot in slots)
+        max_ms = max(slot["max_ms"] for slot in slots)
+        return {
+            "calls": calls,
+            "errors": sum(slot["errors"] for slot in slots),
+            "rows": sum(slot["rows"] for slot in slots),
+            "mean_ms": total_ms / calls,
+            "p50_ms": _bucket_percentile(buckets, calls, 0.50, max_ms),
+            "p95_ms": _bucket_percentile(buckets, calls, 0.95, max_ms),
+            "p99_ms": _bucket_percentile(buckets, calls, 0.99, max_ms),
+            "max_ms": max_ms,
+            "total_ms": total_ms,
+            "buckets": buckets,
+        }
+
+
+def _empty_counts() -> dict:
+    """Counters of a histogram without calls"""
+    return {
+        "buckets": [0] * (len(LATENCY_BUCKETS_MS) + 1),
+        "calls": 0,
+        "errors": 0,
+        "rows": 0,
+        "total_ms": 0.0,
+        "max_ms": 0.0,
+    }
+
+
+def _add_call(counts: dict, seconds: float, rows: int, error: bool):
+    """Add one call to histogram counters"""
+    ms = seconds * 1000
+    counts["buckets"][bisect.bisect_left(LATENCY_BUCKETS_MS, ms)] += 1
+    counts["calls"] += 1
+    counts["errors"] += error
+    counts["rows"] += rows
+    counts["total_ms"] += ms
+    counts["max_ms"] = max(counts["max_ms"], ms)
+
+
+def _bucket_percentile(buckets: list[int], calls: int, fraction: float, max_ms: float) -> float:
+    """Upper bound of the bucket holding the given percentile (capped at the slowest call)"""
+    target = fraction * calls
+    seen = 0
+    for bound, count in zip([*LATENCY_BUCKETS_MS, max_ms], buckets, strict=True):
+        seen += count
+        if seen >= target:
+            return min(bound, max_ms)
+    return max_ms
+
+
+class Recorder:
+    """Process-wide registry of rolling histograms, one per instrumented function
+
+    Alongside the rolling histograms, the recorder keeps cumulative counters
+    since the process started (for scrapers such as Prometheus, which expect
+    counters that never go down).
+    """
+
+    def __init__(
+        self,
+        enabled: bool = False,
+        window_seconds: float = config.INSTRUMENTATION_WINDOW_SECONDS,
+        slot_seconds: float = config.INSTRUMENTATION_SLOT_SECONDS,
+    ):
+        """Initialize an empty recorder"""
+        self.enabled = enabled
+        self.window_seconds = window_seconds
+        self.slot_seconds = slot_seconds
+        self.slow_call_seconds = None
+        self.slow_call_handler = None
+        self.observers = []
+        self._histograms = {}
+        self._totals = {}
+        self._lock = threading.Lock()
+
+    @property
+    def active(self) -> bool:
+        """Whether instrumented calls are timed: recording is on, slow calls are watched or observers are added"""
+        return self.enabled or self.slow_call_handler is not None or bool(self.observers)
+
+    def add_observer(self, observer: Callable[[str], AbstractContextManager]):
+        """Enter ``observer(name)`` around every timed call, outside of the measured time"""
+        if observer not in self.observers:
+            self.observers = [*self.observers, observer]
+
+    def remove_observer(self, observer: Callable[[str], AbstractContextManager]):
+        """Stop calling an observer"""
+        self.observers = [added for added in self.observers if added != observer]
+
+    def watch_slow_calls(self, threshold_seconds: float | None, handler: Callable[[SlowCall], None] | None):
+        """Report calls taking at least ``threshold_seconds`` to ``handler`` (None stops watching)"""
+        self.slow_call_seconds = threshold_seconds
+        self.slow_call_handler = handler if threshold_seconds is not None else None
+
+    def report_slow_call(self, call: SlowCall):
+        """Pass a call to the slow-call handler if it exceeded the threshold"""
+        handler = self.slow_call_handler
+        if handler is None or call.seconds < self.slow_call_seconds:
+            return
+        try:
+            handler(call)
+        except Exception:
+            logger.exception("Slow-call handler failed for %s", call.name)
+
+    def record(self, name: str, seconds: float, rows: int = 0, error: bool = False):
+        """Add one call of ``name`` to its histogram"""
+        now = time.time()
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = RollingHistogram(self.window_seconds, self.slot_seconds)
+            histogram.record(seconds, rows, error, now)
+            _add_call(self._totals.setdefault(name, _empty_counts()), seconds, rows, error)
+
+    def snapshot(self) -> list[dict]:
+        """Statistics of every metric called within the window, slowest total time first"""
+        now = time.time()
+        with self._lock:
+            summaries = [
+                {"name": name, **summary}
+                for name, histogram in self._histograms.items()
+                if (summary := histogram.summary(now)) is not None
+            ]
+        return sorted(summaries, key=lambda summary: summary["total_ms"], reverse=True)
+
+    def totals(self) -> dict[str, dict]:
+        """Cumulative calls, errors, rows, total time and latency buckets of every function since start"""
+        with self._lock:
+            return {name: {**counts, "buckets": list(counts["buckets"])} for name, counts in self._totals.items()}
+
+    def reset(self):
+        """Forget the calls in the rolling window (the cumulative totals are kept)"""
+        with self._lock:
+            self._histograms.clear()
+
+
+recorder = Recorder(config.INSTRUMENTATION_ENABLED)
+
+
+def count_rows(result) -> int | None:
+    """Rows touched according to a return value, or None if it does not tell"""
+    if isinstance(result, bool):
+        return None
+    if isinstance(result, int):
+        return result
+    if isinstance(result, (str, bytes, dict)) or not hasattr(result, "__len__"):
+        return None
+    # A tuple is one record (such as Aggregates), unless it defines its length as a row count (Columns)
+    if isinstance(result, tuple) and type(result).__len__ is tuple.__len__:
+        return None
+    return len(result)
+
+
+def record_scan(rows: int):
+    """Count rows read from storage towards the innermost instrumented call"""
+    span = _current_span.get()
+    if span is not None:
+        span.scanned += rows
+
+
+@contextmanager
+def timed(name: str, func: Callable | None = None, args: tuple = (), kwargs: dict | None = None) -> Iterator[Span]:
+    """Record the latency of a block under ``name``
+
+    Set ``rows`` on the yielded span to report the rows the block touched;
+    otherwise it is credited with the rows of the instrumented calls made
+    inside it. Only exceptions count as errors, not Streamlit's rerun and
+    stop signals (which derive from BaseException). ``func``, ``args`` and
+    ``kwargs`` describe the call to the slow-call handler. The observers are
+    entered before the clock starts and exited after it stops.
+    """
+    if not recorder.active:
+        yield Span()
+        return
+
+    span = Span()
+    parent = _current_span.get()
+    token = _current_span.set(span)
+    error = False
+    with ExitStack() as observers:
+        for observer in recorder.observers:
+            observers.enter_context(observer(name))
+        start = time.perf_counter()
+        try:
+            yield span
+        except Exception:
+            error = True
+            raise
+        finally:
+            seconds = time.perf_counter() - start
+            _current_span.reset(token)
+            rows = span.rows or span.child_rows
+            if parent is not None:
+                parent.child_rows += rows
+                parent.scanned += span.scanned
+            if recorder.enabled:
+                recorder.record(name, seconds, rows, error)
+            recorder.report_slow_call(
+                SlowCall(name, func, args, kwargs or {}, seconds, span.rows, span.scanned, error),
+            )
+
+
+def instrument(name: str | None = None) -> Callable[[Callable], Callable]:
+    """Decorator recording each call of a function under ``name`` (its qualified name by default)
+
+    Generator functions are timed from the first to the last item, and
+    credited with the rows of the batches they yield (the rows they scan
+    count towards the caller, which runs between the batches). They are not
+    passed to the observers, as their work is interleaved with the caller's.
+    """
+
+    def decorator(func: Callable) -> Callable:
+        metric = name or func.__qualname__
+
+        if inspect.isgeneratorfunction(func):
+
+            @functools.wraps(func)
+            def generator_wrapper(*args, **kwargs):
+                if not recorder.active:
+                    return (yield from func(*args, **kwargs))
+
+                rows = 0
+                error = False
+                start = time.perf_counter()
+                try:
+                    for item in func(*args, **kwargs):
+                        rows += count_rows(item) or 0
+                        yield item
+                except Exception:
+                    error = True
+                    raise
+                finally:
+                    seconds = time.perf_counter() - start
+                    if recorder.enabled:
+                        recorder.record(metric, seconds, rows, error)
+                    recorder.report_slow_call(SlowCall(metric, func, args, kwargs, seconds, rows, None, error))
+
+            return generator_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not recorder.active:
+                return func(*args, **kwargs)
+
+            with timed(metric, func, args, kwargs) as span:
+                result = func(*args, **kwargs)
+                span.rows = count_rows(result)
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def instrument_methods(cls: type) -> type:
+    """Class decorator instrumenting every public method defined on the class as ``Class.method``"""
+    for attribute, value in list(vars(cls).items()):
+        if not attribute.startswith("_") and inspect.isfunction(value):
+            setattr(cls, attribute, instrument(f"{cls.__name__}.{attribute}")(value))
+    return cls
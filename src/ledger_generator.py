@@ -0,0 +1,243 @@
+"""Seeded synthetic ledger generator
+
+Streams realistic expenses in date order, for load tests, benchmarks and
+demos:
+
+- a category mix that shifts with the weekday (eating out and entertainment
+  at weekends, commuting on workdays) and the season (travel in summer and
+  December, shopping before Christmas, health in winter)
+- recurring bills on fixed days of the month with stable amounts
+- heavy-tailed amounts: lognormal per category, with occasional large
+  purchases drawn from a Pareto tail
+
+The same seed and tenant always produce the same expenses, and each tenant
+gets its own spending profile (spending level, category preferences and
+bills) derived from both. Expenses are written through the bulk insert
+path in batches, so ledgers of millions of rows can be built quickly.
+
+Run from the repository root:
+
+    python src/ledger_generator.py --rows 1000000 [--seed N] [--tenants ID ...] [--db PATH]
+"""
+
+import argparse
+import time
+import zlib
+from collections.abc import Iterable, Iterator
+from datetime import date, timedelta
+from typing import NamedTuple
+
+import numpy as np
+
+import config
+
+DEFAULT_START_DATE = date(2020, 1, 1)
+DEFAULT_DAYS = 5 * 365
+
+# category: (share of day-to-day expenses, lognormal mu, lognormal sigma, descriptions)
+CATEGORY_PROFILES = {
+    "Food": (0.40, 2.6, 0.6, ["Groceries", "Lunch", "Coffee", "Dinner out", "Takeaway", "Bakery"]),
+    "Transport": (0.15, 2.4, 0.7, ["Bus ticket", "Train ticket", "Fuel", "Taxi", "Parking"]),
+    "Entertainment": (0.09, 3.0, 0.7, ["Cinema", "Concert", "Game", "Books", "Museum"]),
+    "Health": (0.05, 3.2, 0.9, ["Pharmacy", "Doctor visit", "Dentist", "Gym"]),
+    "Shopping": (0.17, 3.4, 1.0, ["Clothes", "Electronics", "Home supplies", "Gift", "Online order"]),
+    "Education": (0.04, 3.6, 1.0, ["Course", "Textbook", "Workshop", "Online class"]),
+    "Travel": (0.03, 4.8, 0.9, ["Flight", "Hotel", "Train trip", "Car rental"]),
+    "Other": (0.07, 2.8, 1.0, ["Haircut", "Donation", "Post office", "Laundry"]),
+}
+CATEGORIES = list(CATEGORY_PROFILES)
+
+# Relative likelihood of each category by weekday, Monday first
+WEEKDAY_FACTORS = {
+    "Food": [0.9, 0.9, 0.9, 1.0, 1.2, 1.4, 1.2],
+    "Transport": [1.3, 1.3, 1.3, 1.3, 1.2, 0.5, 0.4],
+    "Entertainment": [0.6, 0.6, 0.7, 0.8, 1.4, 2.0, 1.6],
+    "Shopping": [0.8, 0.8, 0.8, 0.9, 1.1, 1.7, 1.0],
+}
+
+# Relative likelihood of each category by month, January first
+MONTH_FACTORS = {
+    "Travel": [0.6, 0.6, 0.8, 0.9, 1.0, 1.6, 2.4, 2.4, 1.0, 0.8, 0.6, 1.8],
+    "Shopping": [1.1, 0.8, 0.9, 0.9, 0.9, 0.9, 0.9, 0.9, 1.0, 1.0, 1.6, 2.2],
+    "Health": [1.4, 1.3, 1.1, 1.0, 0.8, 0.8, 0.8, 0.8, 0.9, 1.0, 1.2, 1.3],
+}
+
+# Expenses per day also rise at weekends and in December
+DAY_WEEKDAY_FACTORS = [0.9, 0.9, 0.9, 1.0, 1.1, 1.3, 1.0]
+DAY_MONTH_FACTORS = [0.9, 0.9, 1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 1.1, 1.3]
+
+# (description, day of month, base amount, relative variation, probability a tenant has it)
+RECURRING_BILLS = [
+    ("Rent", 1, 1100.0, 0.0, 1.0),
+    ("Internet", 5, 45.0, 0.0, 0.9),
+    ("Electricity", 12, 80.0, 0.25, 1.0),
+    ("Water", 12, 30.0, 0.15, 0.8),
+    ("Streaming subscription", 16, 12.99, 0.0, 0.7),
+    ("Phone plan", 20, 35.0, 0.05, 0.95),
+    ("Insurance", 25, 120.0, 0.0, 0.6),
+]
+
+# Share of day-to-day expenses that are large one-off purchases, and the Pareto shape and scale of
+# the factor their amount is multiplied by
+LARGE_PURCHASE_RATE = 0.01
+LARGE_PURCHASE_SHAPE = 2.0
+LARGE_PURCHASE_SCALE = 4.0
+
+
+class TenantProfile(NamedTuple):
+    """Spending habits of one tenant"""
+
+    scale: float
+    category_weights: np.ndarray
+    bills: list[tuple[str, int, float, float]]
+
+
+def tenant_profile(seed: int, tenant_id: str = "") -> TenantProfile:
+    """Derive a tenant's spending profile from the seed and tenant ID"""
+    rng = np.random.default_rng([seed, zlib.crc32(tenant_id.encode("utf-8")), 0])
+    # Each tenant leans towards some categories: the base shares are scaled by random factors around 1
+    weights = np.array([profile[0] for profile in CATEGORY_PROFILES.values()])
+    weights *= rng.gamma(8.0, 1 / 8.0, len(CATEGORIES))
+    scale = float(rng.lognormal(0.0, 0.3))
+    bills = [
+        (description, day, round(amount * scale, 2), variation)
+        for description, day, amount, variation, probability in RECURRING_BILLS
+        if rng.random() < probability
+    ]
+    return TenantProfile(scale, weights / weights.sum(), bills)
+
+
+def generate_expenses(
+    count: int,
+    seed: int = 0,
+    tenant_id: str = "",
+    start_date: date = DEFAULT_START_DATE,
+    days: int = DEFAULT_DAYS,
+) -> Iterator[dict]:
+    """Stream ``count`` expenses in date order, spread over about ``days`` days from ``start_date``
+
+    Args:
+        count: Number of expenses to generate
+        seed: Random seed; the same seed and tenant give the same expenses
+        tenant_id: Tenant whose spending profile to use
+        start_date: Date of the first day
+        days: Days to spread the expenses over (the ledger runs a little longer if it falls short)
+
+    Yields:
+        dict: Expenses with amount, description, category and date keys
+    """
+    profile = tenant_profile(seed, tenant_id)
+    rng = np.random.default_rng([seed, zlib.crc32(tenant_id.encode("utf-8")), 1])
+
+    bills_per_day = len(profile.bills) / 30.4
+    daily_rate = max(count / days - bills_per_day, 0.1)
+    emitted = 0
+    day = start_date
+
+    while emitted < count:
+        # Bills come first on their day of the month
+        for description, day_of_month, amount, variation in profile.bills:
+            if day.day == day_of_month and emitted < count:
+                billed = amount * (1 + variation * rng.standard_normal()) if variation else amount
+                yield {
+                    "amount": round(min(max(billed, 1.0), config.MAX_EXPENSE_AMOUNT), 2),
+                    "description": description,
+                    "category": "Bills",
+                    "date": day.isoformat(),
+                }
+                emitted += 1
+
+        expected = daily_rate * DAY_WEEKDAY_FACTORS[day.weekday()] * DAY_MONTH_FACTORS[day.month - 1]
+        n = min(int(rng.poisson(expected)), count - emitted)
+        if n:
+            yield from _day_expenses(rng, profile, day, n)
+            emitted += n
+        day += timedelta(days=1)
+
+
+def _day_expenses(rng: np.random.Generator, profile: TenantProfile, day: date, n: int) -> Iterator[dict]:
+    """Draw ``n`` day-to-day expenses for one day"""
+    weights = profile.category_weights.copy()
+    for code, category in enumerate(CATEGORIES):
+        weights[code] *= WEEKDAY_FACTORS.get(category, [1.0] * 7)[day.weekday()]
+        weights[code] *= MONTH_FACTORS.get(category, [1.0] * 12)[day.month - 1]
+
+    codes = rng.choice(len(CATEGORIES), size=n, p=weights / weights.sum())
+    mus = np.array([CATEGORY_PROFILES[CATEGORIES[code]][1] for code in codes])
+    sigmas = np.array([CATEGORY_PROFILES[CATEGORIES[code]][2] for code in codes])
+    amounts = rng.lognormal(mus, sigmas) * profile.scale
+
+    # Occasional large purchases: the amount is multiplied by a Pareto-distributed factor
+    large = rng.random(n) < LARGE_PURCHASE_RATE
+    amounts[large] *= 1 + rng.pareto(LARGE_PURCHASE_SHAPE, int(large.sum())) * LARGE_PURCHASE_SCALE
+    # The heavy tail can exceed what the app accepts, and the ledger is written without validation
+    amounts = np.clip(amounts, config.MIN_EXPENSE_AMOUNT, config.MAX_EXPENSE_AMOUNT)
+    choices = rng.random(n)
+
+    for code, amount, choice in zip(codes.tolist(), amounts.tolist(), choices.tolist(), strict=True):
+        descriptions = CATEGORY_PROFILES[CATEGORIES[code]][3]
+        yield {
+            "amount": round(amount, 2),
+            "description": descriptions[int(choice * len(descriptions))],
+            "category": CATEGORIES[code],
+            "date": day.isoformat(),
+        }
+
+
+def write_ledger(target, expenses: Iterable[dict], batch_size: int = config.GENERATOR_BATCH_SIZE) -> int:
+    """Write expenses through a bulk insert path, one batch at a time
+
+    Args:
+        target: Any store with an ``add_expenses(list[dict])`` bulk insert, such as ExpenseManager
+        expenses: Expenses to write, e.g. from generate_expenses
+        batch_size: Expenses per bulk insert
+
+    Returns:
+        int: Number of expenses written
+    """
+    written = 0
+    batch = []
+    for expense in expenses:
+        batch.append(expense)
+        if len(batch) >= batch_size:
+            written += target.add_expenses(batch)
+            batch = []
+    if batch:
+        written += target.add_expenses(batch)
+    return written
+
+
+def main():
+    # ExpenseManager is only needed to write a ledger, not to generate expenses
+    from expense_manager import ExpenseManager  # noqa: PLC0415
+
+    parser = argparse.ArgumentParser(description="Generate a seeded synthetic expense ledger")
+    parser.add_argument("--rows", type=int, default=100_000, help="expenses per tenant")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--days", type=int, default=DEFAULT_DAYS, help="days the expenses are spread over")
+    parser.add_argument("--start", type=date.fromisoformat, default=DEFAULT_START_DATE, help="first date")
+    parser.add_argument("--tenants", nargs="+", help="write one ledger per tenant under config.TENANTS_DIR")
+    parser.add_argument("--db", help="ledger file to write (defaults to config.DATABASE_FILE)")
+    parser.add_argument("--batch-size", type=int, default=config.GENERATOR_BATCH_SIZE)
+    args = parser.parse_args()
+
+    config.ensure_directories()
+    targets = (
+        [(tenant_id, ExpenseManager.for_tenant(tenant_id)) for tenant_id in args.tenants]
+        if args.tenants
+        else [("", ExpenseManager(args.db or str(config.DATABASE_FILE)))]
+    )
+
+    for tenant_id, manager in targets:
+        start = time.perf_counter()
+        expenses = generate_expenses(args.rows, args.seed, tenant_id, args.start, args.days)
+        written = write_ledger(manager, expenses, args.batch_size)
+        seconds = time.perf_counter() - start
+        print(  # noqa: T201
+            f"{manager.db_path}: {written} expenses in {seconds:.1f}s ({written / seconds:,.0f} rows/s)",
+        )
+        manager.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+"""Memory profiling mode for page renders and ExpenseManager calls
+
+While the profiler is on, ``tracemalloc`` traces every allocation and the
+profiler observes the instrumented calls (see ``instrumentation``):
+
+- each page render starts from cleared traces and ends with a snapshot of
+  the allocations it made and kept, which are added to the top allocating
+  call sites (the line that allocated, and the innermost line of this app
+  on the way there) and to the retained-size growth of the session that
+  rendered it
+- each ExpenseManager call records the change of traced memory across the
+  call (snapshots around every call would cost more than the calls)
+- after every rerun, the size of the session's ``st.session_state`` is
+  measured per key, counting the edit-form keys of the View Expenses page
+
+Tracing slows allocations down and the snapshots take time proportional to
+the number of live objects, so the mode is off unless
+``config.MEMORY_PROFILING_ENABLED`` is set or it is switched on from the
+Performance page. Traced memory is process-wide: with several sessions
+rerunning at once, a render is also charged with the others' allocations,
+and memory freed during a render that was allocated before it is not
+subtracted from its growth.
+"""
+
+import gc
+import threading
+import tracemalloc
+import types
+import uuid
+from collections import OrderedDict
+from collections.abc import Iterator, MutableMapping
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+
+import config
+from instrumentation import recorder
+
+# Source directory of the app, to find the app's own frame in an allocation traceback
+APP_DIR = str(Path(__file__).resolve().parent)
+
+# Session state key holding the session's ID in the profiler's reports
+SESSION_KEY = "profiling_session"
+
+# Session state keys left behind by the View Expenses edit forms
+EDIT_KEY_PREFIXES = ("editing_", "edit_version_")
+
+# Sessions and call sites kept in the reports (the least recent or smallest are dropped)
+MAX_SESSIONS = 100
+MAX_SITES = 500
+
+# Objects walked when measuring one session state value
+MAX_OBJECTS_PER_VALUE = 200_000
+
+# Shared objects that are not counted towards the size of session state values
+_UNSIZED_TYPES = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType, types.CodeType)
+
+_current_session: ContextVar[str | None] = ContextVar("current_session", default=None)
+
+
+def deep_sizeof(value, max_objects: int = MAX_OBJECTS_PER_VALUE) -> int:
+    """Approximate bytes held by a value and the objects it references
+
+    Classes, modules and functions are shared by the whole process and are
+    not counted; the walk stops after ``max_objects`` objects.
+    """
+    seen = set()
+    pending = [value]
+    size = 0
+    while pending and len(seen) < max_objects:
+        obj = pending.pop()
+        if id(obj) in seen or isinstance(obj, _UNSIZED_TYPES):
+            continue
+        seen.add(id(obj))
+        try:
+            size += obj.__sizeof__()
+        except TypeError:
+            continue
+        pending.extend(gc.get_referents(obj))
+    return size
+
+
+def _site(frame: tracemalloc.Frame) -> str:
+    """``file:line`` of a frame, relative to the app's source directory or site-packages when inside them"""
+    filename = frame.filename
+    if filename.startswith(APP_DIR):
+        filename = filename[len(APP_DIR) + 1 :]
+    elif "site-packages" in filename:
+        filename = filename.rpartition("site-packages")[2].lstrip("/\\")
+    return f"{filename}:{frame.lineno}"
+
+
+def _app_site(traceback: tracemalloc.Traceback) -> str | None:
+    """Innermost frame of the app's own code in an allocation traceback"""
+    for frame in reversed(traceback):
+        if frame.filename.startswith(APP_DIR):
+            return _site(frame)
+    return None
+
+
+class MemoryProfiler:
+    """Process-wide tracemalloc profiler of page renders, ExpenseManager calls and session state"""
+
+    def __init__(self, frames: int = config.MEMORY_PROFILING_FRAMES):
+        """Initialize a profiler that is not running yet
+
+        Args:
+            frames: Traceback depth stored per allocation; with more than one frame, allocations made inside
+                libraries are also credited to the innermost line of the app that led to them
+        """
+        self.frames = frames
+        self._started_tracing = False
+        self._lock = threading.Lock()
+        self._sites = {}
+        self._calls = {}
+        self._sessions = OrderedDict()
+
+    @property
+    def enabled(self) -> bool:
+        """Whether the profiler observes the instrumented calls"""
+        return self.observe in recorder.observers
+
+    def start(self):
+        """Start tracing allocations (unless already traced) and observing the instrumented calls"""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self._started_tracing = True
+        recorder.add_observer(self.observe)
+
+    def stop(self):
+        """Stop observing, and stop tracing if the profiler started it (the reports are kept)"""
+        recorder.remove_observer(self.observe)
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def reset(self):
+        """Forget the call sites, calls and sessions measured so far"""
+        with self._lock:
+            self._sites.clear()
+            self._calls.clear()
+            self._sessions.clear()
+
+    @contextmanager
+    def observe(self, name: str) -> Iterator[None]:
+        """Measure an instrumented call: a snapshot of what a page render kept, traced memory around other calls"""
+        if not tracemalloc.is_tracing():
+            yield
+            return
+        if name.startswith("show_"):
+            with self._page_render(name):
+                yield
+            return
+
+        before = tracemalloc.get_traced_memory()[0]
+        try:
+            yield
+        finally:
+            self._add_call(name, tracemalloc.get_traced_memory()[0] - before)
+
+    @contextmanager
+    def _page_render(self, name: str) -> Iterator[None]:
+        """Attribute the memory a page render allocated and kept to its call sites and session
+
+        The traces are cleared when the render starts, so the snapshot taken
+        when it ends holds only the allocations it made that are still alive.
+        Comparing two snapshots of the whole heap instead would take tens of
+        seconds once pandas and plotly are loaded.
+        """
+        tracemalloc.clear_traces()
+        try:
+            yield
+        finally:
+            snapshot = tracemalloc.take_snapshot()
+            # Grouping the traces allocates a lot, which is much slower while traced, so tracing pauses meanwhile
+            # (the next render clears the traces anyway)
+            paused = self._started_tracing
+            if paused:
+                tracemalloc.stop()
+            try:
+                statistics = snapshot.statistics("traceback")
+                retained = sum(statistic.size for statistic in statistics)
+                self._add_call(name, retained)
+                self._add_sites(name, statistics)
+                self._add_render(_current_session.get(), retained)
+            finally:
+                if paused:
+                    tracemalloc.start(self.frames)
+
+    def _add_call(self, name: str, retained: int):
+        """Add one call and the traced memory it retained"""
+        with self._lock:
+            counts = self._calls.setdefault(name, {"calls": 0, "retained_bytes": 0, "max_retained_bytes": 0})
+            counts["calls"] += 1
+            counts["retained_bytes"] += retained
+            counts["max_retained_bytes"] = max(counts["max_retained_bytes"], retained)
+
+    def _add_sites(self, page: str, statistics: list[tracemalloc.Statistic]):
+        """Add the allocations a render kept to their call sites, keeping the largest sites"""
+        with self._lock:
+            for statistic in statistics:
+                key = (_site(statistic.traceback[-1]), _app_site(statistic.traceback))
+                site = self._sites.setdefault(key, {"size_bytes": 0, "count": 0, "pages": set()})
+                site["size_bytes"] += statistic.size
+                site["count"] += statistic.count
+                site["pages"].add(page)
+            if len(self._sites) > MAX_SITES:
+                largest = sorted(self._sites.items(), key=lambda item: item[1]["size_bytes"], reverse=True)
+                self._sites = dict(largest[:MAX_SITES])
+
+    def _session(self, session_id: str) -> dict:
+        """Statistics of a session, created on first use (call with the lock held)"""
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = self._sessions[session_id] = {
+                "renders": 0,
+                "retained_bytes": 0,
+                "last_retained_bytes": 0,
+                "state_keys": 0,
+                "state_bytes": 0,
+                "edit_keys": 0,
+                "largest_keys": [],
+            }
+            while len(self._sessions) > MAX_SESSIONS:
+                self._sessions.popitem(last=False)
+        self._sessions.move_to_end(session_id)
+        return session
+
+    def _add_render(self, session_id: str | None, retained: int):
+        """Add a page render's retained growth to its session"""
+        if session_id is None:
+            return
+        with self._lock:
+            session = self._session(session_id)
+            session["renders"] += 1
+            session["retained_bytes"] += retained
+            session["last_retained_bytes"] = retained
+
+    def track_session_state(self, session_id: str, state: MutableMapping):
+        """Measure the size of a session's state per key"""
+        sizes = {str(key): deep_sizeof(value) for key, value in list(state.items())}
+        edit_keys = sum(key.startswith(EDIT_KEY_PREFIXES) for key in sizes)
+        with self._lock:
+            session = self._session(session_id)
+            session["state_keys"] = len(sizes)
+            session["state_bytes"] = sum(sizes.values())
+            session["edit_keys"] = edit_keys
+            session["largest_keys"] = sorted(sizes.items(), key=lambda item: item[1], reverse=True)[:5]
+
+    @contextmanager
+    def session(self, state: MutableMapping) -> Iterator[None]:
+        """Attribute the page renders of a rerun to its session, and measure the session state afterwards
+
+        Args:
+            state: The session's ``st.session_state``, which also keeps the session's ID for the reports
+        """
+        if not self.enabled:
+            yield
+            return
+        session_id = state.setdefault(SESSION_KEY, uuid.uuid4().hex[:8])
+        token = _current_session.set(session_id)
+        try:
+            yield
+        finally:
+            _current_session.reset(token)
+            self.track_session_state(session_id, state)
+
+    def top_sites(self, limit: int = config.MEMORY_PROFILING_TOP_SITES) -> list[dict]:
+        """Call sites that retained the most memory across page renders, largest first"""
+        with self._lock:
+            sites = sorted(self._sites.items(), key=lambda item: item[1]["size_bytes"], reverse=True)[:limit]
+            return [
+                {
+                    "site": site,
+                    "app_site": app_site,
+                    "size_bytes": counts["size_bytes"],
+                    "count": counts["count"],
+                    "pages": sorted(counts["pages"]),
+                }
+                for (site, app_site), counts in sites
+            ]
+
+    def calls(self) -> list[dict]:
+        """Calls and retained memory of every observed function, largest total first"""
+        with self._lock:
+            calls = [{"name": name, **counts} for name, counts in self._calls.items()]
+        return sorted(calls, key=lambda call: call["retained_bytes"], reverse=True)
+
+    def sessions(self) -> list[dict]:
+        """Retained growth and session state size of the most recent sessions, most recent first"""
+        with self._lock:
+            return [{"session": session_id, **session} for session_id, session in reversed(self._sessions.items())]
+
+    def traced_memory(self) -> tuple[int, int]:
+        """Current and peak bytes traced since the last page render started (zeros while not tracing)"""
+        return tracemalloc.get_traced_memory()
+
+
+memory_profiler = MemoryProfiler()
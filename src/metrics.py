@@ -0,0 +1,243 @@
+"""Metrics exposition in the Prometheus text format
+
+Renders counters, gauges and histograms from the instrumentation recorder,
+the ledger files on disk and the caches' hit/miss counters:
+
+- ``expense_tracker_writes_total`` and ``expense_tracker_write_rows_total``:
+  ExpenseManager writes per method, and the rows they inserted
+- ``expense_tracker_write_duration_seconds`` and
+  ``expense_tracker_query_duration_seconds``: ExpenseManager latency per method
+- ``expense_tracker_page_render_duration_seconds``: Streamlit page renders
+- ``expense_tracker_errors_total``: calls that raised, per function
+- ``expense_tracker_cache_requests_total`` and ``expense_tracker_cache_hit_ratio``:
+  background job result cache and tenant pool lookups
+- ``expense_tracker_db_size_bytes`` and ``expense_tracker_documents``: size
+  on disk and expense count of each ledger (read from its manifest)
+
+No external service is needed: MetricsExporter serves ``/metrics`` from a
+small local HTTP server, or periodically writes a ``.prom`` file for the
+node_exporter textfile collector. Starting either switches the
+instrumentation recorder on.
+"""
+
+import threading
+from collections.abc import Callable
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import config
+from instrumentation import LATENCY_BUCKETS_MS, recorder
+from storage.partitions import PartitionedTable
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+PREFIX = "expense_tracker"
+
+# ExpenseManager methods that change the ledger; the imports insert through add_expenses, so their calls are
+# also counted under add_expenses
+WRITE_METHODS = {
+    "add_expense",
+    "add_expenses",
+    "update_expense",
+    "delete_expense",
+    "clear_all_data",
+    "import_csv",
+    "import_records",
+    "import_fake_data",
+}
+
+
+def _escape(value: str) -> str:
+    """Escape a label value"""
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(**labels: str) -> str:
+    """Format a label set, e.g. ``{method="add_expense"}``"""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in labels.items()) + "}"
+
+
+def _family(lines: list[str], name: str, kind: str, help_text: str):
+    """Start a metric family"""
+    lines.append(f"# HELP {PREFIX}_{name} {help_text}")
+    lines.append(f"# TYPE {PREFIX}_{name} {kind}")
+
+
+def _histogram(lines: list[str], name: str, labels: dict, counts: dict):
+    """Samples of one histogram series, from instrumentation counters"""
+    cumulative = 0
+    for bound, count in zip([*LATENCY_BUCKETS_MS, None], counts["buckets"], strict=True):
+        cumulative += count
+        le = "+Inf" if bound is None else f"{bound / 1000:g}"
+        lines.append(f"{PREFIX}_{name}_bucket{_labels(**labels, le=le)} {cumulative}")
+    lines.append(f"{PREFIX}_{name}_sum{_labels(**labels)} {counts['total_ms'] / 1000:.6f}")
+    lines.append(f"{PREFIX}_{name}_count{_labels(**labels)} {counts['calls']}")
+
+
+def ledger_size_bytes(db_path: str | Path) -> int:
+    """Bytes on disk of a ledger: its partitions, column store, change log and lock files"""
+    db_path = Path(db_path)
+    size = 0
+    for path in db_path.parent.glob(f"{db_path.stem}.*"):
+        if path.is_dir():
+            size += sum(child.stat().st_size for child in path.rglob("*") if child.is_file())
+        elif path.is_file():
+            size += path.stat().st_size
+    return size
+
+
+def ledger_documents(db_path: str | Path) -> int:
+    """Expense count of a ledger, from its partition manifest"""
+    manifest = PartitionedTable(db_path).read_manifest()
+    return sum(entry["count"] for entry in manifest["partitions"].values())
+
+
+def render_metrics(ledgers: dict[str, str | Path] | None = None, caches: dict[str, object] | None = None) -> str:
+    """Render all metrics in the Prometheus text format
+
+    Args:
+        ledgers: Ledger name (e.g. "default" or a tenant ID) to ledger path, for the size and count gauges
+        caches: Cache name to an object with ``hits`` and ``misses`` counters, such as a JobRunner or TenantPool
+
+    Returns:
+        str: The exposition, ending with a newline
+    """
+    lines = []
+    _call_metrics(lines, recorder.totals())
+    _cache_metrics(lines, caches or {})
+    _ledger_metrics(lines, ledgers or {})
+    return "\n".join(lines) + "\n"
+
+
+def _call_metrics(lines: list[str], totals: dict[str, dict]):
+    """Write counters and latency histograms of ExpenseManager methods and page renders"""
+    methods = {
+        name.removeprefix("ExpenseManager."): counts
+        for name, counts in sorted(totals.items())
+        if name.startswith("ExpenseManager.")
+    }
+    writes = {method: counts for method, counts in methods.items() if method in WRITE_METHODS}
+    queries = {method: counts for method, counts in methods.items() if method not in WRITE_METHODS}
+    pages = {name.removeprefix("show_"): counts for name, counts in sorted(totals.items()) if name.startswith("show_")}
+
+    _family(lines, "writes_total", "counter", "ExpenseManager write calls (imports also count under add_expenses)")
+    lines.extend(
+        f"{PREFIX}_writes_total{_labels(method=method)} {counts['calls']}" for method, counts in writes.items()
+    )
+    _family(
+        lines,
+        "write_rows_total",
+        "counter",
+        "Expenses inserted by bulk writes and imports (add_expense inserts one per call)",
+    )
+    lines.extend(
+        f"{PREFIX}_write_rows_total{_labels(method=method)} {counts['rows']}" for method, counts in writes.items()
+    )
+
+    _family(lines, "write_duration_seconds", "histogram", "Latency of ExpenseManager writes")
+    for method, counts in writes.items():
+        _histogram(lines, "write_duration_seconds", {"method": method}, counts)
+    _family(lines, "query_duration_seconds", "histogram", "Latency of ExpenseManager reads and queries")
+    for method, counts in queries.items():
+        _histogram(lines, "query_duration_seconds", {"method": method}, counts)
+    _family(lines, "page_render_duration_seconds", "histogram", "Time to render a page on a Streamlit rerun")
+    for page, counts in pages.items():
+        _histogram(lines, "page_render_duration_seconds", {"page": page}, counts)
+
+    _family(lines, "errors_total", "counter", "Instrumented calls that raised an exception")
+    lines.extend(
+        f"{PREFIX}_errors_total{_labels(function=name)} {counts['errors']}" for name, counts in sorted(totals.items())
+    )
+
+
+def _cache_metrics(lines: list[str], caches: dict[str, object]):
+    """Write hit and miss counters and the hit ratio of each cache"""
+    _family(lines, "cache_requests_total", "counter", "Cache lookups by result")
+    for name, cache in sorted(caches.items()):
+        lines.append(f"{PREFIX}_cache_requests_total{_labels(cache=name, result='hit')} {cache.hits}")
+        lines.append(f"{PREFIX}_cache_requests_total{_labels(cache=name, result='miss')} {cache.misses}")
+    _family(lines, "cache_hit_ratio", "gauge", "Share of cache lookups that were hits since start")
+    for name, cache in sorted(caches.items()):
+        lookups = cache.hits + cache.misses
+        lines.append(f"{PREFIX}_cache_hit_ratio{_labels(cache=name)} {cache.hits / lookups if lookups else 0:g}")
+
+
+def _ledger_metrics(lines: list[str], ledgers: dict[str, str | Path]):
+    """Write the size on disk and expense count of each ledger"""
+    _family(lines, "db_size_bytes", "gauge", "Bytes on disk of a ledger, including its partitions and column store")
+    for name, path in sorted(ledgers.items()):
+        lines.append(f"{PREFIX}_db_size_bytes{_labels(ledger=name)} {ledger_size_bytes(path)}")
+    _family(lines, "documents", "gauge", "Expenses stored in a ledger")
+    for name, path in sorted(ledgers.items()):
+        lines.append(f"{PREFIX}_documents{_labels(ledger=name)} {ledger_documents(path)}")
+
+
+class MetricsExporter:
+    """Serves or periodically writes the output of ``collect`` (typically a call of render_metrics)"""
+
+    def __init__(self, collect: Callable[[], str]):
+        """Initialize an exporter that has not started yet"""
+        self.collect = collect
+        self.server = None
+        self._stopped = threading.Event()
+        self._threads = []
+
+    def serve(self, port: int, host: str = config.METRICS_HOST) -> ThreadingHTTPServer:
+        """Serve ``GET /metrics`` on a background thread (port 0 picks a free port)"""
+        exporter = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                """Send the metrics, or 404 for any other path"""
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(HTTPStatus.NOT_FOUND)
+                    return
+                body = exporter.collect().encode("utf-8")
+                self.send_response(HTTPStatus.OK)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                """Do not log scrapes"""
+
+        recorder.enabled = True
+        self.server = ThreadingHTTPServer((host, port), MetricsHandler)
+        self.server.daemon_threads = True
+        self._start(self.server.serve_forever, "metrics-server")
+        return self.server
+
+    def write_textfile(self, path: str | Path):
+        """Atomically replace ``path`` with the current metrics"""
+        path = Path(path)
+        tmp_path = path.with_name(f"{path.name}.tmp")
+        tmp_path.write_text(self.collect(), encoding="utf-8")
+        tmp_path.replace(path)
+
+    def write_periodically(self, path: str | Path, interval: float = config.METRICS_TEXTFILE_INTERVAL_SECONDS):
+        """Rewrite the ``.prom`` textfile every ``interval`` seconds on a background thread"""
+
+        def loop():
+            while not self._stopped.is_set():
+                self.write_textfile(path)
+                self._stopped.wait(interval)
+
+        recorder.enabled = True
+        self._start(loop, "metrics-textfile")
+
+    def stop(self):
+        """Stop serving and writing"""
+        self._stopped.set()
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+        for thread in self._threads:
+            thread.join()
+
+    def _start(self, target: Callable[[], None], name: str):
+        """Run ``target`` on a daemon thread"""
+        thread = threading.Thread(target=target, name=name, daemon=True)
+        thread.start()
+        self._threads.append(thread)
@@ -0,0 +1,183 @@
+"""Slow-query log for ExpenseManager operations
+
+Once enabled, every ExpenseManager call (read or write) taking at least
+``config.SLOW_QUERY_THRESHOLD_MS`` is appended to
+``config.SLOW_QUERY_LOG_FILE`` as one JSON line with:
+
+- ``method``, its ``args`` (large values are summarized, e.g.
+  ``"<list of 5000>"``) and its ``pattern``: the method with each argument
+  replaced by its type, so that calls differing only in their values group
+  together
+- ``rows_scanned`` (expenses read from storage) and ``rows_returned``
+- ``elapsed_ms``, whether the call raised (``error``), the ``backend`` and
+  the ``ledger`` path
+
+The calls are timed by the instrumentation wrappers on ExpenseManager. Run
+from the repository root to summarize the log by method or by pattern:
+
+    python src/slow_query_log.py [--log PATH] [--by method|pattern] [--since ISO-TIME] [--top N]
+"""
+
+import argparse
+import inspect
+import json
+import logging
+import statistics
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+
+import config
+from instrumentation import SlowCall, recorder
+from structured_logging import JsonFormatter
+
+logger = logging.getLogger(__name__)
+
+# Longest string argument kept in a log entry
+MAX_ARGUMENT_LENGTH = 100
+
+
+def _argument_value(value):
+    """JSON-friendly form of an argument, summarizing strings, collections and objects"""
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    if isinstance(value, str):
+        return value if len(value) <= MAX_ARGUMENT_LENGTH else f"{value[:MAX_ARGUMENT_LENGTH]}..."
+    if hasattr(value, "__len__"):
+        return f"<{type(value).__name__} of {len(value)}>"
+    return f"<{type(value).__name__}>"
+
+
+def _argument_type(value) -> str:
+    """Type placeholder of an argument in a pattern"""
+    return "None" if value is None else f"<{type(value).__name__}>"
+
+
+def slow_query_entry(call: SlowCall) -> dict:
+    """Log entry fields of a slow ExpenseManager call"""
+    arguments = inspect.signature(call.func).bind_partial(*call.args, **call.kwargs).arguments
+    manager = arguments.pop("self", None)
+    # **kwargs parameters (update_expense's fields) are flattened into the other arguments
+    for parameter in inspect.signature(call.func).parameters.values():
+        if parameter.kind is inspect.Parameter.VAR_KEYWORD:
+            arguments.update(arguments.pop(parameter.name, {}))
+
+    method = call.name.removeprefix("ExpenseManager.")
+    pattern_arguments = ", ".join(f"{name}={_argument_type(value)}" for name, value in arguments.items())
+    return {
+        "method": method,
+        "args": {name: _argument_value(value) for name, value in arguments.items()},
+        "pattern": f"{method}({pattern_arguments})",
+        "rows_scanned": call.rows_scanned,
+        "rows_returned": call.rows_returned,
+        "elapsed_ms": round(call.seconds * 1000, 3),
+        "error": call.error,
+        "backend": getattr(manager, "storage_backend", None),
+        "ledger": str(getattr(manager, "db_path", "")) or None,
+    }
+
+
+def _log_slow_call(call: SlowCall):
+    """Write a slow ExpenseManager call to the slow-query log"""
+    if call.name.startswith("ExpenseManager."):
+        logger.warning("Slow ExpenseManager call", extra={"fields": slow_query_entry(call)})
+
+
+def enable(
+    threshold_ms: float | None = config.SLOW_QUERY_THRESHOLD_MS,
+    path: str | Path = config.SLOW_QUERY_LOG_FILE,
+):
+    """Start writing slow ExpenseManager calls to the log file (a threshold of None disables the log)"""
+    if threshold_ms is None:
+        recorder.watch_slow_calls(None, None)
+        return
+
+    path = Path(path)
+    if not any(getattr(handler, "baseFilename", None) == str(path.resolve()) for handler in logger.handlers):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        handler = RotatingFileHandler(
+            path,
+            maxBytes=config.SLOW_QUERY_LOG_MAX_BYTES,
+            backupCount=config.SLOW_QUERY_LOG_BACKUPS,
+            encoding="utf-8",
+        )
+        handler.setFormatter(JsonFormatter())
+        logger.addHandler(handler)
+    # The slow-query log has its own file, so its entries are not repeated on stderr
+    logger.setLevel(logging.WARNING)
+    logger.propagate = False
+    recorder.watch_slow_calls(threshold_ms / 1000, _log_slow_call)
+
+
+def read_entries(path: str | Path, since: str | None = None) -> list[dict]:
+    """Entries of a slow-query log (skipping lines that are not JSON), optionally from an ISO time on"""
+    entries = []
+    with Path(path).open(encoding="utf-8") as fh:
+        for line in fh:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if since is None or entry.get("ts", "") >= since:
+                entries.append(entry)
+    return entries
+
+
+def summarize(entries: list[dict], by: str = "method") -> list[dict]:
+    """Calls, errors, latency and average rows scanned and returned per method or pattern, slowest total first"""
+    groups = {}
+    for entry in entries:
+        groups.setdefault(entry[by], []).append(entry)
+
+    summaries = []
+    for key, group in groups.items():
+        elapsed = sorted(entry["elapsed_ms"] for entry in group)
+        scanned = [entry["rows_scanned"] for entry in group if entry.get("rows_scanned") is not None]
+        returned = [entry["rows_returned"] for entry in group if entry.get("rows_returned") is not None]
+        summaries.append(
+            {
+                by: key,
+                "calls": len(group),
+                "errors": sum(bool(entry.get("error")) for entry in group),
+                "total_ms": sum(elapsed),
+                "p50_ms": statistics.median(elapsed),
+                "p95_ms": elapsed[min(len(elapsed) - 1, int(0.95 * len(elapsed)))],
+                "max_ms": elapsed[-1],
+                "avg_scanned": statistics.fmean(scanned) if scanned else None,
+                "avg_returned": statistics.fmean(returned) if returned else None,
+            },
+        )
+    return sorted(summaries, key=lambda summary: summary["total_ms"], reverse=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize the ExpenseManager slow-query log")
+    parser.add_argument("--log", type=Path, default=config.SLOW_QUERY_LOG_FILE, help="slow-query log file")
+    parser.add_argument("--by", choices=["method", "pattern"], default="method", help="how to group the calls")
+    parser.add_argument("--since", help="only entries from this ISO time on, e.g. 2024-06-01T12:00")
+    parser.add_argument("--top", type=int, default=20, help="groups to list")
+    args = parser.parse_args()
+
+    if not args.log.exists():
+        parser.exit(1, f"No slow-query log at {args.log}\n")
+    entries = read_entries(args.log, args.since)
+    summaries = summarize(entries, args.by)
+
+    def rows(value):
+        return "-" if value is None else f"{value:,.0f}"
+
+    width = max([len(args.by), *(len(summary[args.by]) for summary in summaries[: args.top])])
+    print(f"{len(entries)} slow calls in {args.log}\n")  # noqa: T201
+    print(  # noqa: T201
+        f"{args.by:<{width}}  {'calls':>6}{'errors':>7}{'total ms':>12}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}"
+        f"{'avg scanned':>13}{'avg returned':>14}",
+    )
+    for summary in summaries[: args.top]:
+        print(  # noqa: T201
+            f"{summary[args.by]:<{width}}  {summary['calls']:>6}{summary['errors']:>7}{summary['total_ms']:>12,.1f}"
+            f"{summary['p50_ms']:>10.1f}{summary['p95_ms']:>10.1f}{summary['max_ms']:>10.1f}"
+            f"{rows(summary['avg_scanned']):>13}{rows(summary['avg_returned']):>14}",
+        )
+
+
+if __name__ == "__main__":
+    main()
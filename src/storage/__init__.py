@@ -0,0 +1 @@
+"""Storage helpers for the Personal Expense Tracker"""
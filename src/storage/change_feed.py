@@ -0,0 +1,342 @@
+"""Change feed for the expense database
+
+Every mutation is appended to a JSON-lines change log next to the database
+(``<db>.changes.jsonl``) with a sequence number that increases monotonically
+across all processes sharing the file. Subscribers in the same process are
+notified as soon as the writer publishes, and a polling watcher thread picks
+up events appended by other processes.
+"""
+
+import json
+import logging
+import os
+import threading
+import types
+import weakref
+from collections.abc import Callable
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import NamedTuple
+
+import config
+
+RESYNC = "resync"
+
+logger = logging.getLogger(__name__)
+
+
+class ChangeEvent(NamedTuple):
+    """A committed mutation of the expense table
+
+    ``op`` is one of ``insert``, ``update``, ``delete`` or ``clear``, or
+    ``resync`` when events were missed (the log was compacted past them) and
+    subscribers must reload instead of applying deltas. ``documents`` holds
+    the stored expenses after an insert or update, or None if the change was
+    too large to log them. Subscribers that reload should remember the
+    sequence number they loaded at and ignore events at or below it.
+    """
+
+    seq: int
+    op: str
+    ids: list[int]
+    documents: list[dict] | None
+    timestamp: str
+
+    @classmethod
+    def from_json(cls, line: str) -> "ChangeEvent":
+        """Parse a change log line"""
+        data = json.loads(line)
+        return cls(data["seq"], data["op"], data["ids"], data.get("documents"), data["timestamp"])
+
+    def to_json(self) -> str:
+        """Serialize the event as one change log line"""
+        return json.dumps(self._asdict(), separators=(",", ":"))
+
+
+class ChangeFeed:
+    """Change log writer, event bus and watcher for one database file
+
+    Use ``ChangeFeed.for_database`` to share a single feed between all
+    managers on the same file in a process. Subscribers that are bound methods
+    are held weakly, so an abandoned manager does not keep receiving events.
+    A feed is forgotten by ``for_database`` once its last subscriber is gone,
+    so that a process opening many ledgers over time does not keep them all.
+    """
+
+    _feeds = {}
+    _feeds_lock = threading.Lock()
+
+    def __init__(self, db_path: str | Path, poll_seconds: float = config.CHANGE_FEED_POLL_SECONDS):
+        """Initialize the feed, starting after the last event already logged"""
+        self.key = os.path.abspath(db_path)  # noqa: PTH100
+        self.log_path = Path(f"{db_path}.changes.jsonl")
+        self.seq_path = Path(f"{db_path}.seq")
+        self.poll_seconds = poll_seconds
+
+        self._subscribers = []
+        self._dispatch_lock = threading.RLock()
+        self._watcher = None
+        self._stop = threading.Event()
+
+        self.last_seq = self._read_seq()
+        self._offset, self._inode = self._log_position()
+
+    @classmethod
+    def for_database(cls, db_path: str | Path) -> "ChangeFeed":
+        """Get the process-wide feed of a database file"""
+        key = os.path.abspath(db_path)  # noqa: PTH100
+        with cls._feeds_lock:
+            if key not in cls._feeds:
+                cls._feeds[key] = cls(db_path)
+            return cls._feeds[key]
+
+    def append(self, op: str, ids: list[int] | None = None, documents: list[dict] | None = None) -> ChangeEvent:
+        """Log a mutation with the next sequence number (call with the database's exclusive lock held)
+
+        Args:
+            op: Kind of mutation (insert, update, delete or clear)
+            ids: IDs of the affected expenses (taken from ``documents`` if not given)
+            documents: Expenses as stored after an insert or update (optional)
+
+        Returns:
+            ChangeEvent: The logged event
+        """
+        if ids is None:
+            ids = [document["id"] for document in documents or []]
+        if documents is not None and len(documents) > config.CHANGE_EVENT_MAX_DOCUMENTS:
+            documents = None
+
+        event = ChangeEvent(
+            seq=self._read_seq() + 1,
+            op=op,
+            ids=ids,
+            documents=documents,
+            timestamp=datetime.now(tz=UTC).isoformat(),
+        )
+
+        self.log_path.parent.mkdir(parents=True, exist_ok=True)
+        with self.log_path.open("a", encoding="utf-8") as fh:
+            fh.write(event.to_json() + "\n")
+        self._write_seq(event.seq)
+
+        if self.log_path.stat().st_size > config.CHANGE_LOG_MAX_BYTES:
+            self._compact()
+
+        return event
+
+    def current_seq(self) -> int:
+        """Sequence number of the latest committed change (0 if there were none)"""
+        return self._read_seq()
+
+    def events_since(self, seq: int) -> list[ChangeEvent] | None:
+        """Get logged events with a sequence number above ``seq``
+
+        Returns:
+            list[ChangeEvent] | None: Events in order, or None if the log no longer
+            reaches back to ``seq`` and the caller has to reload
+        """
+        events = [event for event in self._read_events(0, None)[0] if event.seq > seq]
+        if events and events[0].seq != seq + 1:
+            return None
+        if not events and self.current_seq() > seq:
+            return None
+        return events
+
+    def subscribe(self, callback: Callable[[ChangeEvent], None]) -> Callable[[], None]:
+        """Call ``callback(event)`` for every change from now on
+
+        Returns:
+            Callable: Function that removes the subscription
+        """
+        reference = weakref.WeakMethod(callback) if isinstance(callback, types.MethodType) else lambda: callback
+        with self._dispatch_lock:
+            self._subscribers.append(reference)
+            self._start_watcher()
+            self._register()
+
+        def unsubscribe():
+            with self._dispatch_lock:
+                if reference in self._subscribers:
+                    self._subscribers.remove(reference)
+                if not self._subscribers:
+                    self._unregister()
+
+        return unsubscribe
+
+    def poll(self) -> int:
+        """Dispatch events logged since the last poll, returning how many were dispatched
+
+        Writers call this right after releasing the database lock, so subscribers
+        in the same process see a change immediately; the watcher thread calls it
+        periodically to pick up changes made by other processes.
+        """
+        with self._dispatch_lock:
+            events, self._offset, self._inode = self._read_events(self._offset, self._inode)
+            events = [event for event in events if event.seq > self.last_seq]
+
+            if events and events[0].seq != self.last_seq + 1:
+                # Some events were compacted away before they were seen; deltas can no longer be applied
+                events = [ChangeEvent(events[-1].seq, RESYNC, [], None, events[-1].timestamp)]
+
+            for event in events:
+                self._dispatch(event)
+                self.last_seq = event.seq
+            return len(events)
+
+    def stop(self):
+        """Stop the watcher thread"""
+        self._stop.set()
+        watcher = self._watcher
+        if watcher is not None:
+            watcher.join()
+
+    def _dispatch(self, event: ChangeEvent):
+        """Call every live subscriber with an event (call with the dispatch lock held)"""
+        for reference in list(self._subscribers):
+            callback = reference()
+            if callback is None:
+                self._subscribers.remove(reference)
+                continue
+            try:
+                callback(event)
+            except Exception:
+                logger.exception("Error handling change event %s", event.seq)
+
+    def _start_watcher(self):
+        """Start the watcher thread if it is not running (call with the dispatch lock held)"""
+        if self._watcher is not None and self._watcher.is_alive():
+            return
+        self._stop.clear()
+        self._watcher = threading.Thread(target=self._watch, name=f"change-feed:{self.log_path.name}", daemon=True)
+        self._watcher.start()
+
+    def _watch(self):
+        """Poll the change log until stopped or no subscriber is left"""
+        while not self._stop.wait(self.poll_seconds):
+            try:
+                self.poll()
+            except Exception:
+                logger.exception("Error polling change log %s", self.log_path)
+
+            with self._dispatch_lock:
+                self._subscribers = [reference for reference in self._subscribers if reference() is not None]
+                if not self._subscribers:
+                    self._watcher = None
+                    self._unregister()
+                    return
+
+    def _register(self):
+        """Make this the feed ``for_database`` returns, unless another feed of the file took its place"""
+        with self._feeds_lock:
+            self._feeds.setdefault(self.key, self)
+
+    def _unregister(self):
+        """Stop ``for_database`` from returning this feed, once it has no subscriber left"""
+        with self._feeds_lock:
+            if self._feeds.get(self.key) is self:
+                del self._feeds[self.key]
+
+    def _read_events(self, offset: int, inode: int | None) -> tuple[list[ChangeEvent], int, int | None]:
+        """Read complete event lines from a byte offset of the change log
+
+        If the log was replaced (compacted) since ``inode`` was read, it is
+        read from the start instead.
+
+        Returns:
+            tuple: The events, the offset after the last complete line, and the log's inode
+        """
+        try:
+            with self.log_path.open("rb") as fh:
+                stat = os.fstat(fh.fileno())
+                if stat.st_ino != inode or stat.st_size < offset:
+                    offset = 0
+                fh.seek(offset)
+                data = fh.read()
+        except FileNotFoundError:
+            return [], 0, None
+
+        # A line without its newline is still being written; leave it for the next read
+        end = data.rfind(b"\n") + 1
+        events = [ChangeEvent.from_json(line) for line in data[:end].decode("utf-8").splitlines() if line]
+        return events, offset + end, stat.st_ino
+
+    def _log_position(self) -> tuple[int, int | None]:
+        """Current size and inode of the change log"""
+        try:
+            stat = self.log_path.stat()
+        except FileNotFoundError:
+            return 0, None
+        return stat.st_size, stat.st_ino
+
+    def _read_seq(self) -> int:
+        """Read the last committed sequence number"""
+        try:
+            return int(self.seq_path.read_text(encoding="utf-8") or 0)
+        except FileNotFoundError:
+            return 0
+
+    def _write_seq(self, seq: int):
+        """Atomically replace the committed sequence number"""
+        tmp_path = self.seq_path.with_name(f"{self.seq_path.name}.tmp")
+        tmp_path.write_text(str(seq), encoding="utf-8")
+        tmp_path.replace(self.seq_path)
+
+    def compact(self, keep_events: int = config.CHANGE_LOG_KEEP_EVENTS) -> int:
+        """Drop all but the latest events from the change log (call with the database's exclusive lock held)
+
+        At least one event is kept, so that subscribers that are behind see
+        the gap and resync instead of waiting for the next change.
+
+        Returns:
+            int: Number of events dropped
+        """
+        try:
+            lines = self.log_path.read_bytes().splitlines(keepends=True)
+        except FileNotFoundError:
+            return 0
+
+        keep = max(1, keep_events)
+        if len(lines) <= keep:
+            return 0
+        self._replace_log(b"".join(lines[-keep:]))
+        return len(lines) - keep
+
+    def check(self) -> list[str]:
+        """Problems found in the change log (call with the database's lock held)
+
+        Reports lines that are not events, sequence numbers that do not go up
+        by one, and a last event other than the committed sequence number.
+        """
+        problems = []
+        try:
+            lines = self.log_path.read_text(encoding="utf-8").splitlines()
+        except FileNotFoundError:
+            lines = []
+
+        last_seq = None
+        for number, line in enumerate(lines, start=1):
+            try:
+                seq = ChangeEvent.from_json(line).seq
+            except (ValueError, KeyError, TypeError):
+                problems.append(f"change log line {number} is not a valid event")
+                continue
+            if last_seq is not None and seq != last_seq + 1:
+                problems.append(f"change log line {number} has seq {seq} after seq {last_seq}")
+            last_seq = seq
+
+        current_seq = self.current_seq()
+        if last_seq is not None and last_seq != current_seq:
+            problems.append(f"last logged event has seq {last_seq} but the committed seq is {current_seq}")
+        return problems
+
+    def _compact(self):
+        """Drop the older half of the change log (call with the database's exclusive lock held)"""
+        data = self.log_path.read_bytes()
+        start = data.find(b"\n", len(data) // 2) + 1
+        self._replace_log(data[start:])
+
+    def _replace_log(self, data: bytes):
+        """Atomically replace the change log (readers notice the new inode and read it from the start)"""
+        tmp_path = self.log_path.with_name(f"{self.log_path.name}.tmp")
+        tmp_path.write_bytes(data)
+        tmp_path.replace(self.log_path)
@@ -0,0 +1,410 @@
+"""Memory-mapped binary column store mirroring the expense ledger
+
+The store lives in ``<ledger>.columns/`` and holds one directory per
+version, named after the change-feed sequence number it reflects:
+
+- ``id.npy`` (int64), ``amount.npy`` (float64), ``date.npy`` (int32 proleptic
+  Gregorian ordinal) and ``category.npy`` (int32 code into ``meta.json``'s
+  ``categories``), rows ordered by ID
+- ``description_offsets.npy`` (int64, one more than the row count) and
+  ``description.bin``, the UTF-8 descriptions back to back
+- ``meta.json`` with the sequence number, row count and category names
+
+``CURRENT`` names the live version. Opening a version maps its files
+read-only, so the cost does not grow with the ledger. When the ledger has
+changed since the live version, a new version is written, either by
+applying the change feed's events to the old one or, if the feed cannot
+cover the gap, by rebuilding from the ledger.
+"""
+
+import itertools
+import json
+import shutil
+from collections.abc import Callable
+from datetime import date
+from pathlib import Path
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from aggregation import COLUMN_DTYPES, ExpenseColumns
+from storage.change_feed import ChangeEvent, ChangeFeed
+from storage.locking import FileLock
+
+# Ordinal of 1970-01-01, to convert between ordinals and numpy's days since the epoch
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+ARRAY_DTYPES = {
+    "id": np.int64,
+    "amount": np.float64,
+    "date": np.int32,
+    "category": np.int32,
+}
+
+
+class Columns(NamedTuple):
+    """One version of the ledger's columns, memory-mapped read-only"""
+
+    seq: int
+    id: np.ndarray
+    amount: np.ndarray
+    date: np.ndarray
+    category: np.ndarray
+    category_names: list[str]
+    description_offsets: np.ndarray
+    description_blob: np.ndarray
+
+    def __len__(self) -> int:
+        """Number of expenses"""
+        return len(self.id)
+
+    def description(self, row: int) -> str:
+        """Description of one row"""
+        start, end = self.description_offsets[row], self.description_offsets[row + 1]
+        return self.description_blob[start:end].tobytes().decode("utf-8")
+
+    def descriptions(self) -> list[str]:
+        """Descriptions of every row"""
+        blob = self.description_blob.tobytes()
+        offsets = self.description_offsets.tolist()
+        return [blob[start:end].decode("utf-8") for start, end in itertools.pairwise(offsets)]
+
+    def dates(self) -> np.ndarray:
+        """Dates as ``datetime64[D]``"""
+        return (self.date.astype(np.int64) - EPOCH_ORDINAL).astype("datetime64[D]")
+
+    def select(
+        self,
+        start_date: str | None = None,
+        end_date: str | None = None,
+        category: str | None = None,
+        search: str | None = None,
+    ) -> np.ndarray:
+        """Rows in a date range (YYYY-MM-DD, inclusive) and category whose description contains ``search``
+
+        The search ignores case, and only the descriptions of rows matching the other filters are decoded.
+        """
+        keep = np.ones(len(self), dtype=bool)
+        if start_date is not None:
+            keep &= self.date >= date.fromisoformat(start_date).toordinal()
+        if end_date is not None:
+            keep &= self.date <= date.fromisoformat(end_date).toordinal()
+        if category is not None:
+            if category not in self.category_names:
+                return np.zeros(0, dtype=np.int64)
+            keep &= self.category == self.category_names.index(category)
+
+        rows = np.flatnonzero(keep)
+        if search:
+            query = search.lower()
+            rows = rows[np.array([query in self.description(row).lower() for row in rows], dtype=bool)]
+        return rows
+
+    def records(self, rows: np.ndarray) -> list[dict]:
+        """Expenses of some rows, with id, date (YYYY-MM-DD), description, category and amount"""
+        days = (self.date[rows].astype(np.int64) - EPOCH_ORDINAL).astype("datetime64[D]")
+        return [
+            {
+                "id": int(self.id[row]),
+                "date": str(day),
+                "description": self.description(row),
+                "category": self.category_names[self.category[row]],
+                "amount": float(self.amount[row]),
+            }
+            for row, day in zip(rows.tolist(), days, strict=True)
+        ]
+
+    def rows(self, ids: np.ndarray) -> np.ndarray:
+        """Rows of the expenses with the given IDs, leaving out the IDs that are not stored"""
+        rows = np.searchsorted(self.id, ids)
+        found = rows < len(self.id)
+        rows = rows[found]
+        return rows[self.id[rows] == ids[found]]
+
+    def expense_columns(self, rows: np.ndarray | None = None) -> ExpenseColumns:
+        """Columns for the aggregation engine, sharing the amount and category arrays unless ``rows`` selects some"""
+        amounts, dates, categories = self.amount, self.date, self.category
+        if rows is not None:
+            amounts, dates, categories = amounts[rows], dates[rows], categories[rows]
+        days = (dates.astype(np.int64) - EPOCH_ORDINAL).astype("datetime64[D]")
+        return ExpenseColumns(
+            amounts=amounts,
+            months=(days.astype("datetime64[M]").astype(np.int64) + 1970 * 12).astype(COLUMN_DTYPES["months"]),
+            # Ordinal 1 (0001-01-01) was a Monday
+            weekdays=((dates - 1) % 7).astype(COLUMN_DTYPES["weekdays"]),
+            categories=categories,
+            category_names=self.category_names,
+        )
+
+    def to_frame(self, descriptions: bool = False) -> pd.DataFrame:
+        """Expenses as a DataFrame with id, amount, date (datetime) and category columns
+
+        Args:
+            descriptions: Also decode the description column
+        """
+        df = pd.DataFrame(
+            {
+                "id": self.id,
+                "amount": self.amount,
+                "date": pd.to_datetime(self.dates()),
+                "category": pd.Categorical.from_codes(self.category, categories=self.category_names),
+            },
+        )
+        if descriptions:
+            df["description"] = self.descriptions()
+        return df
+
+
+class ColumnStore:
+    """Keeps the memory-mapped column store of a ledger in step with its change feed"""
+
+    def __init__(
+        self,
+        db_path: str | Path,
+        changes: ChangeFeed,
+        load_snapshot: Callable[[], tuple[list[dict], int]],
+    ):
+        """Initialize the store
+
+        Args:
+            db_path: Ledger path; the store lives in ``<ledger>.columns``
+            changes: The ledger's change feed
+            load_snapshot: Returns every expense and the sequence number they reflect, read consistently
+        """
+        self.directory = Path(db_path).with_suffix(".columns")
+        self.current_path = self.directory / "CURRENT"
+        self.changes = changes
+        self.load_snapshot = load_snapshot
+        self.lock = FileLock(f"{self.directory}.lock")
+        self._columns = None
+
+    def columns(self) -> Columns:
+        """Get the columns of the latest ledger version, updating the store first if it is behind"""
+        seq = self.changes.current_seq()
+        if self._columns is not None and self._columns.seq == seq:
+            return self._columns
+
+        if self._current_version() != seq:
+            with self.lock.exclusive():
+                # Another process may have brought the store up to date while this one waited
+                version = self._current_version()
+                if version != seq:
+                    columns = self._next_version()
+                    if columns.seq != version:
+                        self._write_version(columns)
+
+        # Writers remove every version but the live one, so the live version is looked up and mapped under the
+        # lock; once mapped, its files stay readable after they are removed
+        with self.lock.shared():
+            self._columns = self._open(self._current_version())
+        return self._columns
+
+    def _current_version(self) -> int | None:
+        """Sequence number of the live version, if there is one"""
+        try:
+            return int(self.current_path.read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _open(self, version: int) -> Columns:
+        """Map the files of a version"""
+        path = self.directory / str(version)
+        meta = json.loads((path / "meta.json").read_text(encoding="utf-8"))
+        mapped = meta["rows"] > 0
+
+        arrays = {
+            name: np.load(path / f"{name}.npy", mmap_mode="r" if mapped else None)
+            for name in [*ARRAY_DTYPES, "description_offsets"]
+        }
+        blob_path = path / "description.bin"
+        if blob_path.stat().st_size:
+            blob = np.memmap(blob_path, dtype=np.uint8, mode="r")
+        else:
+            blob = np.zeros(0, dtype=np.uint8)
+
+        return Columns(
+            seq=meta["seq"],
+            id=arrays["id"],
+            amount=arrays["amount"],
+            date=arrays["date"],
+            category=arrays["category"],
+            category_names=meta["categories"],
+            description_offsets=arrays["description_offsets"],
+            description_blob=blob,
+        )
+
+    def _next_version(self) -> Columns:
+        """Build the next version in memory, from change events if possible, otherwise from a snapshot"""
+        version = self._current_version()
+        if version is not None and version <= self.changes.current_seq():
+            events = self.changes.events_since(version)
+            if events is not None and all(_is_applicable(event) for event in events):
+                return _apply_events(self._open(version), events)
+
+        documents, seq = self.load_snapshot()
+        return _columns_from_documents(seq, documents)
+
+    def _write_version(self, columns: Columns):
+        """Write a version's files and make it the live version (call with the store lock held)"""
+        path = self.directory / str(columns.seq)
+        if path.exists():
+            shutil.rmtree(path)
+        path.mkdir(parents=True)
+
+        for name in [*ARRAY_DTYPES, "description_offsets"]:
+            np.save(path / f"{name}.npy", getattr(columns, name))
+        (path / "description.bin").write_bytes(columns.description_blob.tobytes())
+        (path / "meta.json").write_text(
+            json.dumps({"seq": columns.seq, "rows": len(columns), "categories": columns.category_names}),
+            encoding="utf-8",
+        )
+
+        tmp_path = self.current_path.with_name("CURRENT.tmp")
+        tmp_path.write_text(str(columns.seq), encoding="utf-8")
+        tmp_path.replace(self.current_path)
+
+        self._remove_stale(columns.seq)
+
+    def prune(self) -> int:
+        """Remove the versions other than the live one and interrupted writes, returning how many versions"""
+        if not self.directory.exists():
+            return 0
+        with self.lock.exclusive():
+            return self._remove_stale(self._current_version())
+
+    def check(self, ids: list[int], seq: int) -> list[str]:
+        """Problems of the live version, if it reflects ``seq``: missing files or rows other than ``ids``
+
+        A live version behind ``seq`` is not a problem, as it is brought up
+        to date on the next read.
+        """
+        with self.lock.shared():
+            version = self._current_version()
+            if version is None or version < seq:
+                return []
+            if version > seq:
+                return [f"column store version {version} is ahead of the committed seq {seq}"]
+            try:
+                columns = self._open(version)
+            except (OSError, ValueError, KeyError) as error:
+                return [f"column store version {version} cannot be read: {error}"]
+
+            if len(columns) != len(ids):
+                return [f"column store version {version} has {len(columns)} rows, the ledger {len(ids)} expenses"]
+            if not np.array_equal(columns.id, np.sort(np.array(ids, dtype=ARRAY_DTYPES["id"]))):
+                return [f"column store version {version} holds other expense IDs than the ledger"]
+            return []
+
+    def _remove_stale(self, version: int | None) -> int:
+        """Remove the versions other than ``version`` and interrupted writes (call with the store lock held)
+
+        Returns:
+            int: Number of versions removed
+        """
+        removed = 0
+        # Processes still mapping an older version keep their open files after the unlink
+        for old in self.directory.iterdir():
+            if old.is_dir() and old.name != str(version):
+                shutil.rmtree(old, ignore_errors=True)
+                removed += 1
+            elif old.name.endswith(".tmp"):
+                old.unlink(missing_ok=True)
+        return removed
+
+
+def _columns_from_documents(seq: int, documents: list[dict]) -> Columns:
+    """Build in-memory columns from expense records"""
+    documents = sorted(documents, key=lambda document: document["id"])
+    categories = sorted({document["category"] for document in documents})
+    codes = {category: code for code, category in enumerate(categories)}
+    encoded = [document["description"].encode("utf-8") for document in documents]
+    dates = pd.to_datetime([document["date"] for document in documents], format="%Y-%m-%d")
+
+    return Columns(
+        seq=seq,
+        id=np.array([document["id"] for document in documents], dtype=ARRAY_DTYPES["id"]),
+        amount=np.array([document["amount"] for document in documents], dtype=ARRAY_DTYPES["amount"]),
+        date=(dates.to_numpy().astype("datetime64[D]").astype(np.int64) + EPOCH_ORDINAL).astype(ARRAY_DTYPES["date"]),
+        category=np.array([codes[document["category"]] for document in documents], dtype=ARRAY_DTYPES["category"]),
+        category_names=categories,
+        description_offsets=np.cumsum([0, *map(len, encoded)], dtype=np.int64),
+        description_blob=np.frombuffer(b"".join(encoded), dtype=np.uint8),
+    )
+
+
+def _take(columns: Columns, rows: np.ndarray) -> Columns:
+    """Select rows, in the given order, into in-memory columns"""
+    starts = columns.description_offsets[:-1][rows]
+    lengths = np.diff(columns.description_offsets)[rows]
+    offsets = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+
+    # Byte positions of the selected descriptions, one run per row
+    positions = np.repeat(starts - offsets[:-1], lengths) + np.arange(offsets[-1])
+
+    return Columns(
+        seq=columns.seq,
+        id=columns.id[rows],
+        amount=columns.amount[rows],
+        date=columns.date[rows],
+        category=columns.category[rows],
+        category_names=columns.category_names,
+        description_offsets=offsets,
+        description_blob=columns.description_blob[positions],
+    )
+
+
+def _concat(seq: int, parts: list[Columns]) -> Columns:
+    """Join columns, recoding categories and ordering the rows by ID"""
+    names = sorted(set().union(*(part.category_names for part in parts)))
+    lookup = {name: code for code, name in enumerate(names)}
+    categories = np.concatenate(
+        [np.array([lookup[name] for name in part.category_names], dtype=np.int64)[part.category] for part in parts],
+    )
+    # Drop categories no row uses any more; the names stay sorted, so the codes keep their order
+    used, codes = np.unique(categories, return_inverse=True)
+
+    blob_starts = np.cumsum([0, *(len(part.description_blob) for part in parts)])
+    offsets = [part.description_offsets[:-1] + shift for part, shift in zip(parts, blob_starts, strict=False)]
+
+    columns = Columns(
+        seq=seq,
+        id=np.concatenate([part.id for part in parts]),
+        amount=np.concatenate([part.amount for part in parts]),
+        date=np.concatenate([part.date for part in parts]),
+        category=codes.astype(ARRAY_DTYPES["category"]),
+        category_names=[names[code] for code in used],
+        description_offsets=np.concatenate([*offsets, [blob_starts[-1]]]).astype(np.int64),
+        description_blob=np.concatenate([part.description_blob for part in parts]),
+    )
+
+    if np.all(columns.id[:-1] < columns.id[1:]):
+        return columns
+    return _take(columns, np.argsort(columns.id, kind="stable"))
+
+
+def _is_applicable(event: ChangeEvent) -> bool:
+    """Whether an event carries what is needed to apply it as a delta"""
+    return event.op in {"delete", "clear"} or (event.op in {"insert", "update"} and event.documents is not None)
+
+
+def _apply_events(columns: Columns, events: list[ChangeEvent]) -> Columns:
+    """Apply change events to a stored version, returning the new version in memory"""
+    if not events:
+        return columns
+
+    # Latest state of every touched expense, None once deleted
+    changed = {}
+    for event in events:
+        if event.op == "clear":
+            columns = _columns_from_documents(columns.seq, [])
+            changed.clear()
+        elif event.op == "delete":
+            changed.update(dict.fromkeys(event.ids))
+        else:
+            changed.update((document["id"], document) for document in event.documents)
+
+    kept = np.flatnonzero(~np.isin(columns.id, np.fromiter(changed, dtype=np.int64, count=len(changed))))
+    added = [document for document in changed.values() if document is not None]
+    seq = events[-1].seq
+    return _concat(seq, [_take(columns, kept), _columns_from_documents(seq, added)])
@@ -0,0 +1,65 @@
+"""Cross-process file locking for the expense database"""
+
+import fcntl
+import os
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+
+
+class FileLock:
+    """Reentrant reader/writer lock backed by ``fcntl.flock`` on a lock file
+
+    Shared holders may read the database concurrently; an exclusive holder
+    is the only reader or writer. Locks are reentrant within a thread, and a
+    thread lock serializes threads that share one FileLock instance, since
+    flock does not distinguish threads using the same file descriptor.
+    """
+
+    def __init__(self, path: str | Path):
+        """Initialize the lock for the given lock file path"""
+        self.path = Path(path)
+        self._thread_lock = threading.RLock()
+        self._fd = None
+        self._depth = 0
+        self._exclusive = False
+
+    @contextmanager
+    def shared(self) -> Iterator[None]:
+        """Hold the lock for reading"""
+        with self._acquire(exclusive=False):
+            yield
+
+    @contextmanager
+    def exclusive(self) -> Iterator[None]:
+        """Hold the lock for a read-modify-write cycle"""
+        with self._acquire(exclusive=True):
+            yield
+
+    @contextmanager
+    def _acquire(self, exclusive: bool) -> Iterator[None]:
+        """Acquire the file lock, or re-enter it if this thread already holds it"""
+        with self._thread_lock:
+            if self._depth == 0:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+                try:
+                    fcntl.flock(self._fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+                except BaseException:
+                    os.close(self._fd)
+                    self._fd = None
+                    raise
+                self._exclusive = exclusive
+            elif exclusive and not self._exclusive:
+                raise RuntimeError("Cannot upgrade a shared lock to an exclusive lock")
+
+            self._depth += 1
+            try:
+                yield
+            finally:
+                self._depth -= 1
+                if self._depth == 0:
+                    fcntl.flock(self._fd, fcntl.LOCK_UN)
+                    os.close(self._fd)
+                    self._fd = None
@@ -0,0 +1,298 @@
+"""Time-partitioned expense storage
+
+Expenses are stored in one TinyDB file per year (or month) in a
+``<ledger>.partitions`` directory, next to a small ``manifest.json`` that
+records, for each partition, its date and ID ranges and its aggregates.
+Range queries open only the partitions whose date range overlaps the
+query, and whole-ledger statistics are answered from the manifest alone.
+
+None of the methods lock; callers hold the ledger's FileLock, shared for
+reads and exclusive for writes.
+"""
+
+import json
+from collections.abc import Iterable
+from datetime import date
+from pathlib import Path
+
+from tinydb import TinyDB
+from tinydb.queries import QueryLike
+
+import config
+from instrumentation import record_scan
+
+MANIFEST_VERSION = 1
+
+PARTITION_KEY_LENGTHS = {"year": 4, "month": 7}
+
+# Fields every stored expense has, and their JSON types
+EXPENSE_FIELD_TYPES = {"id": int, "amount": (int, float), "description": str, "category": str, "date": str}
+
+
+def empty_manifest(granularity: str) -> dict:
+    """Manifest of a ledger without partitions"""
+    if granularity not in PARTITION_KEY_LENGTHS:
+        raise ValueError(f"Unknown partition granularity: {granularity!r}")
+    return {"version": MANIFEST_VERSION, "granularity": granularity, "partitions": {}}
+
+
+def summarize_partition(documents: list[dict]) -> dict:
+    """Date and ID ranges, amount aggregates and per-category totals of a partition's expenses"""
+    amounts = [document["amount"] for document in documents]
+    dates = [document["date"] for document in documents]
+    ids = [document["id"] for document in documents]
+
+    categories = {}
+    for document in documents:
+        total, count = categories.get(document["category"], (0.0, 0))
+        categories[document["category"]] = (total + document["amount"], count + 1)
+
+    return {
+        "count": len(documents),
+        "total": sum(amounts),
+        "min_amount": min(amounts),
+        "max_amount": max(amounts),
+        "min_date": min(dates),
+        "max_date": max(dates),
+        "min_id": min(ids),
+        "max_id": max(ids),
+        "categories": {category: list(values) for category, values in sorted(categories.items())},
+    }
+
+
+class PartitionedTable:
+    """Expense table split into time partitions, each a TinyDB file"""
+
+    def __init__(self, db_path: str | Path, granularity: str = config.PARTITION_GRANULARITY):
+        """Initialize the table for a ledger path (the partitions live in ``<ledger>.partitions``)"""
+        self.directory = Path(db_path).with_suffix(".partitions")
+        self.manifest_path = self.directory / "manifest.json"
+        self.default_granularity = granularity
+        self._databases = {}
+
+    def exists(self) -> bool:
+        """Whether the ledger has been written in partitioned form"""
+        return self.manifest_path.exists()
+
+    def read_manifest(self) -> dict:
+        """Read the manifest (an empty one if the ledger has no partitions yet)"""
+        try:
+            return json.loads(self.manifest_path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return empty_manifest(self.default_granularity)
+
+    def write_manifest(self, manifest: dict):
+        """Atomically replace the manifest"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.manifest_path.with_name(f"{self.manifest_path.name}.tmp")
+        tmp_path.write_text(json.dumps(manifest, indent=1, sort_keys=True), encoding="utf-8")
+        tmp_path.replace(self.manifest_path)
+
+    def partition_key(self, manifest: dict, date: str) -> str:
+        """Partition of an expense date (``YYYY`` or ``YYYY-MM``)"""
+        return date[: PARTITION_KEY_LENGTHS[manifest["granularity"]]]
+
+    def keys(self, manifest: dict, start_date: str | None = None, end_date: str | None = None) -> list[str]:
+        """Partitions holding expenses in a date range, oldest first"""
+        return [
+            key
+            for key, entry in sorted(manifest["partitions"].items())
+            if (start_date is None or entry["max_date"] >= start_date)
+            and (end_date is None or entry["min_date"] <= end_date)
+        ]
+
+    def table(self, key: str):
+        """TinyDB expense table of a partition, opening its file on first use"""
+        if key not in self._databases:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self._databases[key] = TinyDB(self.directory / f"{key}.json")
+        return self._databases[key].table("expenses")
+
+    def all(self, manifest: dict, start_date: str | None = None, end_date: str | None = None) -> list[dict]:
+        """Expenses of the partitions overlapping a date range (not filtered within a partition)"""
+        documents = [
+            document for key in self.keys(manifest, start_date, end_date) for document in self.table(key).all()
+        ]
+        record_scan(len(documents))
+        return documents
+
+    def read(self, key: str) -> list[dict]:
+        """Expenses of one partition"""
+        documents = self.table(key).all()
+        record_scan(len(documents))
+        return documents
+
+    def search(
+        self,
+        manifest: dict,
+        query: QueryLike,
+        start_date: str | None = None,
+        end_date: str | None = None,
+    ) -> list[dict]:
+        """Expenses matching a TinyDB query, looking only at partitions overlapping a date range"""
+        keys = self.keys(manifest, start_date, end_date)
+        record_scan(sum(manifest["partitions"][key]["count"] for key in keys))
+        return [document for key in keys for document in self.table(key).search(query)]
+
+    def find(self, manifest: dict, expense_id: int) -> tuple[str, dict] | tuple[None, None]:
+        """Partition and stored document of an expense, checking only partitions whose ID range holds it"""
+        for key, entry in sorted(manifest["partitions"].items()):
+            if entry["min_id"] <= expense_id <= entry["max_id"]:
+                record_scan(entry["count"])
+                for document in self.table(key).all():
+                    if document["id"] == expense_id:
+                        return key, document
+        return None, None
+
+    def next_id(self, manifest: dict) -> int:
+        """Next free expense ID"""
+        return max((entry["max_id"] for entry in manifest["partitions"].values()), default=0) + 1
+
+    def insert_multiple(self, manifest: dict, documents: Iterable[dict]):
+        """Insert expenses into their partitions and update the manifest entries"""
+        by_partition = {}
+        for document in documents:
+            by_partition.setdefault(self.partition_key(manifest, document["date"]), []).append(dict(document))
+
+        for key, partition_documents in by_partition.items():
+            self.table(key).insert_multiple(partition_documents)
+            self.refresh(manifest, key)
+
+    def update(self, manifest: dict, key: str, document: dict, fields: dict):
+        """Update a stored expense, moving it to another partition if its date changes partition"""
+        new_key = self.partition_key(manifest, fields.get("date", document["date"]))
+        if new_key == key:
+            self.table(key).update(fields, doc_ids=[document.doc_id])
+        else:
+            self.table(key).remove(doc_ids=[document.doc_id])
+            self.table(new_key).insert({**document, **fields})
+            self.refresh(manifest, new_key)
+        self.refresh(manifest, key)
+
+    def remove(self, manifest: dict, key: str, document: dict):
+        """Remove a stored expense"""
+        self.table(key).remove(doc_ids=[document.doc_id])
+        self.refresh(manifest, key)
+
+    def truncate(self, manifest: dict):
+        """Remove every expense"""
+        for key in list(manifest["partitions"]):
+            self.table(key).truncate()
+            self._drop(manifest, key)
+
+    def refresh(self, manifest: dict, key: str):
+        """Recompute a partition's manifest entry, dropping the partition once it is empty"""
+        documents = self.table(key).all()
+        if documents:
+            manifest["partitions"][key] = summarize_partition(documents)
+        else:
+            self._drop(manifest, key)
+
+    def clear_cache(self):
+        """Forget TinyDB's query caches and ID counters, which only track writes made through this instance"""
+        for database in self._databases.values():
+            table = database.table("expenses")
+            table._next_id = None
+            table.clear_cache()
+
+    def close(self):
+        """Close every open partition file"""
+        for database in self._databases.values():
+            database.close()
+        self._databases.clear()
+
+    def migrate(self, documents: list[dict]) -> int:
+        """Write the expenses of an unpartitioned ledger into partitions, returning how many were written"""
+        manifest = self.read_manifest()
+        self.insert_multiple(manifest, documents)
+        self.write_manifest(manifest)
+        return len(documents)
+
+    def check(self, manifest: dict) -> tuple[list[str], list[int]]:
+        """Compare every partition file with the manifest and validate the stored expenses
+
+        Reports partitions missing from the manifest or from disk, manifest
+        entries that differ from the partition's expenses, expenses stored in
+        the wrong partition, with missing or mistyped fields, and duplicate IDs.
+
+        Returns:
+            tuple: The problems found, and the IDs of every stored expense
+        """
+        problems = []
+        if manifest.get("version") != MANIFEST_VERSION or manifest.get("granularity") not in PARTITION_KEY_LENGTHS:
+            return [f"unsupported manifest version or granularity in {self.manifest_path}"], []
+
+        on_disk = {path.stem for path in self.directory.glob("*.json") if path != self.manifest_path}
+        partitions = {}
+        for key in sorted(on_disk | set(manifest["partitions"])):
+            if key not in on_disk:
+                problems.append(f"partition {key} is in the manifest but its file is missing")
+                continue
+            try:
+                partitions[key] = self.table(key).all()
+            except ValueError as error:
+                problems.append(f"partition {key} cannot be read: {error}")
+                continue
+            record_scan(len(partitions[key]))
+
+        seen = {}
+        for key, documents in partitions.items():
+            problems.extend(self._check_documents(manifest, key, documents, seen))
+            problem = _entry_problem(key, documents, manifest["partitions"].get(key))
+            if problem is not None:
+                problems.append(problem)
+
+        return problems, list(seen)
+
+    def _check_documents(self, manifest: dict, key: str, documents: list[dict], seen: dict[int, str]) -> list[str]:
+        """Problems of the expenses of one partition, adding their IDs to ``seen`` (ID to partition)"""
+        problems = []
+        for document in documents:
+            problem = _document_problem(document)
+            if problem is not None:
+                problems.append(f"partition {key}, document {document.doc_id}: {problem}")
+                continue
+            if self.partition_key(manifest, document["date"]) != key:
+                problems.append(f"expense {document['id']} dated {document['date']} is in partition {key}")
+            if document["id"] in seen:
+                problems.append(f"expense ID {document['id']} is in partitions {seen[document['id']]} and {key}")
+            seen.setdefault(document["id"], key)
+        return problems
+
+    def _drop(self, manifest: dict, key: str):
+        """Remove an empty partition from the manifest
+
+        The empty file is kept: other processes may hold it open, and a
+        deleted file would leave them reading a stale copy if the partition
+        were recreated.
+        """
+        manifest["partitions"].pop(key, None)
+
+
+def _entry_problem(key: str, documents: list[dict], entry: dict | None) -> str | None:
+    """What is wrong with the manifest entry of a partition, if anything"""
+    if entry is None:
+        return f"partition {key} holds {len(documents)} expenses but is not in the manifest" if documents else None
+    if not documents:
+        return f"partition {key} is in the manifest but holds no expenses"
+    if any(_document_problem(document) is not None for document in documents):
+        # Already reported per document, and the partition cannot be summarized
+        return None
+    summary = summarize_partition(documents)
+    fields = sorted(field for field in summary if entry.get(field) != summary[field])
+    return f"manifest entry of partition {key} is out of date ({', '.join(fields)})" if fields else None
+
+
+def _document_problem(document: dict) -> str | None:
+    """What is wrong with a stored expense's fields, if anything"""
+    for field, types in EXPENSE_FIELD_TYPES.items():
+        value = document.get(field)
+        if not isinstance(value, types) or isinstance(value, bool):
+            return f"{field} is {value!r}"
+    try:
+        parsed = date.fromisoformat(document["date"])
+    except ValueError:
+        return f"date is {document['date']!r}"
+    if parsed.isoformat() != document["date"]:
+        return f"date is {document['date']!r}"
+    return None
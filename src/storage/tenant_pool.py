@@ -0,0 +1,152 @@
+"""Pooled, lazily-opened per-tenant ledger handles"""
+
+import re
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from pathlib import Path
+
+import config
+
+TENANT_ID_PATTERN = re.compile(r"[A-Za-z0-9][A-Za-z0-9_.-]{0,63}")
+
+
+class TenantNotAllowedError(LookupError):
+    """Raised when a tenant that is not in ``config.ALLOWED_TENANTS`` is requested from a pool"""
+
+
+def tenant_db_path(tenant_id: str, tenants_dir: Path | None = None) -> Path:
+    """Get the shard file of a tenant's ledger
+
+    Args:
+        tenant_id: Tenant identifier (letters, digits, ``_``, ``-`` and ``.``, at most 64 characters)
+        tenants_dir: Directory holding the shards (defaults to ``config.TENANTS_DIR``)
+
+    Returns:
+        Path: Path of the tenant's JSON ledger
+
+    Raises:
+        ValueError: If the tenant ID is not valid
+    """
+    if not TENANT_ID_PATTERN.fullmatch(tenant_id):
+        raise ValueError(f"Invalid tenant id: {tenant_id!r}")
+
+    return (tenants_dir or config.TENANTS_DIR) / f"{tenant_id}.json"
+
+
+class TenantPool:
+    """LRU pool of open per-tenant handles
+
+    Only the tenants in ``config.ALLOWED_TENANTS`` are served, as pools
+    hand out ledgers chosen by unauthenticated request parameters. Handles
+    are created by ``factory(tenant_id)`` on first use. At most
+    ``max_open`` stay open; the least recently used handle is closed when the
+    pool is full, and handles unused for ``idle_seconds`` are closed on the
+    next access to the pool.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[str], object],
+        max_open: int = config.TENANT_POOL_SIZE,
+        idle_seconds: float = config.TENANT_IDLE_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """Initialize an empty pool"""
+        if max_open < 1:
+            raise ValueError("max_open must be at least 1")
+
+        self.factory = factory
+        self.max_open = max_open
+        self.idle_seconds = idle_seconds
+        self.clock = clock
+
+        self._handles = OrderedDict()  # tenant_id -> (handle, last_used)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, tenant_id: str):
+        """Get the handle for a tenant, opening it if needed
+
+        Raises:
+            TenantNotAllowedError: If the tenant is not in ``config.ALLOWED_TENANTS``
+        """
+        if tenant_id not in config.ALLOWED_TENANTS:
+            raise TenantNotAllowedError(f"Unknown tenant: {tenant_id!r}")
+
+        with self._lock:
+            now = self.clock()
+            self._evict_idle(now)
+
+            if tenant_id in self._handles:
+                handle, _ = self._handles.pop(tenant_id)
+                self.hits += 1
+            else:
+                handle = self.factory(tenant_id)
+                self.misses += 1
+
+            self._handles[tenant_id] = (handle, now)
+            while len(self._handles) > self.max_open:
+                _, (evicted, _) = self._handles.popitem(last=False)
+                self._close(evicted)
+
+            return handle
+
+    def evict_idle(self) -> int:
+        """Close handles idle for longer than ``idle_seconds``, returning how many were closed"""
+        with self._lock:
+            return self._evict_idle(self.clock())
+
+    def close_all(self):
+        """Close every open handle"""
+        with self._lock:
+            while self._handles:
+                _, (handle, _) = self._handles.popitem(last=False)
+                self._close(handle)
+
+    def stats(self) -> dict:
+        """Get pool size and hit/miss/eviction counters"""
+        with self._lock:
+            return {
+                "open": len(self._handles),
+                "max_open": self.max_open,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def tenant_ids(self) -> list[str]:
+        """IDs of the tenants whose handles are open, least recently used first"""
+        with self._lock:
+            return list(self._handles)
+
+    def __len__(self) -> int:
+        """Number of open handles"""
+        return len(self._handles)
+
+    def __contains__(self, tenant_id: str) -> bool:
+        """Whether a tenant's handle is currently open"""
+        return tenant_id in self._handles
+
+    def _evict_idle(self, now: float) -> int:
+        """Close idle handles (call with the pool lock held)"""
+        closed = 0
+        # Handles are kept in least-recently-used order, so the idle ones are at the front
+        while self._handles:
+            tenant_id, (handle, last_used) = next(iter(self._handles.items()))
+            if now - last_used <= self.idle_seconds:
+                break
+            del self._handles[tenant_id]
+            self._close(handle)
+            closed += 1
+        return closed
+
+    def _close(self, handle):
+        """Close an evicted handle"""
+        self.evictions += 1
+        close = getattr(handle, "close", None)
+        if close is not None:
+            close()
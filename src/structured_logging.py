@@ -0,0 +1,41 @@
+"""Structured (JSON lines) logging for the app, the API server and the slow-query log
+
+Modules log through ``logging.getLogger(__name__)``; configure_logging,
+called on startup, sends the records to stderr with one JSON object per
+line. Values passed as ``extra={"fields": {...}}`` become top-level keys of
+the object.
+"""
+
+import json
+import logging
+import sys
+from datetime import UTC, datetime
+
+
+class JsonFormatter(logging.Formatter):
+    """Format a log record as one JSON object"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        """Serialize the time, level, logger, message, extra fields and exception of a record"""
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, tz=UTC).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            **getattr(record, "fields", {}),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def configure_logging(level: int = logging.WARNING):
+    """Send log records of ``level`` and above to stderr as JSON lines (safe to call more than once)"""
+    root = logging.getLogger()
+    if not any(isinstance(handler.formatter, JsonFormatter) for handler in root.handlers):
+        handler = logging.StreamHandler(sys.stderr)
+        handler.setFormatter(JsonFormatter())
+        # Streamlit prints its own records through its own handler
+        handler.addFilter(lambda record: not record.name.startswith("streamlit"))
+        root.addHandler(handler)
+    root.setLevel(level)
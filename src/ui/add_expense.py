@@ -4,7 +4,10 @@ from datetime import UTC, datetime
 
 import streamlit as st
 
+from instrumentation import instrument
 
+
+@instrument()
 def show_add_expense(manager, show_success_message, show_error_message):
     """Display the add expense page"""
     st.header("➕ Add New Expense")  # noqa: RUF001
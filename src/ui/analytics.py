@@ -1,44 +1,126 @@
-"""Analytics page component for the expense tracker"""
+"""Analytics page component for the expense tracker
+
+The charts are built by a background job keyed by the database's data
+version, so widget interactions never wait for them and finished charts are
+shared between sessions until the data changes. Grouped charts and tables are
+rolled up from the ledger's aggregation cube (see ``cube``) rather than from
+the expenses, so the Patterns tab's drill-down filters are answered on the
+spot.
+"""
+
+import calendar
+import time
+import uuid
 
 import pandas as pd
 import plotly.express as px
 import streamlit as st
 
+import config
+from aggregation import WEEKDAYS
+from background_jobs import Job, JobRunner
+from instrumentation import instrument
 
-def show_analytics(manager):
+
+@instrument()
+def show_analytics(manager, runner: JobRunner):
     """Display the analytics page"""
     st.header("📈 Analytics & Reports")
 
-    expenses = manager.get_all_expenses()
+    # A newer rerun of this session cancels the job its previous run was waiting on
+    owner = st.session_state.setdefault("analytics_session", uuid.uuid4().hex)
+    job = runner.submit(("analytics", manager.db_path, manager.data_version), build_analytics, manager, owner=owner)
+
+    body = st.empty()
+    with body.container():
+        status = st.empty()
+
+        # Analytics tabs, each showing a placeholder until its charts are ready
+        placeholders = {}
+        for name, tab in zip(TAB_RENDERERS, st.tabs(list(TAB_RENDERERS)), strict=True):
+            with tab:
+                placeholders[name] = st.empty()
+                placeholders[name].caption("Computing...")
+
+    rendered = set()
+    while True:
+        # Checked before rendering so that sections finishing meanwhile are picked up by one more pass
+        done = job.done()
+
+        if job.partial.get("empty"):
+            body.info("No expenses found. Add some expenses to see analytics!")
+            return
+
+        for name, render in TAB_RENDERERS.items():
+            if name not in rendered and name in job.partial:
+                with placeholders[name].container():
+                    render(job.partial[name])
+                rendered.add(name)
+
+        if done:
+            break
+
+        status.progress(job.progress, text=job.message or "Preparing analytics...")
+        time.sleep(config.BACKGROUND_POLL_SECONDS)
+
+    status.empty()
+    if not job.cancelled and job.future.exception() is not None:
+        st.error(f"Could not compute analytics: {job.future.exception()}")
+
+
+def build_analytics(job: Job, manager) -> dict:
+    """Build the data and charts of every analytics tab, reporting each tab as it is ready
 
-    if not expenses:
-        st.info("No expenses found. Add some expenses to see analytics!")
-        return
+    Each tab builder gets the expenses as a DataFrame, for the charts of
+    individual expenses, and the aggregation cube, for the grouped ones.
+    """
+    columns = manager.get_columns()
 
-    # Convert to DataFrame
-    df = pd.DataFrame(expenses)  # noqa: PD901
-    df["date"] = pd.to_datetime(df["date"])
+    if not len(columns):
+        return {"empty": True}
+
+    job.report(0.1, "Preparing data")
+
+    # Build the DataFrame from the memory-mapped columns
+    df = columns.to_frame()  # noqa: PD901
     df["month_str"] = df["date"].dt.strftime("%Y-%m")  # Use string format instead of Period
     df["month_name"] = df["date"].dt.strftime("%B %Y")  # Human readable month
     df["weekday"] = df["date"].dt.day_name()
+    cube = manager.get_cube()
+
+    for index, (name, build) in enumerate(TAB_BUILDERS.items()):
+        job.report(0.1 + 0.9 * index / len(TAB_BUILDERS), f"Building {name.lower()} charts")
+        job.report(
+            0.1 + 0.9 * (index + 1) / len(TAB_BUILDERS),
+            f"Built {name.lower()} charts",
+            **{name: build(df, cube)},
+        )
 
-    # Analytics tabs
-    tab1, tab2, tab3, tab4 = st.tabs(["Overview", "Trends", "Categories", "Patterns"])
+    return dict(job.partial)
 
-    with tab1:
-        _show_overview_tab(df)
 
-    with tab2:
-        _show_trends_tab(df)
+def _build_overview_tab(df, _cube):
+    """Build the overview analytics tab"""
+    # Histogram of expense amounts
+    histogram = px.histogram(df, x="amount", nbins=20, title="Distribution of Expense Amounts")
+    histogram.update_layout(xaxis_title="Amount ($)", yaxis_title="Frequency")
 
-    with tab3:
-        _show_categories_tab(df)
+    # Box plot by category
+    box = px.box(df, x="category", y="amount", title="Expense Amount Distribution by Category")
+    box.update_layout(xaxis_title="Category", yaxis_title="Amount ($)")
+    box.update_xaxes(tickangle=45)
 
-    with tab4:
-        _show_patterns_tab(df)
+    return {
+        "total": df["amount"].sum(),
+        "average": df["amount"].mean(),
+        "highest": df["amount"].max(),
+        "lowest": df["amount"].min(),
+        "histogram": histogram,
+        "box": box,
+    }
 
 
-def _show_overview_tab(df):
+def _show_overview_tab(data):
     """Display the overview analytics tab"""
     st.subheader("Expense Overview")
 
@@ -46,43 +128,33 @@ def _show_overview_tab(df):
     col1, col2, col3, col4 = st.columns(4)
 
     with col1:
-        st.metric("Total Spent", f"${df['amount'].sum():.2f}")
+        st.metric("Total Spent", f"${data['total']:.2f}")
     with col2:
-        st.metric("Average Expense", f"${df['amount'].mean():.2f}")
+        st.metric("Average Expense", f"${data['average']:.2f}")
     with col3:
-        st.metric("Highest Expense", f"${df['amount'].max():.2f}")
+        st.metric("Highest Expense", f"${data['highest']:.2f}")
     with col4:
-        st.metric("Lowest Expense", f"${df['amount'].min():.2f}")
+        st.metric("Lowest Expense", f"${data['lowest']:.2f}")
 
     # Expense distribution
     col1, col2 = st.columns(2)
 
     with col1:
-        # Histogram of expense amounts
-        fig = px.histogram(df, x="amount", nbins=20, title="Distribution of Expense Amounts")
-        fig.update_layout(xaxis_title="Amount ($)", yaxis_title="Frequency")
-        st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(data["histogram"], use_container_width=True)
 
     with col2:
-        # Box plot by category
-        fig = px.box(df, x="category", y="amount", title="Expense Amount Distribution by Category")
-        fig.update_layout(xaxis_title="Category", yaxis_title="Amount ($)")
-        fig.update_xaxes(tickangle=45)
-        st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(data["box"], use_container_width=True)
 
 
-def _show_trends_tab(df):
-    """Display the trends analytics tab"""
-    st.subheader("Spending Trends")
-
+def _build_trends_tab(df, _cube):
+    """Build the trends analytics tab"""
     # Monthly trend
     monthly_spending = df.groupby("month_name")["amount"].sum().reset_index()
     monthly_spending = monthly_spending.sort_values("month_name")  # Sort chronologically
 
-    fig = px.line(monthly_spending, x="month_name", y="amount", title="Monthly Spending Trend", markers=True)
-    fig.update_layout(xaxis_title="Month", yaxis_title="Amount ($)")
-    fig.update_xaxes(tickangle=45)
-    st.plotly_chart(fig, use_container_width=True)
+    monthly = px.line(monthly_spending, x="month_name", y="amount", title="Monthly Spending Trend", markers=True)
+    monthly.update_layout(xaxis_title="Month", yaxis_title="Amount ($)")
+    monthly.update_xaxes(tickangle=45)
 
     # Daily spending pattern
     daily_spending = df.groupby(df["date"].dt.date)["amount"].sum().reset_index()
@@ -91,92 +163,166 @@ def _show_trends_tab(df):
     # Convert date column to datetime for proper plotting
     daily_spending["date"] = pd.to_datetime(daily_spending["date"])
 
-    fig = px.scatter(daily_spending, x="date", y="amount", title="Daily Spending Pattern", trendline="lowess")
-    fig.update_layout(xaxis_title="Date", yaxis_title="Amount ($)")
-    st.plotly_chart(fig, use_container_width=True)
+    daily = px.scatter(daily_spending, x="date", y="amount", title="Daily Spending Pattern", trendline="lowess")
+    daily.update_layout(xaxis_title="Date", yaxis_title="Amount ($)")
 
+    return {"monthly": monthly, "daily": daily}
 
-def _show_categories_tab(df):
-    """Display the categories analytics tab"""
-    st.subheader("Category Analysis")
 
+def _show_trends_tab(data):
+    """Display the trends analytics tab"""
+    st.subheader("Spending Trends")
+
+    st.plotly_chart(data["monthly"], use_container_width=True)
+    st.plotly_chart(data["daily"], use_container_width=True)
+
+
+def _category_spending(cube) -> pd.DataFrame:
+    """Total, count, average and standard deviation of the amounts per category, largest total first"""
+    category_spending = cube.roll_up("category")
+    category_spending.columns = ["Category", "Total", "Count", "Average", "Std Dev"]
+    return category_spending.sort_values("Total", ascending=False)
+
+
+def _category_display(category_spending: pd.DataFrame) -> pd.DataFrame:
+    """Category spending with the amounts formatted as dollars"""
+    category_display = category_spending.copy()
+    for column in ["Total", "Average", "Std Dev"]:
+        category_display[column] = category_display[column].apply(lambda x: f"${x:.2f}")
+    return category_display
+
+
+def _build_categories_tab(df, cube):
+    """Build the categories analytics tab"""
     # Category spending
-    category_spending = df.groupby("category")["amount"].agg(["sum", "count", "mean"]).reset_index()
-    category_spending.columns = ["Category", "Total", "Count", "Average"]
-    category_spending = category_spending.sort_values("Total", ascending=False)
+    category_spending = _category_spending(cube)
+
+    # Bar chart of category totals
+    totals = px.bar(category_spending, x="Category", y="Total", title="Total Spending by Category")
+    totals.update_layout(xaxis_title="Category", yaxis_title="Total Amount ($)")
+    totals.update_xaxes(tickangle=45)
+
+    # Category summary table
+    return {"totals": totals, "summary": _category_display(category_spending)}
+
+
+def _show_categories_tab(data):
+    """Display the categories analytics tab"""
+    st.subheader("Category Analysis")
 
     col1, col2 = st.columns(2)
 
     with col1:
-        # Bar chart of category totals
-        fig = px.bar(category_spending, x="Category", y="Total", title="Total Spending by Category")
-        fig.update_layout(xaxis_title="Category", yaxis_title="Total Amount ($)")
-        fig.update_xaxes(tickangle=45)
-        st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(data["totals"], use_container_width=True)
 
     with col2:
-        # Category summary table
         st.write("**Category Summary**")
-        category_display = category_spending.copy()
-        category_display["Total"] = category_display["Total"].apply(lambda x: f"${x:.2f}")
-        category_display["Average"] = category_display["Average"].apply(lambda x: f"${x:.2f}")
-
-        st.dataframe(category_display, hide_index=True, use_container_width=True)
-
-
-def _show_patterns_tab(df):
-    """Display the patterns analytics tab"""
+        st.dataframe(data["summary"], hide_index=True, use_container_width=True)
+
+
+def _patterns_charts(cube) -> dict:
+    """Weekday bars, monthly category heatmap and category table of the expenses in a cube"""
+    # Day of week analysis, Monday first
+    weekday_spending = cube.roll_up("weekday")
+
+    weekday_total = px.bar(weekday_spending, x="weekday", y="sum", title="Total Spending by Day of Week")
+    weekday_total.update_layout(xaxis_title="Day of Week", yaxis_title="Total Amount ($)")
+
+    weekday_mean = px.bar(weekday_spending, x="weekday", y="mean", title="Average Spending by Day of Week")
+    weekday_mean.update_layout(xaxis_title="Day of Week", yaxis_title="Average Amount ($)")
+
+    # Monthly category heatmap, months in chronological order
+    monthly_category_pivot = cube.roll_up("year", "month", "category").pivot_table(
+        index=["year", "month"],
+        columns="category",
+        values="sum",
+        aggfunc="sum",
+        fill_value=0,
+    )
+    heatmap = px.imshow(
+        monthly_category_pivot.to_numpy(),
+        x=monthly_category_pivot.columns.tolist(),
+        y=[f"{calendar.month_name[month]} {year}" for year, month in monthly_category_pivot.index],
+        title="Monthly Spending Heatmap by Category",
+        aspect="auto",
+        color_continuous_scale="Blues",
+        labels=dict(x="Category", y="Month", color="Amount ($)"),  # noqa: C408
+    )
+    heatmap.update_layout(xaxis_title="Category", yaxis_title="Month")
+
+    return {
+        "weekday_total": weekday_total,
+        "weekday_mean": weekday_mean,
+        "heatmap": heatmap,
+        "summary": _category_display(_category_spending(cube)),
+    }
+
+
+def _build_patterns_tab(df, cube):
+    """Build the patterns analytics tab: the cube, to drill into, and the charts of all expenses"""
+    return {"cube": cube, "charts": _patterns_charts(cube)}
+
+
+def _show_patterns_tab(data):
+    """Display the patterns analytics tab, with filters drilling into the aggregation cube"""
     st.subheader("Spending Patterns")
+    cube = data["cube"]
 
-    # Day of week analysis
-    weekday_spending = df.groupby("weekday")["amount"].agg(["sum", "mean"]).reset_index()
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        years = st.multiselect("Years", cube.years(), key="patterns_years", placeholder="All years")
+    with col2:
+        months = st.multiselect(
+            "Months",
+            range(1, 13),
+            format_func=lambda month: calendar.month_name[month],
+            key="patterns_months",
+            placeholder="All months",
+        )
+    with col3:
+        weekdays = st.multiselect(
+            "Days of Week",
+            range(7),
+            format_func=lambda weekday: WEEKDAYS[weekday],
+            key="patterns_weekdays",
+            placeholder="All days",
+        )
+    with col4:
+        categories = st.multiselect("Categories", cube.categories(), key="patterns_categories", placeholder="All")
 
-    # Reorder days
-    day_order = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
-    weekday_spending["weekday"] = pd.Categorical(weekday_spending["weekday"], categories=day_order, ordered=True)
-    weekday_spending = weekday_spending.sort_values("weekday")
+    charts = data["charts"]
+    if years or months or weekdays or categories:
+        selection = cube.slice(years or None, months or None, weekdays or None, categories or None)
+        if not selection.counts.any():
+            st.info("No expenses match the selected filters")
+            return
+        # Rolled up from the cube's cells, so the filters cost the same at any ledger size
+        charts = _patterns_charts(selection)
 
     col1, col2 = st.columns(2)
 
     with col1:
-        fig = px.bar(weekday_spending, x="weekday", y="sum", title="Total Spending by Day of Week")
-        fig.update_layout(xaxis_title="Day of Week", yaxis_title="Total Amount ($)")
-        st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(charts["weekday_total"], use_container_width=True)
 
     with col2:
-        fig = px.bar(weekday_spending, x="weekday", y="mean", title="Average Spending by Day of Week")
-        fig.update_layout(xaxis_title="Day of Week", yaxis_title="Average Amount ($)")
-        st.plotly_chart(fig, use_container_width=True)
-
-    # Monthly category heatmap
-    try:
-        # Create monthly category pivot table using string dates
-        monthly_category_data = df.groupby(["month_name", "category"])["amount"].sum().reset_index()
-        monthly_category_pivot = monthly_category_data.pivot(  # noqa: PD010
-            index="month_name",
-            columns="category",
-            values="amount",
-        ).fillna(0)
-
-        if not monthly_category_pivot.empty:
-            # Convert to numpy array for plotly
-            z_data = monthly_category_pivot.values  # noqa: PD011
-            x_labels = monthly_category_pivot.columns.tolist()
-            y_labels = monthly_category_pivot.index.tolist()
-
-            fig = px.imshow(
-                z_data,
-                x=x_labels,
-                y=y_labels,
-                title="Monthly Spending Heatmap by Category",
-                aspect="auto",
-                color_continuous_scale="Blues",
-                labels=dict(x="Category", y="Month", color="Amount ($)"),  # noqa: C408
-            )
-            fig.update_layout(xaxis_title="Category", yaxis_title="Month")
-            st.plotly_chart(fig, use_container_width=True)
-        else:
-            st.info("Not enough data for heatmap visualization")
-    except Exception as e:
-        st.warning(f"Could not generate heatmap: {str(e)}")  # noqa: RUF010
-        st.info("This visualization requires data from multiple months and categories")
+        st.plotly_chart(charts["weekday_mean"], use_container_width=True)
+
+    st.plotly_chart(charts["heatmap"], use_container_width=True)
+
+    st.write("**Selected Expenses by Category**")
+    st.dataframe(charts["summary"], hide_index=True, use_container_width=True)
+
+
+TAB_BUILDERS = {
+    "Overview": _build_overview_tab,
+    "Trends": _build_trends_tab,
+    "Categories": _build_categories_tab,
+    "Patterns": _build_patterns_tab,
+}
+
+TAB_RENDERERS = {
+    "Overview": _show_overview_tab,
+    "Trends": _show_trends_tab,
+    "Categories": _show_categories_tab,
+    "Patterns": _show_patterns_tab,
+}
@@ -6,7 +6,10 @@ import pandas as pd
 import plotly.express as px
 import streamlit as st
 
+from instrumentation import instrument
 
+
+@instrument()
 def show_dashboard(manager, show_success_message, show_error_message):  # noqa: PLR0915
     """Display the main dashboard"""
     st.header("📊 Dashboard")
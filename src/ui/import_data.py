@@ -0,0 +1,79 @@
+"""Import expenses page component for the expense tracker"""
+
+import pandas as pd
+import streamlit as st
+
+import config
+from instrumentation import instrument
+
+
+@instrument()
+def show_import_data(manager, show_success_message, show_error_message):
+    """Display the import expenses page"""
+    st.header("📥 Import Expenses")
+
+    st.write(
+        "Upload a CSV file with `amount` and `description` columns. "
+        "Optional `category` and `date` columns default to *Other* and today.",
+    )
+
+    uploaded_file = st.file_uploader("CSV file", type=["csv"])
+    chunk_size = st.number_input(
+        "Rows per chunk",
+        min_value=100,
+        value=config.IMPORT_CHUNK_SIZE,
+        step=100,
+        help="Rows validated and written to the database at a time",
+    )
+
+    if uploaded_file is None or not st.button("Import", type="primary"):
+        _show_import_report(st.session_state.get("import_result"))
+        return
+
+    progress_bar = st.progress(0.0, text="Importing...")
+    file_size = max(uploaded_file.size, 1)
+
+    def update_progress(rows_processed, rows_imported):
+        fraction = min(uploaded_file.tell() / file_size, 1.0)
+        progress_bar.progress(fraction, text=f"Processed {rows_processed} rows, imported {rows_imported}")
+
+    try:
+        result = manager.import_csv(uploaded_file, chunk_size=int(chunk_size), progress_callback=update_progress)
+    except (ValueError, pd.errors.ParserError) as e:
+        progress_bar.empty()
+        show_error_message(f"Import failed: {e}")
+        return
+
+    st.session_state["import_result"] = result
+    show_success_message(
+        f"Imported {result['imported']} of {result['rows']} rows ({result['rejected_count']} rejected)",
+    )
+    st.rerun()
+
+
+def _show_import_report(result):
+    """Display date-format warnings and the rejected-rows report of the last import"""
+    if not result:
+        return
+
+    if result["ambiguous_dates"]:
+        st.warning(
+            f"Dates were read as `{result['date_format']}`, but the file could also be read with day and month "
+            "swapped. Check a few imported expenses before relying on their dates.",
+        )
+
+    if not result["rejected"]:
+        return
+
+    st.subheader("Rejected Rows")
+    if result["rejected_count"] > len(result["rejected"]):
+        st.caption(f"Showing the first {len(result['rejected'])} of {result['rejected_count']} rejected rows")
+
+    rejected_df = pd.DataFrame(result["rejected"])
+    st.dataframe(rejected_df, hide_index=True, use_container_width=True)
+    st.download_button(
+        "Download Rejected Rows",
+        data=rejected_df.to_csv(index=False),
+        file_name="rejected_rows.csv",
+        mime="text/csv",
+    )
@@ -1,8 +1,15 @@
 """Data management page component for the expense tracker"""
 
+from pathlib import Path
+
 import streamlit as st
 
+import config
+from instrumentation import instrument
+from utils.export import PARQUET_AVAILABLE
+
 
+@instrument()
 def show_manage_data(manager, show_success_message, show_error_message):
     """Display the data management page"""
     st.header("🔧 Manage Data")
@@ -20,6 +27,10 @@ def show_manage_data(manager, show_success_message, show_error_message):
 
     st.divider()
 
+    _show_export_options(manager, show_error_message)
+
+    st.divider()
+
     # Dangerous operations
     _show_dangerous_operations(manager, show_success_message, show_error_message)
 
@@ -40,20 +51,63 @@ def _show_quick_actions(manager, show_success_message, show_error_message):
     st.subheader("Quick Actions")
 
     # Import fake data
-    if st.button("Import Sample Data", help="Add 50 sample expenses for testing"):
+    if st.button("Import Sample Data", help=f"Add {config.SAMPLE_DATA_COUNT} sample expenses for testing"):
         if manager.import_fake_data():
             show_success_message("Sample data imported successfully!")
             st.rerun()
         else:
             show_error_message("Failed to import sample data")
 
-    # Export data
-    if st.button("Export to CSV", help="Download all expenses as CSV"):
-        filename = manager.export_to_csv()
+
+def _show_export_options(manager, show_error_message):
+    """Display export filters and the download button"""
+    st.subheader("Export Data")
+
+    col1, col2, col3 = st.columns(3)
+
+    with col1:
+        formats = ["CSV", "Parquet"] if PARQUET_AVAILABLE else ["CSV"]
+        export_format = st.radio("Format", formats, horizontal=True, key="export_format")
+
+    with col2:
+        categories = ["All"] + manager.get_available_categories()  # noqa: RUF005
+        selected_category = st.selectbox("Category", categories, key="export_category")
+
+    with col3:
+        date_range = st.date_input("Date Range (optional)", value=(), key="export_date_range")
+
+    if st.button("Prepare Export", help="Write the matching expenses to a file for download"):
+        filters = {"category": None if selected_category == "All" else selected_category}
+        if len(date_range) == 2:  # noqa: PLR2004
+            filters["start_date"], filters["end_date"] = (str(day) for day in date_range)
+
+        # Only keep the most recent export of this session on disk
+        previous = st.session_state.pop("export_file", None)
+        if previous:
+            Path(previous).unlink(missing_ok=True)
+
+        # The download is read into memory, so it is only offered for a bounded number of expenses
+        count = manager.get_expenses_page(limit=0, **filters)["count"]
+        if count > config.MAX_BROWSER_EXPORT_ROWS:
+            show_error_message(
+                f"{count} expenses match, more than the {config.MAX_BROWSER_EXPORT_ROWS} a browser download "
+                "is limited to. Narrow the filters, or export them with `python -m src.cli export`.",
+            )
+            return
+
+        export = manager.export_to_parquet if export_format == "Parquet" else manager.export_to_csv
+        filename = export(**filters)
         if filename:
-            show_success_message(f"Data exported to {filename}")
+            st.session_state["export_file"] = filename
         else:
-            show_error_message("Failed to export data")
+            show_error_message("No expenses match the selected filters")
+
+    export_file = st.session_state.get("export_file")
+    if export_file and Path(export_file).exists():
+        path = Path(export_file)
+        mime = "application/octet-stream" if path.suffix == ".parquet" else "text/csv"
+        with path.open("rb") as fh:
+            st.download_button(f"Download {path.name}", data=fh, file_name=path.name, mime=mime)
 
 
 def _show_dangerous_operations(manager, show_success_message, show_error_message):
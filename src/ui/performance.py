@@ -0,0 +1,179 @@
+"""Performance page component for the expense tracker (hidden unless ?debug=1)"""
+
+import pandas as pd
+import streamlit as st
+
+import config
+from instrumentation import LATENCY_BUCKETS_MS, recorder
+from memory_profiling import memory_profiler
+
+KIB = 1024
+MIB = 1024 * 1024
+
+
+def show_performance():
+    """Display latency, call, row and memory statistics of the instrumented methods and pages"""
+    st.header("⏱️ Performance")
+    st.caption(
+        f"Rolling statistics over the last {recorder.window_seconds / 60:g} minutes, for every ExpenseManager "
+        "method and page render of this server process. Percentiles are upper bounds of histogram buckets.",
+    )
+
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        recorder.enabled = st.toggle(
+            "Record timings",
+            value=recorder.enabled,
+            help="Applies to all sessions of this server process; off by default "
+            f"(config.INSTRUMENTATION_ENABLED = {config.INSTRUMENTATION_ENABLED})",
+        )
+    with col2:
+        if st.button("Reset statistics"):
+            recorder.reset()
+
+    snapshot = recorder.snapshot()
+    if snapshot:
+        _show_timings(snapshot)
+    else:
+        st.info("No timings recorded yet. Switch recording on and use the other pages.")
+
+    _show_memory()
+
+
+def _show_timings(snapshot: list[dict]):
+    """Show the statistics tables and the latency histogram of a chosen function"""
+    pages = [summary for summary in snapshot if summary["name"].startswith("show_")]
+    methods = [summary for summary in snapshot if not summary["name"].startswith("show_")]
+
+    if pages:
+        st.subheader("Page renders")
+        _show_table(pages)
+    if methods:
+        st.subheader("ExpenseManager methods")
+        _show_table(methods)
+
+    st.subheader("Latency histogram")
+    name = st.selectbox("Function", [summary["name"] for summary in snapshot])
+    summary = next(summary for summary in snapshot if summary["name"] == name)
+    labels = [f"≤ {bound:g} ms" for bound in LATENCY_BUCKETS_MS] + [f"> {LATENCY_BUCKETS_MS[-1]:g} ms"]
+    histogram = pd.DataFrame({"Latency": labels, "Calls": summary["buckets"]})
+    # Keep the bucket order instead of sorting the labels alphabetically
+    histogram["Latency"] = pd.Categorical(histogram["Latency"], categories=labels, ordered=True)
+    st.bar_chart(histogram, x="Latency", y="Calls")
+
+
+def _show_memory():
+    """Show the memory profiler's switch and its call site, call and session reports"""
+    st.header("🧠 Memory")
+    st.caption(
+        "A tracemalloc snapshot at the end of each page render gives the call sites of the memory it allocated "
+        "and kept, and each session's retained growth; ExpenseManager calls report the traced memory they kept. "
+        "Tracing slows the app down, and with several sessions active at once, a render is also charged with the "
+        "others' allocations.",
+    )
+
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        profiling = st.toggle(
+            "Profile memory",
+            value=memory_profiler.enabled,
+            help="Applies to all sessions of this server process; off by default "
+            f"(config.MEMORY_PROFILING_ENABLED = {config.MEMORY_PROFILING_ENABLED})",
+        )
+        if profiling and not memory_profiler.enabled:
+            memory_profiler.start()
+        elif not profiling and memory_profiler.enabled:
+            memory_profiler.stop()
+    with col2:
+        if st.button("Reset memory reports"):
+            memory_profiler.reset()
+
+    current, peak = memory_profiler.traced_memory()
+    if current:
+        st.write(f"**Traced since the last render started:** {current / MIB:,.1f} MiB (peak {peak / MIB:,.1f} MiB)")
+
+    sites = memory_profiler.top_sites()
+    if not sites:
+        st.info("No page renders profiled yet. Switch memory profiling on and use the other pages.")
+        return
+
+    st.subheader("Top allocating call sites")
+    _show_kib_table(
+        [
+            {
+                "Allocated at": site["site"],
+                "App code": site["app_site"] or "-",
+                "Retained KiB": site["size_bytes"] / KIB,
+                "Blocks": site["count"],
+                "Pages": ", ".join(site["pages"]),
+            }
+            for site in sites
+        ],
+    )
+
+    st.subheader("Retained memory per call")
+    _show_kib_table(
+        [
+            {
+                "Function": call["name"],
+                "Calls": call["calls"],
+                "Retained KiB": call["retained_bytes"] / KIB,
+                "Max retained KiB": call["max_retained_bytes"] / KIB,
+            }
+            for call in memory_profiler.calls()
+        ],
+    )
+
+    st.subheader("Sessions")
+    st.caption("Session state is measured after each rerun; edit keys are the View Expenses edit-form flags.")
+    _show_kib_table(
+        [
+            {
+                "Session": session["session"],
+                "Renders": session["renders"],
+                "Retained KiB": session["retained_bytes"] / KIB,
+                "Last render KiB": session["last_retained_bytes"] / KIB,
+                "State keys": session["state_keys"],
+                "Edit keys": session["edit_keys"],
+                "State KiB": session["state_bytes"] / KIB,
+                "Largest keys": ", ".join(f"{key} ({size / KIB:,.0f} KiB)" for key, size in session["largest_keys"]),
+            }
+            for session in memory_profiler.sessions()
+        ],
+    )
+
+
+def _show_table(summaries: list[dict]):
+    """Show one row of statistics per function, slowest total time first"""
+    table = pd.DataFrame(
+        [
+            {
+                "Function": summary["name"],
+                "Calls": summary["calls"],
+                "Errors": summary["errors"],
+                "Rows": summary["rows"],
+                "Mean ms": summary["mean_ms"],
+                "p50 ms": summary["p50_ms"],
+                "p95 ms": summary["p95_ms"],
+                "p99 ms": summary["p99_ms"],
+                "Max ms": summary["max_ms"],
+                "Total s": summary["total_ms"] / 1000,
+            }
+            for summary in summaries
+        ],
+    )
+    st.dataframe(
+        table.style.format(dict.fromkeys(["Mean ms", "p50 ms", "p95 ms", "p99 ms", "Max ms", "Total s"], "{:.2f}")),
+        hide_index=True,
+        width="stretch",
+    )
+
+
+def _show_kib_table(rows: list[dict]):
+    """Show a table, formatting its KiB columns"""
+    table = pd.DataFrame(rows)
+    st.dataframe(
+        table.style.format(dict.fromkeys([column for column in table.columns if "KiB" in column], "{:,.1f}")),
+        hide_index=True,
+        width="stretch",
+    )
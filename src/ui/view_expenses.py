@@ -5,62 +5,35 @@ from datetime import UTC, datetime
 import pandas as pd
 import streamlit as st
 
+import config
+from expense_manager import ExpenseConflictError
+from instrumentation import instrument
 
+
+@instrument()
 def show_view_expenses(manager, show_success_message, show_error_message):
     """Display the view expenses page"""
     st.header("👀 View Expenses")
 
-    # Filters
-    st.subheader("Filters")
-    col1, col2, col3 = st.columns(3)
+    filters = _get_filters(manager)
 
-    with col1:
-        # Category filter
-        categories = ["All"] + manager.get_available_categories()  # noqa: RUF005
-        selected_category = st.selectbox("Filter by Category", categories)
-
-    with col2:
-        # Date range filter - Set a wider default range to include sample data
-        default_start = datetime(2024, 1, 1).date()  # Start from 2024 to include sample data  # noqa: DTZ001
-        default_end = datetime.now(tz=UTC).date()
-
-        date_range = st.date_input(
-            "Date Range",
-            value=(default_start, default_end),
-            help="Select start and end dates",
-        )
-
-    with col3:
-        # Search
-        search_query = st.text_input("Search Description", help="Search in expense descriptions")
-
-    # Get filtered expenses
-    if selected_category == "All":
-        expenses = manager.get_all_expenses()
-    else:
-        expenses = manager.get_expenses_by_category(selected_category)
-
-    # Apply date filter
-    if len(date_range) == 2:  # noqa: PLR2004
-        start_date, end_date = date_range
-        expenses = [
-            exp
-            for exp in expenses
-            if start_date <= datetime.strptime(exp["date"], "%Y-%m-%d").date() <= end_date  # noqa: DTZ007
-        ]
-
-    # Apply search filter
-    if search_query:
-        expenses = [exp for exp in expenses if search_query.lower() in exp["description"].lower()]
+    # Only the requested page of expenses is loaded, newest first; the widget below sets the page
+    page = st.session_state.get("expenses_page", 1)
+    result = manager.get_expenses_page((page - 1) * config.EXPENSES_PAGE_SIZE, config.EXPENSES_PAGE_SIZE, **filters)
+    page_count = max(1, (result["count"] - 1) // config.EXPENSES_PAGE_SIZE + 1)
+    if page > page_count:
+        # The filters now match fewer pages; show the last one
+        page = st.session_state["expenses_page"] = page_count
+        result = manager.get_expenses_page((page - 1) * config.EXPENSES_PAGE_SIZE, config.EXPENSES_PAGE_SIZE, **filters)
 
     # Display results
-    if expenses:
-        st.subheader(f"Found {len(expenses)} expenses")
+    if result["count"]:
+        st.subheader(f"Found {result['count']} expenses")
 
-        # Convert to DataFrame for display
-        df = pd.DataFrame(expenses)  # noqa: PD901
-        df = df[["id", "date", "description", "category", "amount"]].copy()  # noqa: PD901
-        df = df.sort_values("date", ascending=False)  # noqa: PD901
+        if page_count > 1:
+            st.number_input(f"Page (of {page_count})", min_value=1, max_value=page_count, step=1, key="expenses_page")
+
+        df = pd.DataFrame(result["expenses"])  # noqa: PD901
 
         # Format amount column
         df["amount"] = df["amount"].apply(lambda x: f"${x:.2f}")
@@ -77,11 +50,12 @@ def show_view_expenses(manager, show_success_message, show_error_message):
 
                 with col2:
                     if st.button("Edit", key=f"edit_{expense['id']}"):
-                        st.session_state[f"editing_{expense['id']}"] = True
+                        _start_editing(expense["id"], manager)
 
                 with col3:
                     if st.button("Delete", key=f"delete_{expense['id']}", type="secondary"):
                         if manager.delete_expense(expense["id"]):
+                            _stop_editing(expense["id"])
                             show_success_message(f"Deleted expense: {expense['description']}")
                             st.rerun()
                         else:
@@ -92,12 +66,67 @@ def show_view_expenses(manager, show_success_message, show_error_message):
                     _show_edit_form(expense, manager, show_success_message, show_error_message)
 
         # Summary statistics
-        _show_summary_statistics(expenses)
+        _show_summary_statistics(result["count"], result["total"])
 
     else:
         st.info("No expenses found matching your criteria.")
 
 
+def _get_filters(manager) -> dict:
+    """Display the filters and get them as keyword arguments of ``ExpenseManager.get_expenses_page``"""
+    # Filters
+    st.subheader("Filters")
+    col1, col2, col3 = st.columns(3)
+
+    # Count, categories and date range come from the partition manifest, without loading expenses
+    metadata = manager.get_metadata()
+
+    with col1:
+        # Category filter
+        categories = ["All"] + manager.get_available_categories()  # noqa: RUF005
+        selected_category = st.selectbox("Filter by Category", categories)
+
+    with col2:
+        # Date range filter - default to the whole ledger, or from 2024 to include sample data
+        default_start = datetime(2024, 1, 1).date()  # noqa: DTZ001
+        if metadata["date_range"] is not None:
+            first_date = datetime.strptime(metadata["date_range"]["start"], "%Y-%m-%d").date()  # noqa: DTZ007
+            default_start = min(default_start, first_date)
+        default_end = datetime.now(tz=UTC).date()
+
+        date_range = st.date_input(
+            "Date Range",
+            value=(default_start, default_end),
+            help="Select start and end dates",
+        )
+
+    with col3:
+        # Search
+        search_query = st.text_input("Search Description", help="Search in expense descriptions")
+
+    filters = {
+        "category": None if selected_category == "All" else selected_category,
+        "search": search_query or None,
+    }
+    # The date range is incomplete while the end date is being picked
+    if len(date_range) == 2:  # noqa: PLR2004
+        filters["start_date"], filters["end_date"] = (str(day) for day in date_range)
+    return filters
+
+
+def _start_editing(expense_id, manager):
+    """Open the edit form, remembering the version being edited to detect concurrent changes on save"""
+    original_expense = manager.get_expense_by_id(expense_id)
+    st.session_state[f"editing_{expense_id}"] = True
+    st.session_state[f"edit_version_{expense_id}"] = original_expense.get("version", 1) if original_expense else None
+
+
+def _stop_editing(expense_id):
+    """Close the edit form, dropping its session state keys so that they do not pile up over a session"""
+    st.session_state.pop(f"editing_{expense_id}", None)
+    st.session_state.pop(f"edit_version_{expense_id}", None)
+
+
 def _show_edit_form(expense, manager, show_success_message, show_error_message):
     """Display the edit form for an expense"""
     with st.form(f"edit_form_{expense['id']}"):
@@ -146,43 +175,40 @@ def _show_edit_form(expense, manager, show_success_message, show_error_message):
 
         with col_save:
             if st.form_submit_button("Save Changes", type="primary"):
-                success = manager.update_expense(
-                    expense["id"],
-                    amount=new_amount,
-                    description=new_description,
-                    category=new_category,
-                    date=str(new_date),
-                )
+                try:
+                    success = manager.update_expense(
+                        expense["id"],
+                        expected_version=st.session_state.get(f"edit_version_{expense['id']}"),
+                        amount=new_amount,
+                        description=new_description,
+                        category=new_category,
+                        date=str(new_date),
+                    )
+                except ExpenseConflictError:
+                    show_error_message(
+                        "This expense was changed in another session since you started editing. "
+                        "Close the form and edit it again to see the latest values.",
+                    )
+                    return
 
                 if success:
                     show_success_message("Expense updated successfully")
-                    st.session_state[f"editing_{expense['id']}"] = False
+                    _stop_editing(expense["id"])
                     st.rerun()
                 else:
                     show_error_message("Failed to update expense")
 
         with col_cancel:
             if st.form_submit_button("Cancel"):
-                st.session_state[f"editing_{expense['id']}"] = False
+                _stop_editing(expense["id"])
                 st.rerun()
 
 
-def _show_summary_statistics(expenses):
+def _show_summary_statistics(count, total_amount):
     """Display summary statistics for the filtered expenses"""
     st.subheader("Summary")
 
-    # Ensure we're working with numeric amounts only
-    valid_amounts = []
-    for exp in expenses:
-        try:
-            amount = float(exp["amount"])
-            valid_amounts.append(amount)
-        except (ValueError, TypeError):
-            # Skip invalid amounts
-            continue
-
-    total_amount = sum(valid_amounts)
-    avg_amount = total_amount / len(valid_amounts) if valid_amounts else 0
+    avg_amount = total_amount / count if count else 0
 
     col1, col2, col3 = st.columns(3)
     with col1:
@@ -190,4 +216,4 @@ def _show_summary_statistics(expenses):
     with col2:
         st.metric("Average Amount", f"${avg_amount:.2f}")
     with col3:
-        st.metric("Number of Expenses", len(expenses))
+        st.metric("Number of Expenses", count)
@@ -0,0 +1 @@
+"""Utility modules for the Personal Expense Tracker"""
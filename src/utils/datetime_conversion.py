@@ -2,9 +2,64 @@
 DateTime conversion utilities for expense tracker
 """
 
-from datetime import datetime, date, timedelta
+from datetime import UTC, datetime, date, timedelta
+from functools import lru_cache
+from typing import NamedTuple
+import logging
 import re
 
+logger = logging.getLogger(__name__)
+
+# Formats tried automatically, in order of preference
+COMMON_FORMATS = [
+    "%Y-%m-%d",  # 2024-01-15 (already correct)
+    "%d/%m/%Y",  # 15/01/2024
+    "%m/%d/%Y",  # 01/15/2024
+    "%d-%m-%Y",  # 15-01-2024
+    "%m-%d-%Y",  # 01-15-2024
+    "%Y/%m/%d",  # 2024/01/15
+    "%d.%m.%Y",  # 15.01.2024
+    "%Y.%m.%d",  # 2024.01.15
+    "%B %d, %Y",  # January 15, 2024
+    "%b %d, %Y",  # Jan 15, 2024
+    "%d %B %Y",  # 15 January 2024
+    "%d %b %Y",  # 15 Jan 2024
+    "%Y-%m-%d %H:%M:%S",  # 2024-01-15 14:30:00
+    "%Y-%m-%d %H:%M",  # 2024-01-15 14:30
+    "%d/%m/%Y %H:%M:%S",  # 15/01/2024 14:30:00
+    "%m/%d/%Y %H:%M:%S",  # 01/15/2024 14:30:00
+]
+
+# Day-first formats and their month-first counterparts, which match the same
+# value whenever both the day and the month are 12 or less
+DAY_MONTH_FORMAT_PAIRS = {
+    "%d/%m/%Y": "%m/%d/%Y",
+    "%d-%m-%Y": "%m-%d-%Y",
+    "%d/%m/%Y %H:%M:%S": "%m/%d/%Y %H:%M:%S",
+}
+
+MONTH_FIRST_FORMATS = frozenset(DAY_MONTH_FORMAT_PAIRS.values())
+
+DATE_SAMPLE_SIZE = 100
+
+# Number of recently converted date strings kept by _convert_date_string
+DATE_CACHE_SIZE = 4096
+
+# Length of a YYYY-MM-DD date
+ISO_DATE_LENGTH = 10
+
+# Days up to this one can also be read as a month
+MAX_MONTH = 12
+
+
+class _FormatHint:
+    """Format that last converted a date string, tried first on the next cache miss"""
+
+    format = None
+
+
+_format_hint = _FormatHint()
+
 
 def convert_to_standard_date(date_input, input_format=None):
     """
@@ -39,39 +94,59 @@ def convert_to_standard_date(date_input, input_format=None):
             except ValueError:
                 pass
 
-        # Try common formats automatically
-        common_formats = [
-            "%Y-%m-%d",  # 2024-01-15 (already correct)
-            "%d/%m/%Y",  # 15/01/2024
-            "%m/%d/%Y",  # 01/15/2024
-            "%d-%m-%Y",  # 15-01-2024
-            "%m-%d-%Y",  # 01-15-2024
-            "%Y/%m/%d",  # 2024/01/15
-            "%d.%m.%Y",  # 15.01.2024
-            "%Y.%m.%d",  # 2024.01.15
-            "%B %d, %Y",  # January 15, 2024
-            "%b %d, %Y",  # Jan 15, 2024
-            "%d %B %Y",  # 15 January 2024
-            "%d %b %Y",  # 15 Jan 2024
-            "%Y-%m-%d %H:%M:%S",  # 2024-01-15 14:30:00
-            "%Y-%m-%d %H:%M",  # 2024-01-15 14:30
-            "%d/%m/%Y %H:%M:%S",  # 15/01/2024 14:30:00
-            "%m/%d/%Y %H:%M:%S",  # 01/15/2024 14:30:00
-        ]
-
-        for fmt in common_formats:
-            try:
-                dt = datetime.strptime(date_input, fmt)
-                return dt.strftime("%Y-%m-%d")
-            except ValueError:
-                continue
-
-        # Try to parse with regex for flexible formats
-        return parse_with_regex(date_input)
+        # Try common formats automatically (memoized per string)
+        return _convert_date_string(date_input)
 
     raise ValueError(f"Cannot convert {date_input} to standard date format")
 
 
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def _convert_date_string(date_string):
+    """Convert a stripped date string to YYYY-MM-DD, trying the cheap paths first.
+
+    ISO dates are handled by date.fromisoformat without touching the format
+    list. Otherwise the format that succeeded last is tried before walking
+    COMMON_FORMATS, so a run of same-style inputs costs one strptime each.
+
+    Args:
+        date_string (str): Date string without surrounding whitespace
+
+    Returns:
+        str: Date in YYYY-MM-DD format
+    """
+
+    # Fast path: already YYYY-MM-DD
+    if len(date_string) == ISO_DATE_LENGTH and date_string[4] == "-" and date_string[7] == "-":
+        try:
+            return date.fromisoformat(date_string).isoformat()
+        except ValueError:
+            pass
+
+    hint = _format_hint.format
+    if hint is not None:
+        try:
+            dt = datetime.strptime(date_string, hint).replace(tzinfo=UTC)
+        except ValueError:
+            dt = None
+        # A month-first hint must not win over the day-first format that
+        # precedes it in COMMON_FORMATS when both could read the value
+        if dt is not None and not (hint in MONTH_FIRST_FORMATS and dt.day <= MAX_MONTH):
+            return dt.strftime("%Y-%m-%d")
+
+    for fmt in COMMON_FORMATS:
+        if fmt == hint:
+            continue
+        try:
+            dt = datetime.strptime(date_string, fmt).replace(tzinfo=UTC)
+        except ValueError:
+            continue
+        _format_hint.format = fmt
+        return dt.strftime("%Y-%m-%d")
+
+    # Try to parse with regex for flexible formats
+    return parse_with_regex(date_string)
+
+
 def parse_with_regex(date_string):
     """
     Parse date using regex patterns for flexible input.
@@ -119,7 +194,7 @@ def convert_for_expense_tracker(date_input):
         return convert_to_standard_date(date_input)
     except ValueError:
         # If conversion fails, use current date
-        print(f"Warning: Could not parse date '{date_input}', using current date")
+        logger.warning("Could not parse date %r, using current date", date_input)
         return datetime.now().strftime("%Y-%m-%d")
 
 
@@ -143,3 +218,122 @@ def validate_date_format(date_string):
 def get_current_date():
     """Get current date in YYYY-MM-DD format."""
     return datetime.now().strftime("%Y-%m-%d")
+
+
+class NormalizedDates(NamedTuple):
+    """Result of normalize_dates"""
+
+    dates: object  # list, or pandas Series when a Series was given
+    format: str | None  # format inferred from the sample
+    ambiguous: bool  # True if the sample fits both a day-first and a month-first format
+    failed: int  # number of non-empty values that could not be parsed
+
+
+def infer_date_format(sample):
+    """Infer the date format of a column from a sample of its values.
+
+    Every common format is scored by how many sample values it parses; the
+    highest score wins, with ties going to the earlier format.
+
+    Args:
+        sample: Iterable of date strings
+
+    Returns:
+        tuple: (format or None, ambiguous) where ambiguous is True when the
+            day-first and month-first readings of the sample fit equally well
+    """
+
+    values = [value.strip() for value in sample if isinstance(value, str) and value.strip()]
+    if not values:
+        return None, False
+
+    scores = {}
+    for fmt in COMMON_FORMATS:
+        score = 0
+        for value in values:
+            try:
+                datetime.strptime(value, fmt).replace(tzinfo=UTC)
+                score += 1
+            except ValueError:
+                continue
+        scores[fmt] = score
+
+    best = max(COMMON_FORMATS, key=lambda fmt: scores[fmt])
+    if scores[best] == 0:
+        return None, False
+
+    pairs = {**DAY_MONTH_FORMAT_PAIRS, **{v: k for k, v in DAY_MONTH_FORMAT_PAIRS.items()}}
+    ambiguous = best in pairs and scores[pairs[best]] == scores[best]
+
+    return best, ambiguous
+
+
+def normalize_dates(values, date_format=None, sample_size=DATE_SAMPLE_SIZE):
+    """Convert a whole column of dates to YYYY-MM-DD format.
+
+    The format is inferred once from a sample and the column is converted in
+    one pass (vectorized with pandas when the input is a Series). Values the
+    inferred format cannot parse fall back to convert_to_standard_date row by
+    row. Empty and unparseable values become None.
+
+    Args:
+        values: pandas Series or any iterable of dates
+        date_format: Format to use instead of inferring one (optional)
+        sample_size: Number of values used for format inference
+
+    Returns:
+        NormalizedDates: Converted dates plus the inferred format, ambiguity flag and failure count
+    """
+
+    # Imported lazily, plain iterables do not need it
+    import pandas as pd  # noqa: PLC0415
+
+    is_series = isinstance(values, pd.Series)
+    if not is_series:
+        values = list(values)
+
+    sample = values.head(sample_size * 4) if is_series else values[: sample_size * 4]
+    sample = [value for value in sample if isinstance(value, str) and value.strip()][:sample_size]
+
+    ambiguous = False
+    if date_format is None:
+        date_format, ambiguous = infer_date_format(sample)
+
+    if is_series:
+        strings = values.astype(object).where(values.notna(), "").map(lambda value: str(value).strip())
+        if date_format is not None:
+            parsed = pd.to_datetime(strings, format=date_format, errors="coerce")
+            dates = parsed.dt.strftime("%Y-%m-%d").astype(object).where(parsed.notna(), None)
+        else:
+            dates = pd.Series(None, index=values.index, dtype=object)
+        pending = [index for index in dates.index[dates.isna()] if strings[index]]
+    else:
+        strings = [value.strip() if isinstance(value, str) else value for value in values]
+        dates = [_parse_with_format(value, date_format) for value in strings]
+        pending = [index for index, date_value in enumerate(dates) if date_value is None and strings[index]]
+
+    failed = 0
+    for index in pending:
+        try:
+            converted = convert_to_standard_date(strings[index])
+        except ValueError:
+            converted = None
+        if converted is not None and validate_date_format(converted):
+            dates[index] = converted
+        else:
+            failed += 1
+
+    return NormalizedDates(dates, date_format, ambiguous, failed)
+
+
+def _parse_with_format(value, date_format):
+    """Parse a single value with a known format, returning None on failure"""
+
+    if isinstance(value, (datetime, date)):
+        return value.strftime("%Y-%m-%d")
+    if not value or date_format is None:
+        return None
+    try:
+        return datetime.strptime(value, date_format).replace(tzinfo=UTC).strftime("%Y-%m-%d")
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,106 @@
+"""Streaming export writers for the expense tracker
+
+The writers consume an iterable of record batches (lists of dicts) so that an
+export never holds more than one batch of rows in memory at a time.
+"""
+
+import csv
+import importlib.util
+import io
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+
+# pyarrow is optional, and slow to import, so it is only looked up here and imported on first Parquet export
+PARQUET_AVAILABLE = importlib.util.find_spec("pyarrow") is not None
+
+EXPORT_COLUMNS = ["id", "date", "description", "category", "amount", "created_at", "updated_at"]
+
+
+def iter_csv_bytes(batches: Iterable[list[dict]], columns: list[str] = EXPORT_COLUMNS) -> Iterator[bytes]:
+    """Encode record batches as CSV, yielding one bytes chunk per batch
+
+    Args:
+        batches: Iterable of record batches
+        columns: Column order of the CSV output
+
+    Yields:
+        bytes: UTF-8 encoded CSV text, starting with the header row
+    """
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction="ignore")
+
+    writer.writeheader()
+    yield buffer.getvalue().encode("utf-8")
+
+    for batch in batches:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(batch)
+        yield buffer.getvalue().encode("utf-8")
+
+
+def write_csv(batches: Iterable[list[dict]], path: Path, columns: list[str] = EXPORT_COLUMNS) -> int:
+    """Stream record batches into a CSV file
+
+    Args:
+        batches: Iterable of record batches
+        path: Destination file
+        columns: Column order of the CSV output
+
+    Returns:
+        int: Number of rows written
+    """
+    rows = 0
+    with Path(path).open("w", newline="", encoding="utf-8") as fh:
+        writer = csv.DictWriter(fh, fieldnames=columns, extrasaction="ignore")
+        writer.writeheader()
+        for batch in batches:
+            writer.writerows(batch)
+            rows += len(batch)
+    return rows
+
+
+def _parquet_schema():
+    """Arrow schema matching EXPORT_COLUMNS"""
+    import pyarrow as pa  # noqa: PLC0415
+
+    return pa.schema(
+        [
+            ("id", pa.int64()),
+            ("date", pa.string()),
+            ("description", pa.string()),
+            ("category", pa.string()),
+            ("amount", pa.float64()),
+            ("created_at", pa.string()),
+            ("updated_at", pa.string()),
+        ],
+    )
+
+
+def write_parquet(batches: Iterable[list[dict]], path: Path) -> int:
+    """Stream record batches into a Parquet file, one row group per batch
+
+    Args:
+        batches: Iterable of record batches
+        path: Destination file
+
+    Returns:
+        int: Number of rows written
+
+    Raises:
+        ImportError: If pyarrow is not installed
+    """
+    if not PARQUET_AVAILABLE:
+        raise ImportError("Parquet export requires the 'pyarrow' package")
+
+    import pyarrow as pa  # noqa: PLC0415
+    import pyarrow.parquet as pq  # noqa: PLC0415
+
+    schema = _parquet_schema()
+    rows = 0
+    with pq.ParquetWriter(str(path), schema) as writer:
+        for batch in batches:
+            records = [{column: record.get(column) for column in schema.names} for record in batch]
+            writer.write_table(pa.Table.from_pylist(records, schema=schema))
+            rows += len(batch)
+    return rows